@@ -1,9 +1,21 @@
 from __future__ import annotations
 
-from src.web import main as web_main
+import sys
 
 
-if __name__ == "__main__":
-    raise SystemExit(web_main())
+def main() -> int:
+    # `IntentDemo cli ...` runs the command-line client without importing
+    # Flask, so the packaged exe can also serve as a quick CLI (and forward to
+    # a running `python -m src.daemon`).
+    if len(sys.argv) > 1 and sys.argv[1] == "cli":
+        from src.cli import main as cli_main
+
+        sys.argv = [f"{sys.argv[0]} cli"] + sys.argv[2:]
+        return cli_main()
+    from src.web import main as web_main
 
+    return web_main()
 
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1 @@
+"""Benchmarks for the intent-centric prototype."""
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List
+
+from src.intents import Intent
+from src.matching import MatchingEngine
+from src.rings import RingFinder
+
+
+# How ring discovery time scales with open swap intents and distinct tokens:
+#
+#   python -m benchmarks.rings
+#   python -m benchmarks.rings --orders 1000 5000 --tokens 10 50 --max-length 4 --json out.json
+
+
+def swap_intents(count: int, tokens: int, seed: int) -> List[Intent]:
+    """Random limit swaps priced around per-token reference values.
+
+    Limits sit a few percent around the reference rate, so most pairs do not
+    cross directly but some cycles clear.
+    """
+    rnd = random.Random(seed)
+    names = [f"T{i}" for i in range(tokens)]
+    values = {name: rnd.uniform(0.5, 2.0) for name in names}
+    intents = []
+    for _ in range(count):
+        from_token, to_token = rnd.sample(names, 2)
+        rate = values[from_token] / values[to_token]
+        intents.append(
+            Intent(
+                name="swap",
+                params={
+                    "from_token": from_token,
+                    "to_token": to_token,
+                    "amount": rnd.uniform(1.0, 100.0),
+                    "limit_price": rate * rnd.uniform(0.99, 1.05),
+                },
+                tags=["swap", "trade"],
+            )
+        )
+    return intents
+
+
+def run_case(orders: int, tokens: int, max_length: int, seed: int) -> Dict[str, Any]:
+    intents = swap_intents(orders, tokens, seed)
+
+    # Baseline: matching engine alone
+    engine = MatchingEngine()
+    start = time.perf_counter()
+    for intent in intents:
+        engine.submit(intent)
+    baseline = time.perf_counter() - start
+
+    engine = MatchingEngine()
+    finder = RingFinder(engine, max_length=max_length)
+    start = time.perf_counter()
+    for intent in intents:
+        engine.submit(intent)
+    with_discovery = time.perf_counter() - start
+
+    start = time.perf_counter()
+    settled = finder.settle()
+    settle_time = time.perf_counter() - start
+
+    return {
+        "orders": orders,
+        "tokens": tokens,
+        "max_length": max_length,
+        "open_orders": len(engine),
+        "cycles": len(finder),
+        "rings_settled": len(settled),
+        "discovery_us_per_order": (with_discovery - baseline) / orders * 1e6,
+        "settle_ms": settle_time * 1e3,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ring-trade discovery benchmark")
+    parser.add_argument("--orders", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--tokens", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--max-length", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'orders':>8} {'tokens':>7} {'open':>7} {'cycles':>8} {'settled':>8} {'us/order':>9} {'settle ms':>10}")
+    for tokens in args.tokens:
+        for orders in args.orders:
+            row = run_case(orders, tokens, args.max_length, args.seed)
+            results.append(row)
+            print(
+                f"{row['orders']:>8} {row['tokens']:>7} {row['open_orders']:>7} {row['cycles']:>8} "
+                f"{row['rings_settled']:>8} {row['discovery_us_per_order']:>9.1f} {row['settle_ms']:>10.2f}"
+            )
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"benchmark": "rings", "results": results}, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
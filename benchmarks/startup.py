@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+
+# Cold-start cost of the entry points, each measured in fresh interpreters:
+#
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --json startup.json --budget-ms src.cli=80
+#
+# For every module it reports the wall time of `python -c "import <module>"`
+# (median of --repeat runs, minus a bare interpreter start) and the cumulative
+# import time Python itself reports with `-X importtime`, plus the slowest
+# imports pulled in. --budget-ms makes the run fail when a module's import
+# time exceeds its budget, so cold-start regressions show up in CI.
+
+MODULES = ("src.intents", "src.solver", "src.cli", "src.daemon", "src.web", "src.gui")
+
+
+def run_python(args: List[str]) -> "subprocess.CompletedProcess[str]":
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, cwd=os.getcwd())
+
+
+def wall_ms(code: str, repeat: int) -> Optional[float]:
+    """Median wall time of `python -c code`; None if it fails (missing dependency)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if run_python(["-c", code]).returncode != 0:
+            return None
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(samples)
+
+
+def import_profile(module: str) -> List[Dict[str, Any]]:
+    """`-X importtime` rows (module, self_us, cumulative_us) for one cold import."""
+    completed = run_python(["-X", "importtime", "-c", f"import {module}"])
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = [field.strip() for field in line[len("import time:"):].split("|")]
+        if not fields[0].isdigit():
+            continue  # header row
+        rows.append({"module": fields[2].strip(), "self_us": int(fields[0]), "cumulative_us": int(fields[1])})
+    return rows
+
+
+def parse_budgets(items: List[str]) -> Dict[str, float]:
+    budgets: Dict[str, float] = {}
+    for item in items:
+        module, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--budget-ms expects module=ms, got {item!r}")
+        budgets[module] = float(value)
+    return budgets
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Import-time (cold start) benchmark")
+    parser.add_argument("--modules", nargs="+", default=list(MODULES))
+    parser.add_argument("--repeat", type=int, default=5, help="interpreter starts per module")
+    parser.add_argument("--top", type=int, default=3, help="slowest imports listed per module")
+    parser.add_argument("--budget-ms", nargs="+", default=[], metavar="MODULE=MS", help="fail above these import times")
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    args = parser.parse_args()
+    budgets = parse_budgets(args.budget_ms)
+
+    baseline = wall_ms("pass", args.repeat) or 0.0
+    print(f"interpreter start: {baseline:.1f} ms")
+    print(f"{'module':<14} {'wall ms':>8} {'import ms':>10}  slowest imports")
+    results = []
+    failed = []
+    for module in args.modules:
+        wall = wall_ms(f"import {module}", args.repeat)
+        rows = import_profile(module)
+        if wall is None or not rows:
+            print(f"{module:<14} {'n/a':>8} {'n/a':>10}  (import failed)")
+            results.append({"module": module, "error": "import failed"})
+            continue
+        total_ms = next((row["cumulative_us"] for row in rows if row["module"] == module), 0) / 1000.0
+        # Direct and transitive imports other than the module itself
+        slowest = sorted((row for row in rows if row["module"] != module), key=lambda row: -row["cumulative_us"])
+        slowest = slowest[: args.top]
+        names = ", ".join(f"{row['module']} {row['cumulative_us'] / 1000.0:.1f}" for row in slowest)
+        print(f"{module:<14} {wall - baseline:>8.1f} {total_ms:>10.1f}  {names}")
+        results.append(
+            {
+                "module": module,
+                "wall_ms": round(wall - baseline, 3),
+                "import_ms": round(total_ms, 3),
+                "slowest": [{"module": row["module"], "ms": row["cumulative_us"] / 1000.0} for row in slowest],
+            }
+        )
+        budget = budgets.get(module)
+        if budget is not None and total_ms > budget:
+            failed.append(f"{module}: {total_ms:.1f} ms > {budget:.1f} ms")
+
+    if args.json:
+        report = {
+            "benchmark": "startup",
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "config": {"repeat": args.repeat, "budgets": budgets},
+            "interpreter_ms": round(baseline, 3),
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+    for message in failed:
+        print(f"over budget: {message}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
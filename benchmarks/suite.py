@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from src.intents import Intent, IntentRegistry
+from src.metrics import Metrics
+from src.sharding import ShardedRegistry
+from src.solver import Solver
+
+from .workload import DISTRIBUTIONS, Workload
+
+
+# Matching and solving latency on synthetic catalogs:
+#
+#   python -m benchmarks.suite
+#   python -m benchmarks.suite --capabilities 100 20000 --distribution uniform --json before.json
+#
+# Each case runs every intent in the stream once for timing, then the first
+# --memory-intents again under tracemalloc for peak memory (tracing slows calls
+# down several times, so the two passes are kept apart). Results are written
+# with sorted keys so two runs diff cleanly.
+
+CASES = ("rank_capabilities", "explain_capabilities", "solve", "solve_with_explain", "api_solve")
+
+
+def build_solver(workload: Workload, cache_size: int, instrument: bool = False, shards: int = 0) -> Solver:
+    registry: Any
+    if shards:
+        registry = ShardedRegistry(shards=shards, cache_size=cache_size)
+        registry.add_capabilities(workload.catalog())
+    else:
+        registry = IntentRegistry(cache_size=cache_size)
+        for capability in workload.catalog():
+            registry.add_capability(capability)
+    solver = Solver(registry)
+    for capability in registry.list_capabilities():
+        solver.register_handler(capability.name, lambda intent: "ok")
+    if instrument:
+        solver.instrument(Metrics())
+    return solver
+
+
+def api_solve_call(solver: Solver) -> Callable[[Intent], Any]:
+    """POST each intent to /api/solve through the Flask test client, served by `solver`."""
+    from src import web
+
+    web.solver.registry = solver.registry
+    web.solver._handlers = solver._handlers
+    web.solver.metrics = solver.metrics
+    web.metrics = solver.metrics
+    client = web.app.test_client()
+
+    def call(intent: Intent) -> Any:
+        response = client.post("/api/solve", json=intent.to_dict())
+        if response.status_code != 200:
+            raise RuntimeError(f"/api/solve returned {response.status_code}")
+        return response.data
+
+    return call
+
+
+def measure(call: Callable[[Intent], Any], intents: List[Intent], warmup: int, memory_intents: int) -> Dict[str, float]:
+    for intent in intents[:warmup]:
+        call(intent)
+
+    gc.collect()
+    timings: List[float] = []
+    clock = time.perf_counter
+    started = clock()
+    for intent in intents:
+        start = clock()
+        call(intent)
+        timings.append(clock() - start)
+    elapsed = clock() - started
+
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for intent in intents[:memory_intents]:
+        call(intent)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+
+    timings.sort()
+    return {
+        "p50_us": statistics.median(timings) * 1e6,
+        "p99_us": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6,
+        "ops_per_sec": len(timings) / elapsed if elapsed else 0.0,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run_case(case: str, solver: Solver, intents: List[Intent], warmup: int, memory_intents: int) -> Dict[str, float]:
+    calls: Dict[str, Callable[[], Callable[[Intent], Any]]] = {
+        "rank_capabilities": lambda: solver.registry.rank_capabilities,
+        "explain_capabilities": lambda: solver.registry.explain_capabilities,
+        "solve": lambda: solver.solve,
+        "solve_with_explain": lambda: solver.solve_with_explain,
+        "api_solve": lambda: api_solve_call(solver),
+    }
+    return measure(calls[case](), intents, warmup, memory_intents)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Matching and solving benchmark suite")
+    parser.add_argument("--capabilities", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--intents", type=int, default=1000, help="intents per case")
+    parser.add_argument("--tags", type=int, default=200, help="tag vocabulary size")
+    parser.add_argument("--params", type=int, default=100, help="param-key vocabulary size")
+    parser.add_argument("--tags-per-capability", type=int, default=3)
+    parser.add_argument("--params-per-capability", type=int, default=2)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="zipf")
+    parser.add_argument("--match-rate", type=float, default=0.8)
+    parser.add_argument("--cache-size", type=int, default=1024, help="ranking cache size (0 disables)")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--memory-intents", type=int, default=100, help="intents replayed under tracemalloc")
+    parser.add_argument("--metrics", action="store_true", help="run with stage instrumentation on")
+    parser.add_argument("--shards", type=int, default=0, help="rank with a ShardedRegistry of N processes")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    args = parser.parse_args()
+
+    config = {key: value for key, value in vars(args).items() if key != "json"}
+    results = []
+    print(f"{'case':<22} {'caps':>7} {'p50 us':>9} {'p99 us':>9} {'ops/s':>10} {'peak KiB':>9}")
+    for capabilities in args.capabilities:
+        workload = Workload(
+            capabilities=capabilities,
+            tags=args.tags,
+            params=args.params,
+            tags_per_capability=args.tags_per_capability,
+            params_per_capability=args.params_per_capability,
+            distribution=args.distribution,
+            match_rate=args.match_rate,
+            seed=args.seed,
+        )
+        intents = list(workload.intents(args.intents))
+        for case in args.cases:
+            # A fresh solver per case, so no case inherits another's warm cache.
+            solver = build_solver(workload, args.cache_size, args.metrics, args.shards)
+            measured = run_case(case, solver, intents, args.warmup, args.memory_intents)
+            if args.shards:
+                solver.registry.close()
+            row: Dict[str, Any] = {"case": case, "capabilities": capabilities, **measured}
+            results.append(row)
+            print(
+                f"{case:<22} {capabilities:>7} {row['p50_us']:>9.1f} {row['p99_us']:>9.1f} "
+                f"{row['ops_per_sec']:>10.0f} {row['peak_kib']:>9.1f}"
+            )
+    if args.json:
+        report = {
+            "benchmark": "suite",
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "config": config,
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
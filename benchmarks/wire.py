@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.codec import (
+    FORMAT_MSGPACK,
+    MIME_FRAMES,
+    MIME_JSON,
+    MIME_MSGPACK,
+    dumps,
+    frame,
+    intent_to_record,
+    iter_frames,
+    loads,
+    msgpack_module,
+)
+from src.intents import Intent
+
+from .suite import build_solver
+from .workload import DISTRIBUTIONS, Workload
+
+
+# Bytes and CPU per intent of the solve API's wire formats:
+#
+#   python -m benchmarks.wire
+#   python -m benchmarks.wire --explain 5 --json wire.json
+#
+# Every format solves the same intents through the Flask test client. For
+# each it reports request and response bytes per intent, the CPU spent
+# encoding and decoding on both sides (`codec us`, measured apart from the
+# request), and process CPU per intent for the whole request (`cpu us`,
+# client and server together, since the test client runs in-process).
+# Formats needing msgpack are skipped when it is not installed.
+
+# name -> (batch?, request type, response type, query string, records?)
+FORMATS: Dict[str, Tuple[bool, str, str, str, bool]] = {
+    "json": (False, MIME_JSON, MIME_JSON, "", False),
+    "msgpack": (False, MIME_MSGPACK, MIME_MSGPACK, "", False),
+    "msgpack_records": (False, MIME_MSGPACK, MIME_MSGPACK, "", True),
+    "msgpack_compact": (False, MIME_MSGPACK, MIME_MSGPACK, "?ids=1&echo=0", True),
+    "batch_json": (True, MIME_JSON, MIME_JSON, "", False),
+    "batch_frames": (True, MIME_FRAMES, MIME_FRAMES, "", True),
+    "batch_frames_compact": (True, MIME_FRAMES, MIME_FRAMES, "?ids=1&echo=0", True),
+}
+
+
+def encode(document: Any, mimetype: str) -> bytes:
+    if mimetype == MIME_JSON:
+        return json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if mimetype == MIME_FRAMES:
+        return b"".join(frame(dumps(item, FORMAT_MSGPACK)) for item in document)
+    return dumps(document, FORMAT_MSGPACK)
+
+
+def decode(data: bytes, mimetype: str) -> Any:
+    if mimetype == MIME_JSON:
+        return json.loads(data)
+    if mimetype == MIME_FRAMES:
+        return [loads(payload, FORMAT_MSGPACK) for payload in iter_frames(data)]
+    return loads(data, FORMAT_MSGPACK)
+
+
+def request_documents(intents: List[Intent], records: bool, explain: int, tag_ids: Optional[Dict[str, int]]) -> List[Any]:
+    documents = []
+    for intent in intents:
+        tags: List[Any] = list(intent.tags or [])
+        if tag_ids is not None:
+            tags = [tag_ids.get(tag, tag) for tag in tags]
+        if records:
+            document: Any = intent_to_record(Intent(name=intent.name, params=intent.params, tags=tags))
+        else:
+            document = {"name": intent.name, "params": intent.params, "tags": tags}
+        if explain and not records:
+            document["explain"] = explain
+        documents.append(document)
+    return documents
+
+
+def run_format(client: Any, name: str, intents: List[Intent], batch_size: int, explain: int, tag_ids: Dict[str, int]) -> Dict[str, Any]:
+    batch, request_type, response_type, query, records = FORMATS[name]
+    if explain and (batch or records):
+        return {"format": name, "skipped": "explain needs keyed single requests"}
+    documents = request_documents(intents, records, explain, tag_ids if "ids=1" in query else None)
+    path = ("/api/solve/batch" if batch else "/api/solve") + query
+    headers = {"Accept": response_type}
+    if batch:
+        bodies = [documents[i : i + batch_size] for i in range(0, len(documents), batch_size)]
+    else:
+        bodies = documents
+
+    def post(body: Any) -> bytes:
+        response = client.post(path, data=encode(body, request_type), content_type=request_type, headers=headers)
+        data = response.get_data()
+        response.close()
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code} for {name}")
+        return data
+
+    responses = [post(body) for body in bodies[:3]]  # warm-up
+    gc.collect()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    responses = [post(body) for body in bodies]
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    request_bytes = sum(len(encode(body, request_type)) for body in bodies)
+    response_bytes = sum(len(data) for data in responses)
+
+    # Serialization alone: encode + decode of every request and response
+    decoded = [decode(data, response_type) for data in responses]
+    codec_cpu = time.process_time()
+    for body, out in zip(bodies, decoded):
+        decode(encode(body, request_type), request_type)
+        decode(encode(out, response_type), response_type)
+    codec_cpu = time.process_time() - codec_cpu
+
+    count = len(intents)
+    return {
+        "format": name,
+        "request_bytes": request_bytes / count,
+        "response_bytes": response_bytes / count,
+        "codec_us": codec_cpu / count * 1e6,
+        "cpu_us": cpu / count * 1e6,
+        "intents_per_sec": count / wall if wall else 0.0,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Solve API wire-format benchmark")
+    parser.add_argument("--capabilities", type=int, default=1000)
+    parser.add_argument("--intents", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100, help="intents per batch request")
+    parser.add_argument("--explain", type=int, default=0, metavar="K", help="ask single solves for the top-K ranking")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="zipf")
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="also write results as JSON")
+    args = parser.parse_args()
+
+    from src import web
+
+    workload = Workload(capabilities=args.capabilities, distribution=args.distribution, seed=args.seed)
+    intents = list(workload.intents(args.intents))
+    solver = build_solver(workload, cache_size=1024)
+    web.solver.registry = solver.registry
+    web.solver._handlers = solver._handlers
+    web.solver.metrics = None
+    web.metrics = None
+    client = web.app.test_client()
+    # Warm the ranking cache so the first format does not pay for it
+    for intent in intents:
+        solver.solve(intent)
+    symbols = web.current_symbols()
+    tag_ids = {tag: position for position, tag in enumerate(symbols.tags)}
+
+    results = []
+    print(f"{'format':<22} {'req B':>7} {'resp B':>7} {'codec us':>9} {'cpu us':>8} {'intents/s':>10}")
+    for name in args.formats:
+        if FORMATS[name][1] != MIME_JSON and msgpack_module() is None:
+            row: Dict[str, Any] = {"format": name, "skipped": "msgpack is not installed"}
+        else:
+            row = run_format(client, name, intents, args.batch_size, args.explain, tag_ids)
+        results.append(row)
+        if "skipped" in row:
+            print(f"{name:<22} skipped: {row['skipped']}")
+            continue
+        print(
+            f"{name:<22} {row['request_bytes']:>7.1f} {row['response_bytes']:>7.1f} {row['codec_us']:>9.2f} "
+            f"{row['cpu_us']:>8.1f} {row['intents_per_sec']:>10.0f}"
+        )
+
+    if args.json:
+        report = {
+            "benchmark": "wire",
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "config": {key: value for key, value in vars(args).items() if key != "json"},
+            "results": results,
+        }
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+            fh.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
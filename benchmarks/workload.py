@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import random
+from typing import Iterator, List
+
+from src.intents import Capability, Intent
+
+
+# Synthetic catalogs and intent streams for the benchmarks.
+#
+# Tags and param keys are drawn from fixed vocabularies, either uniformly or
+# with a Zipf-like skew (a few popular tags shared by many capabilities, a
+# long tail of rare ones), which is what stresses the inverted index.
+
+DISTRIBUTIONS = ("uniform", "zipf")
+
+
+def _weights(size: int, distribution: str) -> List[float]:
+    if distribution == "uniform":
+        return [1.0] * size
+    if distribution == "zipf":
+        return [1.0 / (rank + 1) for rank in range(size)]
+    raise ValueError(f"unknown distribution {distribution!r}; expected one of {DISTRIBUTIONS}")
+
+
+def _draw(rnd: random.Random, vocabulary: List[str], weights: List[float], count: int) -> List[str]:
+    """`count` distinct words drawn with the given weights."""
+    count = min(count, len(vocabulary))
+    chosen: List[str] = []
+    seen = set()
+    while len(chosen) < count:
+        word = rnd.choices(vocabulary, weights)[0]
+        if word not in seen:
+            seen.add(word)
+            chosen.append(word)
+    return chosen
+
+
+class Workload:
+    """Reproducible catalog plus intent stream.
+
+    Args:
+        capabilities: Number of capabilities in the catalog.
+        tags: Size of the tag vocabulary.
+        params: Size of the param-key vocabulary.
+        tags_per_capability: Tags accepted by each capability.
+        params_per_capability: Params required by each capability.
+        distribution: How tags and params are drawn: "uniform" or "zipf".
+        match_rate: Share of intents built around an existing capability;
+            the rest get random tags and params and may match nothing.
+        seed: Random seed; the same arguments always give the same workload.
+    """
+
+    def __init__(
+        self,
+        capabilities: int = 1000,
+        tags: int = 200,
+        params: int = 100,
+        tags_per_capability: int = 3,
+        params_per_capability: int = 2,
+        distribution: str = "zipf",
+        match_rate: float = 0.8,
+        seed: int = 7,
+    ) -> None:
+        self.capabilities = capabilities
+        self.tag_words = [f"tag{i}" for i in range(tags)]
+        self.param_words = [f"param{i}" for i in range(params)]
+        self.tags_per_capability = tags_per_capability
+        self.params_per_capability = params_per_capability
+        self.distribution = distribution
+        self.match_rate = match_rate
+        self.seed = seed
+        self._tag_weights = _weights(tags, distribution)
+        self._param_weights = _weights(params, distribution)
+
+    def catalog(self) -> List[Capability]:
+        rnd = random.Random(self.seed)
+        return [
+            Capability(
+                name=f"cap{i}",
+                accepts_tags=_draw(rnd, self.tag_words, self._tag_weights, self.tags_per_capability),
+                required_params=_draw(rnd, self.param_words, self._param_weights, self.params_per_capability),
+            )
+            for i in range(self.capabilities)
+        ]
+
+    def intents(self, count: int) -> Iterator[Intent]:
+        """Yield `count` intents; a fresh call yields the same stream again."""
+        rnd = random.Random(self.seed + 1)
+        catalog = self.catalog()
+        for i in range(count):
+            if catalog and rnd.random() < self.match_rate:
+                target = rnd.choice(catalog)
+                tags = rnd.sample(target.accepts_tags, rnd.randint(1, len(target.accepts_tags)))
+                keys = list(target.required_params)
+                # Some intents miss a required param, some carry an extra one.
+                if keys and rnd.random() < 0.2:
+                    keys.pop(rnd.randrange(len(keys)))
+                if rnd.random() < 0.2:
+                    keys += _draw(rnd, self.param_words, self._param_weights, 1)
+            else:
+                tags = _draw(rnd, self.tag_words, self._tag_weights, self.tags_per_capability)
+                keys = _draw(rnd, self.param_words, self._param_weights, self.params_per_capability)
+            yield Intent(name=f"intent{i}", params={key: i for key in keys}, tags=tags)
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+
+
+class Rejected(Exception):
+    """Raised when a request is shed; `retry_after` is a hint in seconds."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def retry_after_header(self) -> str:
+        """`Retry-After` value: whole seconds, at least 1."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Take one token; returns 0.0, or the seconds until one is available."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return 0.0
+        return (1.0 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Token bucket per client key.
+
+    Buckets of the `max_clients` most recently seen clients are kept; a
+    client evicted from that LRU comes back with a full bucket.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        max_clients: int = 10000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_clients = max(1, max_clients)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self.limited = 0
+
+    def check(self, client: Hashable) -> None:
+        """Spend one of `client`'s tokens or raise `Rejected`."""
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client)
+            wait = bucket.take(now)
+            if wait > 0.0:
+                self.limited += 1
+        if wait > 0.0:
+            raise Rejected("rate_limited", wait)
+
+
+class AdmissionController:
+    """Bounded admission queue in front of request handling.
+
+    At most `max_concurrent` requests run at once; up to `max_queue` more
+    wait for a slot in arrival order. A request is shed (`Rejected`) when the
+    queue is full, or when it has waited `queue_timeout` seconds without
+    getting a slot: past that budget it is cheaper for the client to retry
+    than for the server to keep it waiting.
+
+    `Retry-After` hints are the expected time to drain the current queue,
+    from a moving average of how long admitted requests hold their slot.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._service_time = 0.0
+        self._counts = {"admitted": 0, "queue_full": 0, "queue_timeout": 0}
+
+    def _retry_after(self) -> float:
+        return self._service_time * (self._waiting + 1) / self.max_concurrent
+
+    def acquire(self) -> float:
+        """Wait for a slot; returns the time spent queued (seconds).
+
+        Every successful `acquire` must be paired with a `release`.
+        """
+        with self._cond:
+            start = self._clock()
+            if self._active >= self.max_concurrent or self._waiting:
+                if self._waiting >= self.max_queue:
+                    self._counts["queue_full"] += 1
+                    raise Rejected("queue_full", self._retry_after())
+                self._waiting += 1
+                try:
+                    while self._active >= self.max_concurrent:
+                        remaining = start + self.queue_timeout - self._clock()
+                        if remaining <= 0:
+                            self._counts["queue_timeout"] += 1
+                            raise Rejected("queue_timeout", self._retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+            self._active += 1
+            self._counts["admitted"] += 1
+            return self._clock() - start
+
+    def release(self, held: float = 0.0) -> None:
+        """Free a slot; `held` is how long it was used, for `Retry-After` hints."""
+        with self._cond:
+            self._active -= 1
+            self._service_time += 0.2 * (held - self._service_time)
+            self._cond.notify()
+
+    def stats(self) -> Dict[str, int]:
+        """Current in-flight and queued requests, and admitted/shed counters."""
+        with self._cond:
+            return {"in_flight": self._active, "queued": self._waiting, **self._counts}
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Mapping, Optional, Sequence, Set, Tuple
+
+
+def normalize(name: str) -> str:
+    """Lookup key of an intent name: case-folded, whitespace collapsed."""
+    return " ".join(name.casefold().split())
+
+
+def trigrams(key: str) -> Set[str]:
+    """Character trigrams of a normalized key, padded so short keys have some."""
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class AliasResolver:
+    """Maps free-form intent names to tags.
+
+    Exact lookups are one dict probe on the normalized name. Fuzzy matching
+    is opt-in (`resolve(name, fuzzy=True)`), since a near-miss name resolved
+    to the wrong alias runs the wrong capability. It compares character
+    trigrams: the alias with the highest Dice similarity
+    (2·shared / (|a| + |b|)) wins if it reaches `min_similarity`; ties go to
+    the alias added first. Names shorter than `min_fuzzy_length` characters
+    are only ever matched exactly.
+
+    Aliases are indexed by trigram. An alias reaching the threshold shares
+    at least a known number of trigrams with the name, so it must appear in
+    the posting lists of the name's rarest trigrams (prefix filtering);
+    only those lists are scanned, skipping aliases whose trigram count makes
+    the threshold unreachable, and the candidates found are then scored
+    exactly. This keeps lookups fast with tens of thousands of aliases.
+    Fuzzy results are kept in an LRU of up to `cache_size` names, cleared
+    when an alias is added.
+    """
+
+    def __init__(
+        self,
+        aliases: Optional[Mapping[str, Sequence[str]]] = None,
+        min_similarity: float = 0.8,
+        min_fuzzy_length: int = 5,
+        cache_size: int = 4096,
+    ) -> None:
+        if not 0.0 < min_similarity <= 1.0:
+            raise ValueError("min_similarity must be in (0, 1]")
+        self.min_similarity = min_similarity
+        self.min_fuzzy_length = max(1, min_fuzzy_length)
+        self._names: List[str] = []
+        self._tags: List[Tuple[str, ...]] = []
+        self._grams: List[FrozenSet[str]] = []  # trigrams per alias
+        self._sizes: List[int] = []
+        self._ids: Dict[str, int] = {}  # normalized name -> alias id
+        self._index: Dict[str, List[int]] = {}  # trigram -> alias ids
+        self._lock = threading.Lock()
+        self._cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[str, Optional[int]]" = OrderedDict()
+        self._version = 0  # bumped by `add`; results computed before it are not cached
+        if aliases:
+            self.update(aliases)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and normalize(name) in self._ids
+
+    def add(self, alias: str, tags: Sequence[str]) -> None:
+        """Map `alias` to `tags`; adding an existing alias replaces its tags."""
+        key = normalize(alias)
+        if not key:
+            raise ValueError("alias must not be empty")
+        with self._lock:
+            existing = self._ids.get(key)
+            if existing is not None:
+                self._tags[existing] = tuple(tags)
+                return
+            self._version += 1
+            alias_id = len(self._names)
+            grams = frozenset(trigrams(key))
+            self._names.append(key)
+            self._tags.append(tuple(tags))
+            self._grams.append(grams)
+            self._sizes.append(len(grams))
+            self._ids[key] = alias_id
+            for gram in grams:
+                self._index.setdefault(gram, []).append(alias_id)
+            self._cache.clear()
+
+    def update(self, aliases: Mapping[str, Sequence[str]]) -> None:
+        for alias, tags in aliases.items():
+            self.add(alias, tags)
+
+    def aliases(self) -> List[Tuple[str, List[str]]]:
+        return [(name, list(tags)) for name, tags in zip(self._names, self._tags)]
+
+    def lookup(self, name: str) -> Optional[List[str]]:
+        """Tags of the alias `name` exactly (after normalization), or None."""
+        alias_id = self._ids.get(normalize(name))
+        return None if alias_id is None else list(self._tags[alias_id])
+
+    def match(self, name: str) -> Optional[Tuple[str, float]]:
+        """The alias `name` resolves to and its similarity (1.0 if exact), or None."""
+        key = normalize(name)
+        alias_id = self._ids.get(key)
+        if alias_id is not None:
+            return self._names[alias_id], 1.0
+        alias_id = self._fuzzy(key)
+        if alias_id is None:
+            return None
+        return self._names[alias_id], self._similarity(key, alias_id)
+
+    def resolve(self, name: str, fuzzy: bool = False) -> List[str]:
+        """Tags for an intent name; [] when no alias matches.
+
+        Only exact aliases match unless `fuzzy` is set.
+        """
+        key = normalize(name)
+        alias_id = self._ids.get(key)
+        if alias_id is None and fuzzy:
+            alias_id = self._fuzzy(key)
+        return [] if alias_id is None else list(self._tags[alias_id])
+
+    def _similarity(self, key: str, alias_id: int) -> float:
+        grams = trigrams(key)
+        shared = len(grams & self._grams[alias_id])
+        return 2.0 * shared / (len(grams) + self._sizes[alias_id])
+
+    def _fuzzy(self, key: str) -> Optional[int]:
+        if len(key) < self.min_fuzzy_length:
+            return None
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            version = self._version
+        alias_id = self._best_match(key)
+        if self._cache_size:
+            with self._lock:
+                if version != self._version:
+                    return alias_id
+                self._cache[key] = alias_id
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return alias_id
+
+    def _best_match(self, key: str) -> Optional[int]:
+        grams = trigrams(key)
+        size = len(grams)
+        threshold = self.min_similarity
+        # Dice >= t needs t/(2-t)·n <= m <= (2-t)/t·n for trigram counts n, m
+        low = threshold * size / (2.0 - threshold)
+        high = (2.0 - threshold) * size / threshold
+        # ...and at least `overlap` shared trigrams, so every such alias is in
+        # one of the posting lists of the name's `size - overlap + 1` rarest
+        overlap = max(1, math.ceil(threshold * (size + low) / 2.0 - 1e-9))
+        if overlap > size:
+            return None
+        index = self._index
+        rarest = sorted(grams, key=lambda gram: len(index.get(gram, ())))[: size - overlap + 1]
+        sizes = self._sizes
+        seen: Dict[int, int] = {}
+        for gram in rarest:
+            for alias_id in index.get(gram, ()):
+                if low <= sizes[alias_id] <= high:
+                    seen[alias_id] = seen.get(alias_id, 0) + 1
+        # A candidate shares at most its prefix hits plus the unscanned trigrams
+        unscanned = size - len(rarest)
+        best: Optional[int] = None
+        best_score = threshold
+        all_grams = self._grams
+        for alias_id, hits in seen.items():
+            if 2.0 * (hits + unscanned) < best_score * (size + sizes[alias_id]):
+                continue
+            score = 2.0 * len(grams & all_grams[alias_id]) / (size + sizes[alias_id])
+            if score > best_score or (score == best_score and (best is None or alias_id < best)):
+                best, best_score = alias_id, score
+        return best
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .intents import Intent
+from .solver import DeadlineExceededError
+from .service import MAX_BATCH_SIZE, intent_from_payload, solver, store
+
+
+# Minimal ASGI variant of the JSON API in `src/web.py`. It shares the solver,
+# capability store and payload parsing with the Flask app (`src/service.py`)
+# without importing Flask, and solves on the event loop so many in-flight
+# intents with async handlers can share one worker:
+#
+#   uvicorn src.asgi:app --host 0.0.0.0 --port 8000
+#
+# Requests still queued when the client disconnects are cancelled.
+
+# Upper bound on intents solved concurrently by this process
+MAX_IN_FLIGHT = int(os.getenv("ASGI_MAX_IN_FLIGHT", "1000"))
+
+_in_flight: Optional[asyncio.Semaphore] = None
+
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _limiter() -> asyncio.Semaphore:
+    global _in_flight
+    if _in_flight is None:
+        _in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+    return _in_flight
+
+
+async def _read_body(receive: Receive) -> Tuple[bytes, bool]:
+    """Return the request body and whether the client disconnected."""
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return b"", True
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks), False
+
+
+async def _send_json(send: Send, status: int, payload: Any) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _solve_one(intent: Intent, data: Dict[str, Any]) -> Dict[str, Any]:
+    explain = data.get("explain")
+    async with _limiter():
+        if explain:
+            k = None
+            if isinstance(explain, int) and not isinstance(explain, bool):
+                k = max(1, explain)
+            explained = await solver.asolve_with_explain(intent, k=k)
+            return {"intent": intent.to_dict(), **explained}
+        result = await solver.asolve(intent)
+        return {"intent": intent.to_dict(), "result": result}
+
+
+async def _solve_batch(data: List[Any]) -> List[Dict[str, Any]]:
+    """Solve batch entries (objects or positional records, as in `src/web.py`).
+
+    Malformed entries get an error in their own slot.
+    """
+    slots: List[Dict[str, Any]] = []
+    intents: List[Intent] = []
+    for item in data:
+        if not isinstance(item, (dict, list)):
+            slots.append(
+                {"intent": None, "result": None, "chosen_capability": None, "error": "intent must be an object or a record"}
+            )
+            continue
+        try:
+            intent = intent_from_payload(item)
+        except (TypeError, ValueError) as exc:
+            slots.append({"intent": None, "result": None, "chosen_capability": None, "error": f"invalid intent: {exc}"})
+            continue
+        intents.append(intent)
+        slots.append({"intent": intent.to_dict()})
+    outcomes = iter(await solver.asolve_many(intents))
+    for slot in slots:
+        if "error" not in slot:
+            slot.update(next(outcomes))
+    return slots
+
+
+async def _watch_disconnect(receive: Receive) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def _handle(data: Any, path: str) -> Tuple[int, Any]:
+    if path == "/api/solve":
+        if not isinstance(data, dict):
+            data = {}
+        try:
+            intent = intent_from_payload(data)
+        except (TypeError, ValueError) as exc:
+            return 400, {"error": f"invalid intent: {exc}"}
+        try:
+            return 200, await _solve_one(intent, data)
+        except DeadlineExceededError as exc:
+            return 504, {"error": str(exc)}
+    if not isinstance(data, list):
+        return 400, {"error": "expected a JSON array of intents"}
+    if len(data) > MAX_BATCH_SIZE:
+        return 400, {"error": f"batch exceeds {MAX_BATCH_SIZE} intents"}
+    async with _limiter():
+        results = await _solve_batch(data)
+    return 200, {"results": results}
+
+
+async def app(scope: Dict[str, Any], receive: Receive, send: Send) -> None:
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Follow runtime capability changes (CAPABILITY_LOG) like the Flask workers
+                store.start_polling()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    path = scope.get("path", "")
+    if path not in ("/api/solve", "/api/solve/batch"):
+        await _send_json(send, 404, {"error": "not found"})
+        return
+    if scope.get("method") != "POST":
+        await _send_json(send, 405, {"error": "method not allowed"})
+        return
+
+    body, disconnected = await _read_body(receive)
+    if disconnected:
+        return
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        data = None
+
+    # Cancel the solve (and any running coroutine handlers) if the client goes away
+    work = asyncio.ensure_future(_handle(data, path))
+    watcher = asyncio.ensure_future(_watch_disconnect(receive))
+    done, _ = await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    if work not in done:
+        work.cancel()
+        return
+    watcher.cancel()
+    status, payload = work.result()
+    await _send_json(send, status, payload)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .intents import Capability, IntentRegistry
+from .solver import Solver
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+
+logger = logging.getLogger(__name__)
+
+
+class CapabilityLog:
+    """Append-only JSON-lines log of capability changes shared between processes.
+
+    Each line is `{"op": "add", "capability": {...}}` or
+    `{"op": "remove", "name": ...}`. Appends take an exclusive `flock` where
+    available, and readers only consume complete lines, so every process sees
+    the same changes in the same order.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(self.path, "ab") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                fh.write(line)
+                fh.flush()
+                os.fsync(fh.fileno())
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def size(self) -> int:
+        try:
+            return os.stat(self.path).st_size
+        except FileNotFoundError:
+            return 0
+
+    def read_from(self, offset: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Return entries after byte `offset` and the offset to resume from.
+
+        A trailing line without its newline (an append in progress) is left
+        for the next read. Complete lines that are not a JSON object are
+        skipped with a warning, so one bad line cannot stall the readers.
+        """
+        try:
+            with open(self.path, "rb") as fh:
+                fh.seek(offset)
+                data = fh.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        entries: List[Dict[str, Any]] = []
+        position = offset
+        for line in data[:end].splitlines(keepends=True):
+            if line.strip():
+                try:
+                    entry = json.loads(line)
+                    if not isinstance(entry, dict):
+                        raise ValueError("entry is not a JSON object")
+                except ValueError as exc:
+                    logger.warning("skipping bad capability log line at %s:%d: %s", self.path, position, exc)
+                else:
+                    entries.append(entry)
+            position += len(line)
+        return entries, offset + end
+
+
+def capability_to_dict(capability: Capability) -> Dict[str, Any]:
+    return {
+        "name": capability.name,
+        "accepts_tags": list(capability.accepts_tags),
+        "required_params": list(capability.required_params),
+    }
+
+
+def capability_from_dict(data: Dict[str, Any]) -> Capability:
+    name = data.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError("capability name is required")
+    tags = data.get("accepts_tags", [])
+    params = data.get("required_params", [])
+    if not isinstance(tags, list) or not isinstance(params, list):
+        raise ValueError("accepts_tags and required_params must be lists")
+    return Capability(name=name, accepts_tags=[str(t) for t in tags], required_params=[str(p) for p in params])
+
+
+class RegistryStore:
+    """Copy-on-write registry versions published to a `Solver`.
+
+    Every change builds a new registry from the current one
+    (`IntentRegistry.with_capability` / `without_capability`) and then swaps
+    `solver.registry` in one assignment. Solves that already hold the old
+    registry finish on it, so readers never wait on a writer. Writers are
+    serialized by a lock.
+
+    With a `CapabilityLog`, changes are appended to the log and every process
+    applies the log in order: on `sync()`, which the writer calls right after
+    appending, and from a background poller that only stats the file between
+    changes.
+    """
+
+    def __init__(self, solver: Solver, log: Optional[CapabilityLog] = None, poll_interval: float = 0.5) -> None:
+        self.solver = solver
+        self.log = log
+        self.poll_interval = poll_interval
+        self.version = 0
+        self._offset = 0
+        self._write_lock = threading.Lock()
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def registry(self) -> IntentRegistry:
+        return self.solver.registry
+
+    def _apply(self, registry: IntentRegistry, entry: Dict[str, Any]) -> IntentRegistry:
+        if entry.get("op") == "add":
+            return registry.with_capability(capability_from_dict(entry["capability"]))
+        if entry.get("op") == "remove":
+            return registry.without_capability(str(entry["name"]))
+        return registry
+
+    def _publish(self, entries: List[Dict[str, Any]]) -> None:
+        registry = self.solver.registry
+        for entry in entries:
+            try:
+                registry = self._apply(registry, entry)
+            except (KeyError, TypeError, ValueError) as exc:
+                logger.warning("skipping invalid capability log entry %r: %s", entry, exc)
+                continue
+            self.version += 1
+        if entries:
+            self.solver.registry = registry
+
+    def sync(self) -> int:
+        """Apply log entries written since the last sync; returns how many."""
+        if self.log is None:
+            return 0
+        with self._write_lock:
+            return self._sync_locked()
+
+    def _sync_locked(self) -> int:
+        assert self.log is not None
+        if self.log.size() <= self._offset:
+            return 0
+        entries, self._offset = self.log.read_from(self._offset)
+        self._publish(entries)
+        return len(entries)
+
+    def _change(self, entry: Dict[str, Any]) -> None:
+        with self._write_lock:
+            if self.log is None:
+                self._publish([entry])
+            else:
+                self.log.append(entry)
+                self._sync_locked()
+
+    def add(self, capability: Capability) -> None:
+        self._change({"op": "add", "capability": capability_to_dict(capability)})
+
+    def remove(self, name: str) -> bool:
+        if name not in self.solver.registry.capability_names():
+            return False
+        self._change({"op": "remove", "name": name})
+        return True
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.sync()
+            except OSError:
+                # An unreadable log is retried on the next poll.
+                continue
+
+    def start_polling(self) -> None:
+        """Start the background poller once per process (call after forking)."""
+        if self.log is None or self._poller is not None:
+            return
+        self._poller = threading.Thread(target=self._poll, name="capability-log", daemon=True)
+        self._poller.start()
+
+    def stop_polling(self) -> None:
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
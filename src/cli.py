@@ -1,21 +1,60 @@
 from __future__ import annotations
 
 import argparse
+import itertools
 import json
-from typing import Any, Dict, List
+import sys
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 
+from . import daemon
 from .intents import Intent
-from .solver import default_registry_and_solver
+
+# The solver (asyncio, thread and process pools) is only imported when an
+# intent is solved in-process, so calls answered by the daemon stay cheap.
+if TYPE_CHECKING:
+    from .aliases import AliasResolver
+    from .solver import Solver
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Intent-centric demo CLI")
-    parser.add_argument("name", help="Intent name, e.g. transfer or notify")
+    parser.add_argument("name", nargs="?", help="Intent name, e.g. transfer or notify")
     parser.add_argument("--param", action="append", default=[], help="key=value param (repeatable)")
     parser.add_argument("--tag", action="append", default=[], help="tag label (repeatable)")
     parser.add_argument("--json", action="store_true", help="output result as JSON")
     parser.add_argument("--explain", action="store_true", help="show capability ranking and breakdown")
-    return parser.parse_args()
+    parser.add_argument(
+        "--explain-k",
+        "--top",
+        dest="explain_k",
+        type=int,
+        metavar="K",
+        help="limit the ranking to the top K capabilities (implies --explain; default 5, full ranking with --json)",
+    )
+    parser.add_argument(
+        "--jsonl",
+        metavar="PATH",
+        help="solve intents read as JSON lines from PATH ('-' for stdin), writing one JSON result per line",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="handler threads for --jsonl (default 1)")
+    parser.add_argument("--chunk-size", type=int, default=512, help="intents held in memory at once for --jsonl")
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="solver daemon socket (default: $INTENT_DAEMON_SOCKET or a per-user temp path)",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="always solve in-process, even when a daemon (python -m src.daemon) is running",
+    )
+    args = parser.parse_args()
+    if args.explain_k is not None:
+        args.explain_k = max(1, args.explain_k)
+        args.explain = True
+    if args.name is None and args.jsonl is None:
+        parser.error("an intent name or --jsonl is required")
+    return args
 
 
 def parse_params(param_items: List[str]) -> Dict[str, Any]:
@@ -37,45 +76,144 @@ def parse_params(param_items: List[str]) -> Dict[str, Any]:
     return params
 
 
+def read_jsonl(lines: Iterable[str], aliases: AliasResolver) -> Iterator[Tuple[Optional[Intent], Optional[str]]]:
+    """Lazily turn JSON lines into (intent, None) or (None, error); blank lines are skipped.
+
+    Intents without tags get the tags `aliases` resolves their name to.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError("intent must be a JSON object")
+            name = str(data.get("name", ""))
+            tags = list(data.get("tags") or []) or aliases.resolve(name)
+            intent = Intent(name=name, params=dict(data.get("params", {})), tags=tags)
+            intent.priority = int(data.get("priority", 0))
+        except (TypeError, ValueError) as exc:
+            yield None, f"line {number}: {exc}"
+            continue
+        yield intent, None
+
+
+def explain_outcome(solver: Solver, intent: Intent, k: Optional[int]) -> Dict[str, Any]:
+    """`solve_with_explain` for one JSONL line, capturing a handler error like `solve_many`."""
+    from .solver import describe_error
+
+    try:
+        return {**solver.solve_with_explain(intent, k=k), "error": None}
+    except Exception as exc:
+        return {"result": None, "chosen_capability": None, "error": describe_error(exc)}
+
+
+def solve_jsonl(
+    solver: Solver,
+    items: Iterator[Tuple[Optional[Intent], Optional[str]]],
+    out: TextIO,
+    explain: bool = False,
+    explain_k: Optional[int] = None,
+    workers: int = 1,
+    chunk_size: int = 512,
+) -> int:
+    """Solve intents chunk by chunk, writing results in input order; returns the count.
+
+    With `explain` each result carries the ranking, limited to the top
+    `explain_k` entries when that is given.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    count = 0
+    workers = max(1, workers)
+    # `solve_many` runs its own pool per chunk; explain mode needs one here
+    pool = ThreadPoolExecutor(max_workers=workers) if explain else None
+    try:
+        while True:
+            chunk = list(itertools.islice(items, max(1, chunk_size)))
+            if not chunk:
+                return count
+            intents = [intent for intent, _ in chunk if intent is not None]
+            if pool is not None:
+                outcomes: Iterator[Dict[str, Any]] = pool.map(
+                    lambda i: explain_outcome(solver, i, explain_k), intents
+                )
+            else:
+                outcomes = iter(solver.solve_many(intents, max_workers=workers))
+            for intent, error in chunk:
+                if intent is None:
+                    payload: Dict[str, Any] = {
+                        "intent": None, "result": None, "chosen_capability": None, "error": error,
+                    }
+                else:
+                    payload = {"intent": intent.to_dict(), **next(outcomes)}
+                out.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                count += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
 def main() -> int:
     args = parse_args()
     params = parse_params(args.param)
 
-    registry, solver = default_registry_and_solver()
+    if args.jsonl is not None:
+        from .solver import default_registry_and_solver
 
-    # map common aliases to tags
-    alias_to_tags = {
-        "transfer": ["transfer", "payment"],
-        "pay": ["transfer", "payment"],
-        "notify": ["notify", "message"],
-        "message": ["notify", "message"],
-    }
+        registry, solver = default_registry_and_solver()
+        if args.jsonl == "-":
+            items = read_jsonl(sys.stdin, registry.aliases)
+            solve_jsonl(solver, items, sys.stdout, args.explain, args.explain_k, args.workers, args.chunk_size)
+        else:
+            with open(args.jsonl, encoding="utf-8") as fh:
+                items = read_jsonl(fh, registry.aliases)
+                solve_jsonl(solver, items, sys.stdout, args.explain, args.explain_k, args.workers, args.chunk_size)
+        return 0
 
-    intent = Intent(name=args.name, params=params, tags=(args.tag or alias_to_tags.get(args.name, [])))
+    # Without --tag, the solver side maps the name to tags (registry aliases)
+    intent = Intent(name=args.name, params=params, tags=(args.tag or []))
 
+    # "explain": True asks for the full ranking, an int for the top k
+    explain: Any = False
     if args.explain:
-        explained = solver.solve_with_explain(intent)
+        if args.explain_k is not None:
+            explain = args.explain_k
+        else:
+            explain = True if args.json else 5
+    message = {"intent": intent.to_dict(), "explain": explain}
+
+    # Forward to a running daemon, else solve here
+    payload = None if args.no_daemon else daemon.request(message, args.socket)
+    if payload is None:
+        from .solver import default_registry_and_solver
+
+        _, solver = default_registry_and_solver()
+        payload = daemon.answer(solver, message)
+    elif "error" in payload:
+        print(f"daemon error: {payload['error']}", file=sys.stderr)
+        return 1
+
+    if explain is not False:
         if args.json:
-            payload = {"intent": intent.to_dict(), **explained}
             print(json.dumps(payload, ensure_ascii=False))
         else:
-            result_text = explained.get("result")
-            chosen = explained.get("chosen_capability")
-            ranking = explained.get("ranking", [])
+            result_text = payload.get("result")
+            chosen = payload.get("chosen_capability")
+            ranking = payload.get("ranking", [])
             if result_text is None:
                 print("No capability found or handler missing for this intent.")
             else:
                 print(result_text)
             print("\nExplain:")
             print(f"  chosen: {chosen}")
-            for i, d in enumerate(ranking[:5], start=1):
+            for i, d in enumerate(ranking, start=1):
                 print(
                     f"  {i}. {d['capability']}: total={d['total']:.2f}, tags={d['tag_overlap']:.2f}, params={d['params_score']:.2f}"
                 )
     else:
-        result = solver.solve(intent)
+        result = payload.get("result")
         if args.json:
-            payload = {"intent": intent.to_dict(), "result": result}
             print(json.dumps(payload, ensure_ascii=False))
         else:
             if result is None:
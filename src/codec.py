@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from .intents import Capability, Intent
+
+
+# Compact encodings shared by the solve journal and the binary API.
+#
+# Intents travel as positional records, [name, params, tags, priority,
+# deadline] with trailing defaults dropped, instead of keyed dicts. Records
+# are serialized with msgpack when it is installed (optional dependency) and
+# as compact JSON otherwise; a one-byte format id says which, so readers
+# never guess.
+
+FORMAT_JSON = b"J"
+FORMAT_MSGPACK = b"M"
+
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+_msgpack: Any = None
+
+
+def msgpack_module() -> Optional[Any]:
+    """The msgpack module, imported on first use; None if not installed."""
+    global _msgpack
+    if _msgpack is None:
+        try:
+            import msgpack
+        except ImportError:
+            _msgpack = False
+        else:
+            _msgpack = msgpack
+    return _msgpack or None
+
+
+def default_format() -> bytes:
+    return FORMAT_MSGPACK if msgpack_module() is not None else FORMAT_JSON
+
+
+def dumps(value: Any, fmt: bytes) -> bytes:
+    if fmt == FORMAT_MSGPACK:
+        module = msgpack_module()
+        if module is None:
+            raise RuntimeError("msgpack is not installed")
+        return module.packb(value, use_bin_type=True, default=str)
+    if fmt == FORMAT_JSON:
+        return _JSON_ENCODER.encode(value).encode("utf-8")
+    raise ValueError(f"unknown format {fmt!r}")
+
+
+def loads(data: Any, fmt: bytes) -> Any:
+    """Decode bytes (or a memoryview) written by `dumps`."""
+    if fmt == FORMAT_MSGPACK:
+        module = msgpack_module()
+        if module is None:
+            raise RuntimeError("msgpack is not installed; cannot decode msgpack data")
+        return module.unpackb(data, raw=False)
+    if fmt == FORMAT_JSON:
+        return json.loads(bytes(data))
+    raise ValueError(f"unknown format {fmt!r}")
+
+
+# Defaults of the record fields after name and params (tags, priority, deadline)
+_RECORD_DEFAULTS = (None, None, None, 0, None)
+
+
+def intent_to_record(intent: Intent) -> List[Any]:
+    record: List[Any] = [intent.name, intent.params, intent.tags, intent.priority, intent.deadline]
+    while len(record) > 2 and record[-1] == _RECORD_DEFAULTS[len(record) - 1]:
+        record.pop()
+    return record
+
+
+def intent_from_record(record: List[Any]) -> Intent:
+    if not isinstance(record, list) or not record or not isinstance(record[0], str):
+        raise ValueError("intent record must be a list starting with the name")
+    return Intent(
+        name=record[0],
+        params=dict(record[1]) if len(record) > 1 and record[1] is not None else {},
+        tags=list(record[2]) if len(record) > 2 and record[2] is not None else None,
+        priority=int(record[3]) if len(record) > 3 and record[3] is not None else 0,
+        deadline=float(record[4]) if len(record) > 4 and record[4] is not None else None,
+    )
+
+
+# Solve API wire formats. JSON stays the default; msgpack bodies carry the
+# same documents. Frames carry a sequence of msgpack documents (batch
+# entries or results), each prefixed with its length as a little-endian u32,
+# so either side can start on the first one before the last has arrived.
+MIME_JSON = "application/json"
+MIME_MSGPACK = "application/msgpack"
+MIME_FRAMES = "application/x-intent-frames"
+_WIRE_FRAME = struct.Struct("<I")
+
+
+def frame(payload: bytes) -> bytes:
+    return _WIRE_FRAME.pack(len(payload)) + payload
+
+
+def iter_frames(data: bytes) -> Iterator[memoryview]:
+    """Payloads of length-prefixed frames; raises ValueError if one is truncated."""
+    view = memoryview(data)
+    offset = 0
+    while offset < len(view):
+        if offset + _WIRE_FRAME.size > len(view):
+            raise ValueError("truncated frame header")
+        (length,) = _WIRE_FRAME.unpack_from(view, offset)
+        start = offset + _WIRE_FRAME.size
+        if start + length > len(view):
+            raise ValueError("truncated frame")
+        yield view[start : start + length]
+        offset = start + length
+
+
+class Symbols:
+    """Interned ids for capability names and tags of one catalog.
+
+    Ids are positions in `capabilities` and `tags` (tags in first-seen order
+    over the capabilities), so every process serving the same catalog hands
+    out the same ids. `version` is a checksum of both lists that clients
+    send back to detect a changed catalog.
+    """
+
+    def __init__(self, capabilities: Sequence[Capability]) -> None:
+        self.capabilities: List[str] = [capability.name for capability in capabilities]
+        self.tags: List[str] = list(dict.fromkeys(tag for capability in capabilities for tag in capability.accepts_tags))
+        self._capability_ids: Dict[str, int] = {}
+        for position, name in enumerate(self.capabilities):
+            self._capability_ids.setdefault(name, position)
+        listing = "\0".join(self.capabilities) + "\1" + "\0".join(self.tags)
+        self.version = f"{zlib.crc32(listing.encode('utf-8')):08x}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": self.version, "capabilities": self.capabilities, "tags": self.tags}
+
+    def capability_id(self, name: Optional[str]) -> Optional[int]:
+        return None if name is None else self._capability_ids.get(name)
+
+    def tag(self, tag_id: int) -> str:
+        if not 0 <= tag_id < len(self.tags):
+            raise ValueError(f"unknown tag id {tag_id}")
+        return self.tags[tag_id]
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import socket
+import stat
+from typing import Any, Dict, Optional
+
+
+# Resident solver for the CLI:
+#
+#   python -m src.daemon &
+#   python -m src.cli transfer --param to=alice --param amount=10
+#
+# The daemon builds the default registry and solver once and answers intents
+# over a Unix socket, one JSON object per line each way. `src.cli` forwards
+# to it when the socket accepts connections and otherwise solves in-process,
+# so a CLI call only pays for its own small imports. This module's top level
+# stays light for that reason; the solver is imported by `serve` only.
+
+ENCODING = "utf-8"
+
+
+def default_socket_path() -> str:
+    """INTENT_DAEMON_SOCKET, else a per-user socket in the runtime/temp dir."""
+    configured = os.getenv("INTENT_DAEMON_SOCKET")
+    if configured:
+        return configured
+    directory = os.getenv("XDG_RUNTIME_DIR") or os.getenv("TMPDIR") or "/tmp"
+    user = os.getuid() if hasattr(os, "getuid") else os.getenv("USERNAME", "user")
+    return os.path.join(directory, f"intent-demo-{user}.sock")
+
+
+def owned_socket(path: str) -> bool:
+    """Whether `path` is a socket owned by the current user.
+
+    The default path lives in a shared temp directory, where another user
+    could create it first and receive every forwarded intent.
+    """
+    if not hasattr(os, "getuid"):
+        return True
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == os.getuid()
+
+
+def request(payload: Dict[str, Any], path: Optional[str] = None, timeout: float = 5.0) -> Optional[Dict[str, Any]]:
+    """Send one request to the daemon; None if no daemon answers on `path`.
+
+    Sockets not owned by the current user are never used (see `owned_socket`).
+    Any socket error (including `timeout` seconds without a reply) and an
+    empty or malformed reply also give None, so the caller solves in-process.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = path or default_socket_path()
+    if not owned_socket(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall(json.dumps(payload, ensure_ascii=False).encode(ENCODING) + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+        reply = json.loads(line)
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+    return reply if isinstance(reply, dict) else None
+
+
+def answer(solver: Any, message: Dict[str, Any]) -> Dict[str, Any]:
+    """Solve one request: {"intent": {...}, "explain": false | true | k}.
+
+    An intent without tags gets the tags its name resolves to in the
+    solver's registry aliases.
+    """
+    from .intents import Intent
+
+    intent = Intent(**message["intent"])
+    if not intent.tags:
+        intent.tags = solver.registry.aliases.resolve(intent.name)
+    explain = message.get("explain", False)
+    if explain is not False and explain is not None:
+        k = None if explain is True else max(1, int(explain))
+        return {"intent": intent.to_dict(), **solver.solve_with_explain(intent, k=k)}
+    return {"intent": intent.to_dict(), "result": solver.solve(intent)}
+
+
+def _listening(path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def serve(path: Optional[str] = None) -> None:
+    """Answer requests on `path` until interrupted or terminated.
+
+    A stale socket file left by a killed daemon is replaced.
+    """
+    import socketserver
+
+    from .solver import default_registry_and_solver
+
+    path = path or default_socket_path()
+    _, solver = default_registry_and_solver()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    response = answer(solver, json.loads(line))
+                except Exception as exc:
+                    response = {"error": f"{type(exc).__name__}: {exc}"}
+                self.wfile.write(json.dumps(response, ensure_ascii=False).encode(ENCODING) + b"\n")
+                self.wfile.flush()
+
+    if os.path.exists(path):
+        if _listening(path):
+            raise SystemExit(f"an intent daemon is already listening on {path}")
+        os.unlink(path)
+    previous = os.umask(0o177)  # socket readable and writable by its owner only
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    finally:
+        os.umask(previous)
+    server.daemon_threads = True
+    print(f"Intent daemon listening on {path}", flush=True)
+
+    def terminate(signum: int, frame: Any) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Resident intent solver for the CLI")
+    parser.add_argument("--socket", metavar="PATH", help="Unix socket path (default: $INTENT_DAEMON_SOCKET or a per-user temp path)")
+    args = parser.parse_args()
+    if not hasattr(socket, "AF_UNIX"):
+        parser.error("Unix sockets are not available on this platform")
+    serve(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
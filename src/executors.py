@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import inspect
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, InvalidStateError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from .intents import Intent
+
+
+BACKENDS = ("inline", "thread", "process")
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for intents whose handler process died; the pool is replaced."""
+
+
+def resolve_handler(path: str) -> Callable[..., Any]:
+    """Import a handler given as "package.module:function"."""
+    module_name, sep, attribute = path.partition(":")
+    if not sep or not module_name or not attribute:
+        raise ValueError(f"handler path must look like 'package.module:function', got {path!r}")
+    target: Any = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        target = getattr(target, part)
+    if not callable(target):
+        raise TypeError(f"{path} is not callable")
+    return target
+
+
+def handler_path(handler: Callable[..., Any]) -> str:
+    """Import path of a module-level function, for sending it to another process."""
+    module = getattr(handler, "__module__", None)
+    qualname = getattr(handler, "__qualname__", "")
+    if not module or not qualname or "<" in qualname or module == "__main__":
+        raise ValueError(
+            f"{handler!r} cannot be imported by worker processes; "
+            "register it by import path ('package.module:function')"
+        )
+    return f"{module}:{qualname}"
+
+
+# Handlers resolved in this (child) process, by import path
+_resolved: Dict[str, Callable[..., Any]] = {}
+
+
+def _call(handler: Callable[..., Any], intent: Intent) -> Any:
+    result = handler(intent)
+    if inspect.isawaitable(result):
+
+        async def wait() -> Any:
+            return await result
+
+        result = asyncio.run(wait())
+    return result
+
+
+def _run_encoded(path: str, encoded: str) -> Any:
+    """Entry point in worker processes: decode the intent and call the handler."""
+    handler = _resolved.get(path)
+    if handler is None:
+        handler = _resolved[path] = resolve_handler(path)
+    return _call(handler, Intent(**json.loads(encoded)))
+
+
+class ThreadBackend:
+    """Runs handlers on a shared thread pool."""
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="handler")
+
+    def submit(self, path: str, handler: Callable[..., Any], intent: Intent) -> "Future[Any]":
+        return self._executor.submit(_call, handler, intent)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+class ProcessBackend:
+    """Runs handlers in worker processes, one per core by default.
+
+    Handlers travel as import paths and intents as compact JSON, so only
+    short strings cross the process boundary.
+
+    A dying worker breaks the whole pool and every intent in flight on it.
+    The pool is replaced, and those intents are retried one at a time in a
+    separate single-worker process, so only the intent that kills its worker
+    fails (with `WorkerCrashedError`). Process handlers should therefore be
+    side-effect free computations, which is what this backend is for.
+
+    A retry gets until the intent's deadline, and at most `retry_timeout`
+    seconds, before it fails with `TimeoutError` and its process is killed,
+    so a hung handler cannot stall the retries queued behind it.
+
+    Workers are started with `spawn` (override with `mp_context`) so that
+    forking a threaded server process is never needed.
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, mp_context: str = "spawn", retry_timeout: float = 30.0
+    ) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.retry_timeout = retry_timeout
+        self._context = multiprocessing.get_context(mp_context)
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Crash retries run one at a time from this thread, in `_retry_executor`
+        self._retry_lane = ThreadPoolExecutor(max_workers=1, thread_name_prefix="crash-retry")
+        self._retry_executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context)
+            return self._executor
+
+    def _replace(self, broken: Executor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    def submit(self, path: str, handler: Callable[..., Any], intent: Intent) -> "Future[Any]":
+        outer: "Future[Any]" = Future()
+        encoded = intent.to_json()
+        pool = self._pool()
+        try:
+            inner = pool.submit(_run_encoded, path, encoded)
+        except BrokenProcessPool:
+            # Broken before this intent was queued
+            self._replace(pool)
+            pool = self._pool()
+            inner = pool.submit(_run_encoded, path, encoded)
+
+        def done(future: "Future[Any]") -> None:
+            if future.cancelled():
+                outer.cancel()
+            elif isinstance(future.exception(), BrokenProcessPool):
+                self._replace(pool)
+                self._retry_lane.submit(self._retry, outer, path, encoded, intent.deadline)
+            else:
+                _settle(outer, future.exception(), future)
+
+        inner.add_done_callback(done)
+        # Cancelling the caller's future (e.g. on timeout) unqueues the intent
+        # if no worker has picked it up yet.
+        outer.add_done_callback(lambda future: inner.cancel() if future.cancelled() else None)
+        return outer
+
+    def _retry(self, outer: "Future[Any]", path: str, encoded: str, deadline: Optional[float]) -> None:
+        if outer.done():
+            return  # cancelled, or the caller already gave up on it
+        timeout = self.retry_timeout
+        if deadline is not None:
+            timeout = max(0.0, min(timeout, deadline - time.time()))
+        if self._retry_executor is None:
+            self._retry_executor = ProcessPoolExecutor(max_workers=1, mp_context=self._context)
+        future = self._retry_executor.submit(_run_encoded, path, encoded)
+        try:
+            error = future.exception(timeout)
+        except TimeoutError:
+            _kill(self._retry_executor)
+            self._retry_executor = None
+            _settle(outer, TimeoutError(f"retry of {path} timed out after a worker crash"), future)
+            return
+        if isinstance(error, BrokenProcessPool):
+            self._retry_executor.shutdown(wait=False)
+            self._retry_executor = None
+            error = WorkerCrashedError(f"worker process for {path} died")
+        _settle(outer, error, future)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._retry_lane.shutdown(wait=True, cancel_futures=True)
+        if self._retry_executor is not None:
+            self._retry_executor.shutdown(wait=False)
+
+
+def _kill(executor: ProcessPoolExecutor) -> None:
+    """Shut down `executor` without waiting, terminating workers stuck in a handler."""
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def _settle(outer: "Future[Any]", error: Optional[BaseException], future: "Future[Any]") -> None:
+    try:
+        if error is not None:
+            outer.set_exception(error)
+        else:
+            outer.set_result(future.result())
+    except InvalidStateError:
+        pass  # the caller cancelled it meanwhile
+
+
+def make_backend(kind: str, max_workers: Optional[int] = None) -> Any:
+    if kind == "thread":
+        return ThreadBackend(max_workers)
+    if kind == "process":
+        return ProcessBackend(max_workers)
+    raise ValueError(f"unknown backend {kind!r}; expected one of {BACKENDS}")
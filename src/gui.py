@@ -1,24 +1,134 @@
 from __future__ import annotations
 
+import itertools
 import json
+import os
+import queue
+import threading
+import time
 import tkinter as tk
-from tkinter import ttk
-from typing import Any, Dict, List
+from tkinter import filedialog, ttk
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from .intents import Intent
-from .solver import default_registry_and_solver
+
+
+# How often the Tk thread picks up results from the workers (ms), and how long
+# one pick-up may take before the rest waits for the next one (seconds).
+POLL_MS = 50
+POLL_BUDGET = 0.02
+
+# Ranking entries shown for an explained intent
+EXPLAIN_ROWS = 50
+
+# Intents read and solved per step of a file load
+BULK_CHUNK = 256
+BULK_WORKERS = 4
+
+
+class VirtualTable(ttk.Frame):
+    """A `ttk.Treeview` over a list of rows that only renders the visible ones.
+
+    The tree holds exactly `height` items whose values are swapped as the
+    view scrolls, so appending or scrolling through 100k rows costs the same
+    as through 20. When the view is at the bottom it follows new rows.
+    """
+
+    def __init__(self, master: tk.Misc, columns: Sequence[Tuple[str, int]], height: int = 18) -> None:
+        super().__init__(master)
+        self.rows: List[Tuple[Any, ...]] = []
+        self.offset = 0
+        self.height = height
+        self.tree = ttk.Treeview(
+            self, columns=[name for name, _ in columns], show="headings", height=height, selectmode="browse"
+        )
+        for name, width in columns:
+            self.tree.heading(name, text=name)
+            self.tree.column(name, width=width, stretch=name == columns[-1][0])
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.tree.grid(row=0, column=0, sticky=tk.NSEW)
+        self.scrollbar.grid(row=0, column=1, sticky=tk.NS)
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+        self._items = [self.tree.insert("", tk.END, values=()) for _ in range(height)]
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(sequence, self.on_wheel)
+        self.refresh()
+
+    def clear(self) -> None:
+        self.rows = []
+        self.offset = 0
+        self.refresh()
+
+    def extend(self, rows: Sequence[Tuple[Any, ...]]) -> None:
+        following = self.offset + self.height >= len(self.rows)
+        self.rows.extend(rows)
+        if following:
+            self.offset = max(0, len(self.rows) - self.height)
+        self.refresh()
+
+    def scroll_to(self, offset: int) -> None:
+        self.offset = max(0, min(offset, len(self.rows) - self.height))
+        self.refresh()
+
+    def on_scrollbar(self, action: str, amount: str, unit: str = "units") -> None:
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.rows)))
+        else:
+            step = self.height if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def on_wheel(self, event: Any) -> str:
+        if getattr(event, "num", None) == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_to(self.offset - 3)
+        else:
+            self.scroll_to(self.offset + 3)
+        return "break"
+
+    def refresh(self) -> None:
+        for position, item in enumerate(self._items):
+            index = self.offset + position
+            self.tree.item(item, values=self.rows[index] if index < len(self.rows) else ())
+        total = max(1, len(self.rows))
+        self.scrollbar.set(self.offset / total, min(1.0, (self.offset + self.height) / total))
 
 
 class IntentApp(tk.Tk):
+    """Desktop front end; all solving happens off the Tk thread.
+
+    Worker threads never touch widgets: they put results on `self.results`,
+    which `poll` drains from the Tk thread every `POLL_MS`.
+    """
+
     def __init__(self) -> None:
         super().__init__()
         self.title("Intent Demo (Desktop)")
-        self.geometry("760x560")
+        self.geometry("860x620")
 
-        self.registry, self.solver = default_registry_and_solver()
+        # The solver and its imports load on the worker once the window is up
+        self.registry = None
+        self.solver: Optional[Any] = None
+        self._solver_lock = threading.Lock()
+        self.results: "queue.Queue[Tuple[str, Any]]" = queue.Queue()
+        self._jobs: "queue.Queue[Callable[[], None]]" = queue.Queue()
+        threading.Thread(target=self._work, name="gui-solver", daemon=True).start()
+        self._jobs.put(self.load_solver)
+        # Only the newest single-intent run is displayed
+        self._run_seq = 0
+        self._bulk_cancel: Optional[threading.Event] = None
+        self._bulk_started = 0.0
+        self._bulk_done = 0
+        self._bulk_errors = 0
+
+        notebook = ttk.Notebook(self)
+        notebook.pack(fill=tk.BOTH, expand=True)
+        single = ttk.Frame(notebook)
+        bulk = ttk.Frame(notebook)
+        notebook.add(single, text="Single intent")
+        notebook.add(bulk, text="Intents file")
 
         # Inputs
-        frm = ttk.Frame(self, padding=12)
+        frm = ttk.Frame(single, padding=12)
         frm.pack(fill=tk.BOTH, expand=True)
 
         ttk.Label(frm, text="Intent name").grid(row=0, column=0, sticky=tk.W)
@@ -37,8 +147,11 @@ class IntentApp(tk.Tk):
         self.explain_var = tk.BooleanVar(value=True)
         ttk.Checkbutton(frm, text="Explain", variable=self.explain_var).grid(row=3, column=1, sticky=tk.W, pady=(6,0))
 
-        run_btn = ttk.Button(frm, text="Run Intent", command=self.on_run)
-        run_btn.grid(row=4, column=1, sticky=tk.W, pady=10)
+        run_frame = ttk.Frame(frm)
+        run_frame.grid(row=4, column=1, sticky=tk.W, pady=10)
+        ttk.Button(run_frame, text="Run Intent", command=self.on_run).pack(side=tk.LEFT)
+        self.run_status = tk.StringVar(value="Loading solver...")
+        ttk.Label(run_frame, textvariable=self.run_status).pack(side=tk.LEFT, padx=10)
 
         # Output
         ttk.Label(frm, text="Result").grid(row=5, column=0, sticky=tk.NW)
@@ -62,6 +175,152 @@ class IntentApp(tk.Tk):
         ttk.Button(preset_frame, text="Preset: notify", command=self.fill_notify).pack(side=tk.LEFT, padx=4)
         ttk.Button(preset_frame, text="Preset: swap", command=self.fill_swap).pack(side=tk.LEFT, padx=4)
 
+        # Intents file: JSON lines as accepted by `python -m src.cli --jsonl`
+        bulk_frm = ttk.Frame(bulk, padding=12)
+        bulk_frm.pack(fill=tk.BOTH, expand=True)
+        controls = ttk.Frame(bulk_frm)
+        controls.pack(fill=tk.X)
+        self.load_btn = ttk.Button(controls, text="Load intents file...", command=self.on_load_file)
+        self.load_btn.pack(side=tk.LEFT)
+        self.cancel_btn = ttk.Button(controls, text="Cancel", command=self.on_cancel_load, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=6)
+        self.bulk_status = tk.StringVar(value="No file loaded.")
+        ttk.Label(controls, textvariable=self.bulk_status).pack(side=tk.LEFT, padx=10)
+        self.progress = ttk.Progressbar(bulk_frm, maximum=1.0, mode="determinate")
+        self.progress.pack(fill=tk.X, pady=8)
+        self.table = VirtualTable(
+            bulk_frm, [("#", 60), ("intent", 110), ("capability", 140), ("result", 260), ("error", 200)], height=20
+        )
+        self.table.pack(fill=tk.BOTH, expand=True)
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(POLL_MS, self.poll)
+
+    # Workers
+    def load_solver(self) -> Any:
+        with self._solver_lock:
+            if self.solver is None:
+                from .solver import default_registry_and_solver
+
+                self.registry, self.solver = default_registry_and_solver()
+                self.results.put(("status", "Ready."))
+            return self.solver
+
+    def _work(self) -> None:
+        while True:
+            job = self._jobs.get()
+            try:
+                job()
+            except Exception as exc:
+                self.results.put(("status", f"Error: {type(exc).__name__}: {exc}"))
+
+    def _solve_single(self, seq: int, intent: Intent, explain: bool) -> None:
+        solver = self.load_solver()
+        if not intent.tags:
+            intent.tags = solver.registry.aliases.resolve(intent.name)
+        intent_text = json.dumps(intent.to_dict(), ensure_ascii=False, indent=2)
+        try:
+            if explain:
+                explained = solver.solve_with_explain(intent, k=EXPLAIN_ROWS)
+                result_text = explained.get("result") or "No capability found."
+                explain_text = json.dumps(explained.get("ranking", []), ensure_ascii=False, indent=2)
+                if len(explained.get("ranking", [])) >= EXPLAIN_ROWS:
+                    explain_text = f"(top {EXPLAIN_ROWS})\n" + explain_text
+            else:
+                result_text = solver.solve(intent) or "No capability found."
+                explain_text = "(Explain disabled)"
+        except Exception as exc:
+            result_text = f"Error: {type(exc).__name__}: {exc}"
+            explain_text = ""
+        self.results.put(("single", (seq, result_text, intent_text, explain_text)))
+
+    def _solve_file(self, path: str, cancel: threading.Event) -> None:
+        from .cli import read_jsonl
+
+        consumed = [0]
+
+        def lines(fh: Any) -> Iterator[str]:
+            for raw in fh:
+                consumed[0] += len(raw)
+                yield raw.decode("utf-8", errors="replace")
+
+        number = 0
+        try:
+            solver = self.load_solver()
+            size = max(1, os.path.getsize(path))
+            with open(path, "rb") as fh:
+                items = read_jsonl(lines(fh), solver.registry.aliases)
+                while not cancel.is_set():
+                    chunk = list(itertools.islice(items, BULK_CHUNK))
+                    if not chunk:
+                        break
+                    intents = [intent for intent, _ in chunk if intent is not None]
+                    outcomes = iter(solver.solve_many(intents, max_workers=BULK_WORKERS))
+                    rows = []
+                    for intent, error in chunk:
+                        number += 1
+                        if intent is None:
+                            rows.append((number, "", "", "", error))
+                            continue
+                        outcome = next(outcomes)
+                        rows.append(
+                            (
+                                number,
+                                intent.name,
+                                outcome["chosen_capability"] or "",
+                                "" if outcome["result"] is None else str(outcome["result"]),
+                                outcome["error"] or "",
+                            )
+                        )
+                    self.results.put(("rows", (rows, consumed[0] / size)))
+        except Exception as exc:
+            # Any failure must reach the Tk thread, which re-enables the controls
+            self.results.put(("bulk_done", f"Failed: {type(exc).__name__}: {exc}"))
+            return
+        self.results.put(("bulk_done", "Cancelled." if cancel.is_set() else "Done."))
+
+    # Tk thread
+    def poll(self) -> None:
+        """Apply worker results for up to `POLL_BUDGET` seconds, then reschedule."""
+        deadline = time.perf_counter() + POLL_BUDGET
+        while time.perf_counter() < deadline:
+            try:
+                kind, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "status":
+                self.run_status.set(payload)
+            elif kind == "single":
+                self.show_single(*payload)
+            elif kind == "rows":
+                rows, fraction = payload
+                self._bulk_done += len(rows)
+                self._bulk_errors += sum(1 for row in rows if row[4])
+                self.table.extend(rows)
+                self.progress["value"] = fraction
+                self.update_bulk_status()
+            elif kind == "bulk_done":
+                self.update_bulk_status(payload)
+                self._bulk_cancel = None
+                self.load_btn.configure(state=tk.NORMAL)
+                self.cancel_btn.configure(state=tk.DISABLED)
+        self.after(POLL_MS, self.poll)
+
+    def show_single(self, seq: int, result_text: str, intent_text: str, explain_text: str) -> None:
+        if seq != self._run_seq:
+            return  # superseded by a later run
+        self.run_status.set("Done.")
+        for widget, text in ((self.result_txt, result_text), (self.intent_txt, intent_text), (self.explain_txt, explain_text)):
+            widget.delete("1.0", tk.END)
+            widget.insert(tk.END, text)
+
+    def update_bulk_status(self, state: str = "Solving...") -> None:
+        elapsed = max(1e-9, time.perf_counter() - self._bulk_started)
+        self.bulk_status.set(
+            f"{state} {self._bulk_done} intents, {self._bulk_errors} errors, "
+            f"{self._bulk_done / elapsed:,.0f} intents/s"
+        )
+
     def parse_params(self, text: str) -> Dict[str, Any]:
         params: Dict[str, Any] = {}
         for raw in text.splitlines():
@@ -87,35 +346,36 @@ class IntentApp(tk.Tk):
         tags: List[str] = [t.strip() for t in tags_str.split(",") if t.strip()] if tags_str else []
         params = self.parse_params(self.params_txt.get("1.0", tk.END))
 
-        if not tags:
-            alias_to_tags = {
-                "transfer": ["transfer", "payment"],
-                "pay": ["transfer", "payment"],
-                "notify": ["notify", "message"],
-                "message": ["notify", "message"],
-                "swap": ["swap", "trade"],
-            }
-            tags = alias_to_tags.get(name, [])
-
+        # Without tags, the worker maps the name to tags (registry aliases)
         intent = Intent(name=name, params=params, tags=tags)
+        self._run_seq += 1
+        seq, explain = self._run_seq, self.explain_var.get()
+        self.run_status.set("Solving...")
+        self._jobs.put(lambda: self._solve_single(seq, intent, explain))
 
-        if self.explain_var.get():
-            explained = self.solver.solve_with_explain(intent)
-            result_text = explained.get("result")
-            self.result_txt.delete("1.0", tk.END)
-            self.result_txt.insert(tk.END, result_text or "No capability found.")
-            self.intent_txt.delete("1.0", tk.END)
-            self.intent_txt.insert(tk.END, json.dumps(intent.to_dict(), ensure_ascii=False, indent=2))
-            self.explain_txt.delete("1.0", tk.END)
-            self.explain_txt.insert(tk.END, json.dumps(explained.get("ranking", []), ensure_ascii=False, indent=2))
-        else:
-            result_text = self.solver.solve(intent)
-            self.result_txt.delete("1.0", tk.END)
-            self.result_txt.insert(tk.END, result_text or "No capability found.")
-            self.intent_txt.delete("1.0", tk.END)
-            self.intent_txt.insert(tk.END, json.dumps(intent.to_dict(), ensure_ascii=False, indent=2))
-            self.explain_txt.delete("1.0", tk.END)
-            self.explain_txt.insert(tk.END, "(Explain disabled)")
+    def on_load_file(self) -> None:
+        path = filedialog.askopenfilename(
+            title="Intents file (JSON lines)", filetypes=[("JSON lines", "*.jsonl *.ndjson"), ("All files", "*")]
+        )
+        if not path:
+            return
+        self.table.clear()
+        self.progress["value"] = 0.0
+        self._bulk_done = self._bulk_errors = 0
+        self._bulk_started = time.perf_counter()
+        self._bulk_cancel = cancel = threading.Event()
+        self.load_btn.configure(state=tk.DISABLED)
+        self.cancel_btn.configure(state=tk.NORMAL)
+        self.update_bulk_status()
+        threading.Thread(target=self._solve_file, args=(path, cancel), name="gui-bulk", daemon=True).start()
+
+    def on_cancel_load(self) -> None:
+        if self._bulk_cancel is not None:
+            self._bulk_cancel.set()
+
+    def on_close(self) -> None:
+        self.on_cancel_load()
+        self.destroy()
 
     def fill_transfer(self) -> None:
         self.name_var.set("transfer")
@@ -144,5 +404,3 @@ def main() -> int:
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
-
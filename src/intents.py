@@ -1,7 +1,39 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, asdict
-from typing import Any, Dict, List, Optional, Tuple
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from .aliases import AliasResolver
+
+if TYPE_CHECKING:
+    from .metrics import Metrics
+
+try:
+    _popcount = int.bit_count  # Python 3.10+
+except AttributeError:  # pragma: no cover - Python 3.9
+
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+
+# Param values JSON cannot encode (Decimal, datetime, ...) go out as strings,
+# as in `intent_fingerprint`.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _load_numeric() -> Optional[Tuple[Any, Any]]:
+    """Return (numpy, scipy.sparse) if both are installed, else None."""
+    try:
+        import numpy
+        from scipy import sparse
+    except ImportError:
+        return None
+    return numpy, sparse
 
 
 @dataclass
@@ -13,15 +45,47 @@ class Intent:
         params: Structured parameters describing the desired outcome.
         tags: Optional labels to help match to solvers/capabilities.
         priority: Higher means more important/urgent.
+        deadline: Optional Unix time (seconds) after which the intent is
+            dropped instead of being handled.
     """
 
     name: str
     params: Dict[str, Any]
     tags: Optional[List[str]] = None
     priority: int = 0
+    deadline: Optional[float] = None
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        return self.deadline is not None and (time.time() if now is None else now) >= self.deadline
 
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        # Shallow copies; `asdict` would deep-copy every param value.
+        data = {
+            "name": self.name,
+            "params": dict(self.params),
+            "tags": None if self.tags is None else list(self.tags),
+            "priority": self.priority,
+        }
+        if self.deadline is not None:
+            data["deadline"] = self.deadline
+        return data
+
+    def to_json(self) -> str:
+        """Return the intent as compact JSON, with unencodable params as strings."""
+        data = {"name": self.name, "params": self.params, "tags": self.tags, "priority": self.priority}
+        if self.deadline is not None:
+            data["deadline"] = self.deadline
+        return _JSON_ENCODER.encode(data)
+
+
+def intent_fingerprint(intent: Intent) -> str:
+    """Canonical key identifying identical intents (name, tag set, params)."""
+    return json.dumps(
+        [intent.name, sorted(set(intent.tags or ())), intent.params],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
 
 
 @dataclass
@@ -42,12 +106,13 @@ class Capability:
         """Return detailed scoring breakdown for explainability."""
         tag_overlap = 0.0
         if intent.tags:
-            tag_overlap = len(set(self.accepts_tags) & set(intent.tags)) / max(
-                1, len(set(intent.tags))
-            )
+            intent_tags = set(intent.tags)
+            tag_overlap = len(intent_tags.intersection(self.accepts_tags)) / len(intent_tags)
 
-        present_params = [k for k in self.required_params if k in intent.params]
-        missing_params = [k for k in self.required_params if k not in intent.params]
+        present_params: List[str] = []
+        missing_params: List[str] = []
+        for key in self.required_params:
+            (present_params if key in intent.params else missing_params).append(key)
         params_score = len(present_params) / max(1, len(self.required_params))
 
         # Increase weight for params to favor correct capability when params match
@@ -63,15 +128,97 @@ class Capability:
         }
 
     def score(self, intent: Intent) -> float:
-        return float(self.score_breakdown(intent)["total"])
+        """Return the `total` of `score_breakdown` without building the breakdown."""
+        tag_overlap = 0.0
+        if intent.tags:
+            intent_tags = set(intent.tags)
+            tag_overlap = len(intent_tags.intersection(self.accepts_tags)) / len(intent_tags)
+        present = sum(1 for key in self.required_params if key in intent.params)
+        params_score = present / max(1, len(self.required_params))
+        return 0.3 * tag_overlap + 0.7 * params_score
+
+
+class CompiledCapability(NamedTuple):
+    """Capability precompiled against a registry's interned tag/param ids.
+
+    Masks have one bit per interned id. `params_distinct` is False when
+    `required_params` repeats a key, in which case presence must be counted
+    per entry rather than by popcount.
+    """
+
+    name: str
+    tag_mask: int
+    param_mask: int
+    tag_count: int
+    required_count: int
+    params_distinct: bool
+
+
+class CompiledIntent(NamedTuple):
+    """Intent shape precompiled against a registry's interned tag/param ids.
+
+    `tag_count` counts distinct tags, including ones no capability accepts.
+    """
+
+    tag_mask: int
+    param_mask: int
+    tag_count: int
+    param_count: int
+
+
+def _copy_postings(index: Any, count: int) -> Any:
+    """Copy an inverted index without sharing posting lists, keeping positions < count."""
+    if isinstance(index, dict):
+        return {key: [p for p in positions if p < count] for key, positions in index.items()}
+    return index.copy(deep=True, count=count)
 
 
 class IntentRegistry:
-    """In-memory registry of intents and capabilities."""
+    """In-memory registry of intents and capabilities.
+
+    Capabilities are indexed by accepted tag and required param key so that
+    matching only scores capabilities sharing at least one of them with the
+    intent. Every other capability scores exactly 0.0.
+
+    Scores depend only on the intent's tag set and param key set, so ranked
+    candidates are kept in an LRU cache of up to `cache_size` intent shapes
+    (0 disables it). Entries are invalidated when a capability is added.
 
-    def __init__(self) -> None:
+    `with_capability` / `without_capability` derive new registries for
+    copy-on-write updates: readers keep using the old registry, which is
+    frozen, while the new one is built and published.
+
+    `aliases` resolves free-form intent names to tags (see `AliasResolver`).
+    It is not part of the ranking state, so derived registries share it.
+    """
+
+    def __init__(self, cache_size: int = 1024) -> None:
         self._intents: List[Intent] = []
         self._capabilities: List[Capability] = []
+        self._tag_index: Dict[str, List[int]] = {}
+        self._param_index: Dict[str, List[int]] = {}
+        # Interned tag/param ids (bit positions) and per-position compiled forms
+        self._tag_ids: Dict[str, int] = {}
+        self._param_ids: Dict[str, int] = {}
+        self._compiled: List[CompiledCapability] = []
+        # Sparse incidence matrices for rank_batch, covering the first
+        # `_matrix_rows` capabilities; extended lazily as capabilities are added.
+        self._matrix_rows = 0
+        self._cap_tag_matrix: Any = None
+        self._cap_param_matrix: Any = None
+        self._cap_required_counts: Any = None
+        # Shape cache: (tags, param keys) -> (version, ranked candidates, complete);
+        # an incomplete entry holds only the top entries a top-k request needed.
+        self._version = 0
+        self._cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[Tuple[frozenset, frozenset], Tuple[int, List[Tuple[float, int]], bool]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._frozen = False
+        # Stage timings ("rank", "explain") are recorded here when set
+        self.metrics: Optional[Metrics] = None
+        self.aliases = AliasResolver()
 
     # Intents
     def add_intent(self, intent: Intent) -> None:
@@ -82,35 +229,449 @@ class IntentRegistry:
 
     # Capabilities
     def add_capability(self, capability: Capability) -> None:
+        if self._frozen:
+            raise RuntimeError("registry is frozen; derive a new one with with_capability()")
+        position = len(self._capabilities)
         self._capabilities.append(capability)
+        tags = set(capability.accepts_tags)
+        keys = set(capability.required_params)
+        tag_mask = 0
+        for tag in tags:
+            self._tag_index.setdefault(tag, []).append(position)
+            tag_mask |= 1 << self._tag_ids.setdefault(tag, len(self._tag_ids))
+        param_mask = 0
+        for key in keys:
+            self._param_index.setdefault(key, []).append(position)
+            param_mask |= 1 << self._param_ids.setdefault(key, len(self._param_ids))
+        self._compiled.append(
+            CompiledCapability(
+                name=capability.name,
+                tag_mask=tag_mask,
+                param_mask=param_mask,
+                tag_count=len(tags),
+                required_count=len(capability.required_params),
+                params_distinct=len(keys) == len(capability.required_params),
+            )
+        )
+        self._version += 1
 
     def list_capabilities(self) -> List[Capability]:
         return list(self._capabilities)
 
+    # A registry loaded from a snapshot (see `src/snapshot.py`) decodes
+    # capabilities on first access and keeps them; these three leave
+    # untouched ones encoded.
+    def capability_count(self) -> int:
+        return len(self._capabilities)
+
+    def capability_names(self) -> List[str]:
+        """Capability names in position order."""
+        names = getattr(self._capabilities, "names", None)
+        return names() if names is not None else [capability.name for capability in self._capabilities]
+
+    def iter_capabilities(self) -> Iterator[Capability]:
+        """Capabilities in position order, decoded one at a time without being kept."""
+        stream = getattr(self._capabilities, "stream", None)
+        return stream() if stream is not None else iter(list(self._capabilities))
+
+    def add_alias(self, alias: str, tags: List[str]) -> None:
+        """Resolve intents named `alias` (or close misspellings of it) to `tags`."""
+        self.aliases.add(alias, tags)
+
+    def with_capability(self, capability: Capability) -> "IntentRegistry":
+        """Return a new registry with `capability` added; this one is frozen.
+
+        Posting lists are append-only and shared with the first registry
+        derived from this one, which is why this registry must not change
+        afterwards; it ignores positions beyond its own capabilities. Later
+        derivations from the same registry copy the posting lists.
+        """
+        share = not self._frozen
+        self._frozen = True
+        derived = IntentRegistry(cache_size=self._cache_size)
+        derived._capabilities = self._capabilities.copy()
+        derived._compiled = self._compiled.copy()
+        if share:
+            derived._tag_index = self._tag_index.copy()
+            derived._param_index = self._param_index.copy()
+        else:
+            count = len(self._capabilities)
+            derived._tag_index = _copy_postings(self._tag_index, count)
+            derived._param_index = _copy_postings(self._param_index, count)
+        derived._tag_ids = self._tag_ids.copy()
+        derived._param_ids = self._param_ids.copy()
+        derived._version = self._version
+        if hasattr(self, "_snapshot"):
+            derived._snapshot = self._snapshot  # type: ignore[attr-defined]
+        derived.metrics = self.metrics
+        derived.aliases = self.aliases
+        derived.add_capability(capability)
+        return derived
+
+    def without_capability(self, name: str) -> "IntentRegistry":
+        """Return a new registry without capabilities named `name`.
+
+        Positions shift, so the indexes are rebuilt from the remaining
+        capabilities.
+        """
+        derived = IntentRegistry(cache_size=self._cache_size)
+        for capability in self._capabilities:
+            if capability.name != name:
+                derived.add_capability(capability)
+        derived._version = self._version + 1
+        derived.metrics = self.metrics
+        derived.aliases = self.aliases
+        return derived
+
     # Matching
+    def compile_intent(self, intent: Intent) -> CompiledIntent:
+        """Return the intent's tag and param-key masks for this registry."""
+        tag_mask = 0
+        tag_count = 0
+        if intent.tags:
+            unique_tags = set(intent.tags)
+            tag_count = len(unique_tags)
+            for tag in unique_tags:
+                bit = self._tag_ids.get(tag)
+                if bit is not None:
+                    tag_mask |= 1 << bit
+        param_mask = 0
+        for key in intent.params:
+            bit = self._param_ids.get(key)
+            if bit is not None:
+                param_mask |= 1 << bit
+        return CompiledIntent(tag_mask, param_mask, tag_count, len(intent.params))
+
+    def _score_position(self, position: int, compiled: CompiledIntent, intent: Intent) -> float:
+        """Score the capability at `position`; equal to `Capability.score`."""
+        capability = self._compiled[position]
+        tag_overlap = 0.0
+        if compiled.tag_count:
+            tag_overlap = _popcount(capability.tag_mask & compiled.tag_mask) / compiled.tag_count
+        if capability.params_distinct:
+            present = _popcount(capability.param_mask & compiled.param_mask)
+        else:
+            present = sum(1 for key in self._capabilities[position].required_params if key in intent.params)
+        params_score = present / max(1, capability.required_count)
+        return 0.3 * tag_overlap + 0.7 * params_score
+
+    def _candidate_positions(self, intent: Intent) -> List[int]:
+        """Positions of capabilities sharing a tag or param key with the intent."""
+        positions = set()
+        if intent.tags:
+            for tag in intent.tags:
+                positions.update(self._tag_index.get(tag, ()))
+        for key in intent.params:
+            positions.update(self._param_index.get(key, ()))
+        # Posting lists shared with a derived registry may hold newer positions.
+        count = len(self._capabilities)
+        return sorted(position for position in positions if position < count)
+
+    def _rank_candidates(self, intent: Intent) -> List[Tuple[float, int]]:
+        """Return (score, position) for candidates, sorted by score (desc).
+
+        Served from the shape cache when possible; callers must not mutate it.
+        """
+        if not self._cache_size:
+            return self._score_candidates(intent)
+        key = (frozenset(intent.tags or ()), frozenset(intent.params))
+        version = self._version
+        ranked = self._cached(key, version, None)
+        if ranked is None:
+            ranked = self._score_candidates(intent)
+            self._cache_store(key, version, ranked, True)
+        return ranked
+
+    def _cached(
+        self, key: Tuple[frozenset, frozenset], version: int, k: Optional[int]
+    ) -> Optional[List[Tuple[float, int]]]:
+        """Cached ranking of a shape covering its top `k` (None: all); counts the hit or miss."""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == version and (entry[2] or (k is not None and len(entry[1]) >= k)):
+                self._cache.move_to_end(key)
+                self._cache_hits += 1
+                return entry[1] if k is None else entry[1][:k]
+            self._cache_misses += 1
+            return None
+
+    def _cache_store(
+        self, key: Tuple[frozenset, frozenset], version: int, ranked: List[Tuple[float, int]], complete: bool
+    ) -> None:
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[0] == version and not complete and (entry[2] or len(entry[1]) >= len(ranked)):
+                return  # a longer ranking of this shape is already cached
+            self._cache[key] = (version, ranked, complete)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def cache_info(self) -> Dict[str, int]:
+        """Return shape cache counters."""
+        with self._cache_lock:
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "size": len(self._cache),
+                "maxsize": self._cache_size,
+                "version": self._version,
+            }
+
+    def _score_candidates(self, intent: Intent) -> List[Tuple[float, int]]:
+        """Score candidates and sort them by score (desc).
+
+        Positions are scored in registration order and the sort is stable, so
+        ties keep the same order as a full scan would.
+        """
+        compiled = self.compile_intent(intent)
+        scored = [
+            (self._score_position(position, compiled, intent), position)
+            for position in self._candidate_positions(intent)
+        ]
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return scored
+
+    def _max_score(self, position: int, compiled: CompiledIntent) -> float:
+        """Upper bound on the score of the capability at `position`."""
+        capability = self._compiled[position]
+        tag_bound = 0.0
+        if compiled.tag_count:
+            tag_bound = min(capability.tag_count, compiled.tag_count) / compiled.tag_count
+        required = capability.required_count
+        if capability.params_distinct:
+            params_bound = min(required, compiled.param_count) / max(1, required)
+        else:
+            params_bound = 1.0 if required else 0.0
+        return 0.3 * tag_bound + 0.7 * params_bound
+
+    def _top_candidates(self, intent: Intent, k: int) -> List[Tuple[float, int]]:
+        """Return the first `k` entries of `_rank_candidates`.
+
+        A cached ranking of the shape serves any `k` it covers. Otherwise a
+        bounded heap replaces the full sort, and only these `k` entries are
+        cached (as a partial ranking a later full ranking replaces).
+
+        Candidates are visited in registration order. Once the heap holds `k`
+        entries, a capability whose score bound does not beat the current k-th
+        best is skipped without being scored; on a tie the earlier capability
+        already in the heap wins, as it would in the stable full sort.
+        """
+        if k < 1:
+            raise ValueError("k must be >= 1")
+        key = (frozenset(intent.tags or ()), frozenset(intent.params))
+        version = self._version
+        if self._cache_size:
+            cached = self._cached(key, version, k)
+            if cached is not None:
+                return cached
+        compiled = self.compile_intent(intent)
+        heap: List[Tuple[float, int]] = []
+        for position in self._candidate_positions(intent):
+            if len(heap) == k and self._max_score(position, compiled) <= heap[0][0]:
+                continue
+            entry = (self._score_position(position, compiled, intent), -position)
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif entry > heap[0]:
+                heapq.heapreplace(heap, entry)
+        heap.sort(reverse=True)
+        ranked = [(score, -negated) for score, negated in heap]
+        if self._cache_size:
+            # Fewer than k entries means every candidate is in the ranking
+            self._cache_store(key, version, ranked, len(ranked) < k)
+        return ranked
+
+    def _pad_positions(self, ranked: List[Tuple[float, int]], k: int) -> List[int]:
+        """Positions of zero-score capabilities that follow `ranked` in a top-k."""
+        matched = {position for _, position in ranked}
+        padding: List[int] = []
+        for position in range(len(self._capabilities)):
+            if len(ranked) + len(padding) >= k:
+                break
+            if position not in matched:
+                padding.append(position)
+        return padding
+
     def find_best_capability(self, intent: Intent) -> Optional[Capability]:
         if not self._capabilities:
             return None
-        ranked = self.rank_capabilities(intent)
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        ranked = self._rank_candidates(intent)
+        if metrics is not None:
+            metrics.observe("rank", time.perf_counter() - start)
         if not ranked:
             return None
-        best_score, best_cap = ranked[0]
+        best_score, best_position = ranked[0]
         if best_score <= 0.0:
             return None
-        return best_cap
+        return self._capabilities[best_position]
 
     def rank_capabilities(self, intent: Intent) -> List[Tuple[float, Capability]]:
         """Return capabilities ranked by score (desc)."""
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        ranked = self._rank_candidates(intent)
         scored: List[Tuple[float, Capability]] = [
-            (capability.score(intent), capability) for capability in self._capabilities
+            (score, self._capabilities[position]) for score, position in ranked
         ]
-        scored.sort(key=lambda x: x[0], reverse=True)
+        matched = {position for _, position in ranked}
+        scored.extend(
+            (0.0, capability)
+            for position, capability in enumerate(self._capabilities)
+            if position not in matched
+        )
+        if metrics is not None:
+            metrics.observe("rank", time.perf_counter() - start)
         return scored
 
-    def explain_capabilities(self, intent: Intent) -> List[Dict[str, Any]]:
-        """Return detailed breakdowns sorted by total score."""
-        details = [capability.score_breakdown(intent) for capability in self._capabilities]
-        details.sort(key=lambda d: d["total"], reverse=True)
+    def top_capabilities(self, intent: Intent, k: int) -> List[Tuple[float, Capability]]:
+        """Return the first `k` entries of `rank_capabilities`."""
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        ranked = self._top_candidates(intent, k)
+        scored: List[Tuple[float, Capability]] = [
+            (score, self._capabilities[position]) for score, position in ranked
+        ]
+        scored.extend((0.0, self._capabilities[position]) for position in self._pad_positions(ranked, k))
+        if metrics is not None:
+            metrics.observe("rank", time.perf_counter() - start)
+        return scored
+
+    def explain_top(self, intent: Intent, k: int) -> List[Dict[str, Any]]:
+        """Return the first `k` entries of `explain_capabilities`.
+
+        Breakdown dicts are only built for the returned capabilities.
+        """
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        ranked = self._top_candidates(intent, k)
+        positions = [position for _, position in ranked] + self._pad_positions(ranked, k)
+        if metrics is not None:
+            start = metrics.observe_since("rank", start)
+        details = [self._capabilities[position].score_breakdown(intent) for position in positions]
+        if metrics is not None:
+            metrics.observe_since("explain", start)
         return details
 
+    def _capability_matrices(self, numpy: Any, sparse: Any) -> Tuple[Any, Any, Any]:
+        """Return (capability x tag, capability x param, required count) arrays.
 
+        Only capabilities registered since the previous call are encoded; their
+        rows are stacked under the cached matrices.
+        """
+        start = self._matrix_rows
+        if start < len(self._capabilities) or self._cap_tag_matrix is None:
+            tag_rows: List[int] = []
+            tag_cols: List[int] = []
+            param_rows: List[int] = []
+            param_cols: List[int] = []
+            for row, capability in enumerate(self._capabilities[start:]):
+                for tag in set(capability.accepts_tags):
+                    tag_rows.append(row)
+                    tag_cols.append(self._tag_ids[tag])
+                # Duplicate required keys sum into the same cell, as they each count.
+                for key in capability.required_params:
+                    param_rows.append(row)
+                    param_cols.append(self._param_ids[key])
+            new_rows = len(self._capabilities) - start
+            tag_block = sparse.csr_matrix(
+                (numpy.ones(len(tag_rows)), (tag_rows, tag_cols)),
+                shape=(new_rows, len(self._tag_ids)),
+            )
+            param_block = sparse.csr_matrix(
+                (numpy.ones(len(param_rows)), (param_rows, param_cols)),
+                shape=(new_rows, len(self._param_ids)),
+            )
+            counts = numpy.array(
+                [len(c.required_params) for c in self._capabilities[start:]], dtype=numpy.float64
+            )
+            if self._cap_tag_matrix is None:
+                self._cap_tag_matrix = tag_block
+                self._cap_param_matrix = param_block
+                self._cap_required_counts = counts
+            else:
+                self._cap_tag_matrix.resize((start, len(self._tag_ids)))
+                self._cap_param_matrix.resize((start, len(self._param_ids)))
+                self._cap_tag_matrix = sparse.vstack([self._cap_tag_matrix, tag_block], format="csr")
+                self._cap_param_matrix = sparse.vstack([self._cap_param_matrix, param_block], format="csr")
+                self._cap_required_counts = numpy.concatenate([self._cap_required_counts, counts])
+            self._matrix_rows = len(self._capabilities)
+        return self._cap_tag_matrix, self._cap_param_matrix, self._cap_required_counts
+
+    def rank_batch(
+        self, intents: List[Intent], k: Optional[int] = None
+    ) -> List[List[Tuple[float, Capability]]]:
+        """Rank capabilities for many intents at once.
+
+        Returns one `rank_capabilities`-ordered list per intent, truncated to
+        `k` entries when given. Scores for the whole intent x capability matrix
+        are computed with sparse matrix products; without numpy/scipy this
+        falls back to ranking each intent on its own.
+        """
+        numeric = _load_numeric()
+        if numeric is None or not intents or not self._capabilities:
+            if k is None:
+                return [self.rank_capabilities(intent) for intent in intents]
+            return [self.top_capabilities(intent, k) for intent in intents]
+        numpy, sparse = numeric
+        cap_tags, cap_params, required_counts = self._capability_matrices(numpy, sparse)
+
+        tag_rows: List[int] = []
+        tag_cols: List[int] = []
+        param_rows: List[int] = []
+        param_cols: List[int] = []
+        tag_counts = numpy.zeros(len(intents), dtype=numpy.float64)
+        for row, intent in enumerate(intents):
+            if intent.tags:
+                unique_tags = set(intent.tags)
+                tag_counts[row] = len(unique_tags)
+                for tag in unique_tags:
+                    column = self._tag_ids.get(tag)
+                    if column is not None:
+                        tag_rows.append(row)
+                        tag_cols.append(column)
+            for key in intent.params:
+                column = self._param_ids.get(key)
+                if column is not None:
+                    param_rows.append(row)
+                    param_cols.append(column)
+        intent_tags = sparse.csr_matrix(
+            (numpy.ones(len(tag_rows)), (tag_rows, tag_cols)), shape=(len(intents), cap_tags.shape[1])
+        )
+        intent_params = sparse.csr_matrix(
+            (numpy.ones(len(param_rows)), (param_rows, param_cols)), shape=(len(intents), cap_params.shape[1])
+        )
+
+        # Same operations, in the same order, as Capability.score_breakdown.
+        tag_overlap = (intent_tags @ cap_tags.T).toarray() / numpy.maximum(1.0, tag_counts)[:, None]
+        params_score = (intent_params @ cap_params.T).toarray() / numpy.maximum(1.0, required_counts)[None, :]
+        totals = 0.3 * tag_overlap + 0.7 * params_score
+
+        order = numpy.argsort(-totals, axis=1, kind="stable")
+        if k is not None:
+            order = order[:, :k]
+        capabilities = self._capabilities
+        return [
+            [(float(totals[row, column]), capabilities[column]) for column in order[row].tolist()]
+            for row in range(len(intents))
+        ]
+
+    def explain_capabilities(self, intent: Intent) -> List[Dict[str, Any]]:
+        """Return detailed breakdowns sorted by total score."""
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        ranked = self._rank_candidates(intent)
+        if metrics is not None:
+            start = metrics.observe_since("rank", start)
+        details = [self._capabilities[position].score_breakdown(intent) for _, position in ranked]
+        matched = {position for _, position in ranked}
+        details.extend(
+            capability.score_breakdown(intent)
+            for position, capability in enumerate(self._capabilities)
+            if position not in matched
+        )
+        if metrics is not None:
+            metrics.observe_since("explain", start)
+        return details
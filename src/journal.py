@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import atexit
+import glob
+import heapq
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .codec import default_format, dumps, intent_from_record, intent_to_record, loads
+from .intents import Intent
+
+
+# Segment file: MAGIC, version byte, format byte (see `src/codec.py`), then
+# records, each framed as <u32 payload length><u32 crc32 of payload><payload>.
+# A record's payload is [timestamp, intent record, capability, result, error].
+MAGIC = b"IJNL"
+VERSION = 1
+_HEADER = struct.Struct("<4sBc")
+_FRAME = struct.Struct("<II")
+SUFFIX = ".ijnl"
+
+
+class JournalEntry(NamedTuple):
+    timestamp: float
+    intent: Intent
+    capability: Optional[str]
+    result: Any
+    error: Optional[str]
+
+
+class Journal:
+    """Append-only audit trail of solved intents with group commit.
+
+    `append` only encodes the entry and queues it; a background writer takes
+    everything queued since its last pass, writes it with one `write` and
+    makes it durable with one `fsync` (group commit), so requests never wait
+    on the disk. The writer lingers `commit_interval` seconds to let a batch
+    fill, unless a caller is waiting on it: `append(..., durable=True)` and
+    `flush()` wait for the commit. At most `max_pending` entries are queued;
+    past that `append` blocks, so a slow disk slows callers instead of
+    growing memory. Once the writer has failed (e.g. disk full) `append`
+    raises.
+
+    Each writer process appends to its own segments,
+    `<directory>/<writer>-<index>.ijnl`, rolling to a new segment past
+    `segment_bytes`. Writers are per process (a new one starts after fork),
+    so gunicorn workers can share a directory. `read_journal` merges them.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 64 * 1024 * 1024,
+        commit_interval: float = 0.01,
+        max_pending: int = 65536,
+        fsync: bool = True,
+    ) -> None:
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.commit_interval = commit_interval
+        self.max_pending = max(1, max_pending)
+        self.fsync = fsync
+        self.format = default_format()
+        self._cond = threading.Condition()
+        self._pending: List[bytes] = []
+        self._appended = 0  # entries queued so far
+        self._committed = 0  # entries durable so far
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._pid: Optional[int] = None
+        self._file: Any = None
+        self._writer_id = ""
+        self._segment = 0
+        self._segment_size = 0
+        self.stats = {"entries": 0, "batches": 0, "bytes": 0, "segments": 0}
+
+    # Producer side
+    def append(
+        self,
+        intent: Intent,
+        capability: Optional[str],
+        result: Any,
+        error: Optional[str] = None,
+        durable: bool = False,
+    ) -> None:
+        payload = dumps([time.time(), intent_to_record(intent), capability, result, error], self.format)
+        frame = _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            if self._error is not None:
+                raise RuntimeError("journal writer failed") from self._error
+            if self._pid != os.getpid():
+                self._start()
+            while len(self._pending) >= self.max_pending and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                raise RuntimeError("journal is closed")
+            self._pending.append(frame)
+            self._appended += 1
+            target = self._appended
+            if len(self._pending) == 1:
+                self._cond.notify_all()
+            if durable:
+                self._wait_committed(target)
+
+    def flush(self) -> None:
+        """Wait until every entry appended so far is durable."""
+        with self._cond:
+            if self._pid == os.getpid():
+                self._wait_committed(self._appended)
+
+    def close(self) -> None:
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _wait_committed(self, target: int) -> None:
+        if self._committed < target:
+            self._cond.notify_all()  # cuts the writer's linger short
+        while self._committed < target:
+            if self._error is not None:
+                raise RuntimeError("journal writer failed") from self._error
+            self._cond.wait()
+
+    # Writer side
+    def _start(self) -> None:
+        """Start this process's writer; entries queued before a fork stay with the parent."""
+        self._pid = os.getpid()
+        self._pending = []
+        self._appended = self._committed = 0
+        self._file = None
+        self._writer_id = f"{int(time.time() * 1000):013d}-{self._pid}"
+        self._segment = 0
+        os.makedirs(self.directory, exist_ok=True)
+        threading.Thread(target=self._run, name="journal-writer", daemon=True).start()
+        atexit.register(self.close)
+
+    def _open_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._segment += 1
+        path = os.path.join(self.directory, f"{self._writer_id}-{self._segment:06d}{SUFFIX}")
+        self._file = open(path, "ab")
+        self._file.write(_HEADER.pack(MAGIC, VERSION, self.format))
+        self._segment_size = _HEADER.size
+        self.stats["segments"] += 1
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._pending:
+                    if self._closed:
+                        break
+                    self._cond.wait()
+                    if not self._pending:
+                        continue
+                # Let more entries join this batch (a durable append wakes us early)
+                self._cond.wait(self.commit_interval)
+                batch, self._pending = self._pending, []
+                self._cond.notify_all()  # wake appenders blocked on max_pending
+            try:
+                self._write(batch)
+            except BaseException as exc:
+                with self._cond:
+                    self._error = exc
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._committed += len(batch)
+                self._cond.notify_all()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch: List[bytes]) -> None:
+        if self._file is None or self._segment_size >= self.segment_bytes:
+            self._open_segment()
+        data = b"".join(batch)
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._segment_size += len(data)
+        self.stats["entries"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["bytes"] += len(data)
+
+
+def _segments(path: str) -> Dict[str, List[str]]:
+    """Segment files of `path` (a directory or one segment) by writer, in order."""
+    files = [path] if os.path.isfile(path) else sorted(glob.glob(os.path.join(path, f"*{SUFFIX}")))
+    writers: Dict[str, List[str]] = {}
+    for name in files:
+        writer = os.path.basename(name)[: -len(SUFFIX)].rsplit("-", 1)[0]
+        writers.setdefault(writer, []).append(name)
+    return writers
+
+
+def read_segment(path: str) -> Iterator[JournalEntry]:
+    """Entries of one segment; stops at a torn or corrupt tail (a crash mid-write)."""
+    with open(path, "rb") as fh:
+        data = fh.read()
+    if len(data) < _HEADER.size:
+        return
+    magic, version, fmt = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a journal segment (version {VERSION})")
+    view = memoryview(data)
+    offset = _HEADER.size
+    end = len(data)
+    while offset + _FRAME.size <= end:
+        length, crc = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        payload = view[start : start + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            return
+        timestamp, intent, capability, result, error = loads(payload, fmt)
+        yield JournalEntry(timestamp, intent_from_record(intent), capability, result, error)
+        offset = start + length
+
+
+def _read_writer(paths: Iterable[str]) -> Iterator[JournalEntry]:
+    for path in paths:
+        yield from read_segment(path)
+
+
+def read_journal(path: str) -> Iterator[JournalEntry]:
+    """Every entry under `path`, merged across writers by timestamp."""
+    streams = [_read_writer(paths) for _, paths in sorted(_segments(path).items())]
+    return heapq.merge(*streams, key=lambda entry: entry.timestamp)
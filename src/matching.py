@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .intents import Intent
+
+
+# Remaining amounts below this are treated as fully filled.
+DUST = 1e-12
+
+
+@dataclass
+class Order:
+    """Open swap order built from a `swap_tokens` intent.
+
+    Attributes:
+        order_id: Engine-assigned identifier.
+        from_token: Token the order gives.
+        to_token: Token the order wants.
+        amount: Remaining amount of `from_token` to give.
+        limit_price: Minimum `to_token` received per unit of `from_token`;
+            None for a market order, which never rests on the book.
+        seq: Arrival sequence, used for time priority.
+    """
+
+    order_id: str
+    from_token: str
+    to_token: str
+    amount: float
+    limit_price: Optional[float]
+    seq: int
+    intent: Optional[Intent] = None
+    cancelled: bool = False
+
+
+@dataclass
+class Fill:
+    """One match between an incoming (taker) and a resting (maker) order."""
+
+    taker_id: str
+    maker_id: str
+    taker_gives: float
+    maker_gives: float
+
+    @property
+    def price(self) -> float:
+        """Taker's `to_token` received per unit of `from_token`."""
+        return self.maker_gives / self.taker_gives
+
+
+@dataclass
+class MatchResult:
+    order_id: str
+    fills: List[Fill] = field(default_factory=list)
+    remaining: float = 0.0
+    resting: bool = False
+
+
+def order_terms(intent: Intent) -> Tuple[str, str, float, Optional[float]]:
+    """Return (from_token, to_token, amount, limit_price) from a swap intent."""
+    params = intent.params
+    from_token = str(params["from_token"])
+    to_token = str(params["to_token"])
+    amount = float(params["amount"])
+    if not (amount > 0.0 and math.isfinite(amount)):
+        raise ValueError("amount must be positive")
+    limit = params.get("limit_price")
+    limit_price = None if limit is None or limit == "" else float(limit)
+    if limit_price is not None and not (limit_price > 0.0 and math.isfinite(limit_price)):
+        raise ValueError("limit_price must be positive")
+    return from_token, to_token, amount, limit_price
+
+
+class MatchingEngine:
+    """Continuous matching of opposing swap intents (coincidence of wants).
+
+    Resting orders are kept in one heap per (from_token, to_token) pair,
+    ordered by limit price then arrival. An incoming ETH->USDC order only
+    looks at the USDC->ETH heap: the best maker is the one asking the least
+    ETH per USDC, and the two cross while the maker's price gives the taker
+    at least its own limit. Trades execute at the maker's price and may
+    partially fill either side, so matching an order costs O(fills * log n)
+    regardless of how many orders are open.
+
+    Limit orders that are not fully filled rest on the book; the unfilled
+    remainder of a market order is returned to the caller instead.
+    """
+
+    def __init__(self) -> None:
+        self._books: Dict[Tuple[str, str], List[Tuple[float, int, Order]]] = {}
+        self._orders: Dict[str, Order] = {}
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+        self.listeners: List[Callable[[str, Order], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    @property
+    def lock(self) -> threading.RLock:
+        """Re-entrant lock held while the book changes; listeners run under it."""
+        return self._lock
+
+    def _notify(self, event: str, order: Order) -> None:
+        for listener in self.listeners:
+            listener(event, order)
+
+    def _best(self, pair: Tuple[str, str]) -> Optional[Order]:
+        heap = self._books.get(pair)
+        while heap:
+            order = heap[0][2]
+            if not order.cancelled and order.amount > DUST:
+                return order
+            heapq.heappop(heap)
+        return None
+
+    def _remove(self, order: Order) -> None:
+        order.cancelled = True
+        self._orders.pop(order.order_id, None)
+        self._notify("removed", order)
+
+    def submit(self, intent: Intent) -> MatchResult:
+        """Match a swap intent against the book; rest the remainder if it has a limit."""
+        from_token, to_token, amount, limit_price = order_terms(intent)
+        with self._lock:
+            seq = next(self._seq)
+            order = Order(f"o{seq}", from_token, to_token, amount, limit_price, seq, intent)
+            result = MatchResult(order.order_id)
+            opposite = (to_token, from_token)
+            while order.amount > DUST:
+                maker = self._best(opposite)
+                if maker is None:
+                    break
+                # maker.limit_price: from_token wanted per to_token given.
+                # Market makers never rest, so makers always carry a price.
+                maker_rate = maker.limit_price
+                if maker_rate is None or maker_rate <= 0.0:
+                    break
+                if limit_price is not None and limit_price * maker_rate > 1.0:
+                    break
+                if order.amount / maker_rate >= maker.amount:
+                    maker_gives = maker.amount
+                    taker_gives = maker.amount * maker_rate
+                else:
+                    taker_gives = order.amount
+                    maker_gives = order.amount / maker_rate
+                order.amount -= taker_gives
+                maker.amount -= maker_gives
+                result.fills.append(Fill(order.order_id, maker.order_id, taker_gives, maker_gives))
+                if maker.amount <= DUST:
+                    self._remove(maker)
+                else:
+                    self._notify("updated", maker)
+            result.remaining = order.amount if order.amount > DUST else 0.0
+            if result.remaining and limit_price is not None:
+                self._orders[order.order_id] = order
+                heapq.heappush(self._books.setdefault((from_token, to_token), []), (limit_price, seq, order))
+                result.resting = True
+                self._notify("added", order)
+            return result
+
+    def best_order(self, from_token: str, to_token: str) -> Optional[Order]:
+        """Open order for a pair with the lowest limit price, if any."""
+        with self._lock:
+            return self._best((from_token, to_token))
+
+    def fill(self, order_id: str, amount: float) -> None:
+        """Reduce an open order by `amount` settled outside the book (e.g. a ring)."""
+        with self._lock:
+            order = self._orders[order_id]
+            if amount > order.amount + DUST:
+                raise ValueError(f"fill of {amount} exceeds {order.order_id} remaining {order.amount}")
+            order.amount -= amount
+            if order.amount <= DUST:
+                self._remove(order)
+            else:
+                self._notify("updated", order)
+
+    def cancel(self, order_id: str) -> bool:
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is None:
+                return False
+            self._remove(order)
+            return True
+
+    def open_orders(self, from_token: str, to_token: str) -> List[Order]:
+        """Open orders for a pair, best price first."""
+        with self._lock:
+            heap = self._books.get((from_token, to_token), [])
+            return [order for _, _, order in sorted(heap) if not order.cancelled and order.amount > DUST]
+
+    def handler(self, fallback: Optional[Callable[[Intent], str]] = None) -> Callable[[Intent], str]:
+        """Return a `swap_tokens` handler that matches before using `fallback`.
+
+        `fallback` (e.g. an external venue) receives market-order remainders
+        that found no counterparty, and intents whose order terms are missing
+        or invalid (these never reach the book).
+        """
+
+        def handle(intent: Intent) -> str:
+            try:
+                from_token, to_token, amount, _ = order_terms(intent)
+            except (KeyError, TypeError, ValueError) as exc:
+                if fallback is not None:
+                    return fallback(intent)
+                reason = f"missing {exc}" if isinstance(exc, KeyError) else str(exc)
+                return f"Swap not matched: invalid order terms ({reason})"
+            result = self.submit(intent)
+            parts: List[str] = []
+            if result.fills:
+                given = sum(f.taker_gives for f in result.fills)
+                received = sum(f.maker_gives for f in result.fills)
+                parts.append(
+                    f"Matched {given:g} {from_token} -> {received:g} {to_token} "
+                    f"against {len(result.fills)} order(s)"
+                )
+            if result.resting:
+                parts.append(f"{result.remaining:g} {from_token} resting as {result.order_id}")
+            elif result.remaining:
+                if fallback is None:
+                    parts.append(f"{result.remaining:g} {from_token} unmatched")
+                elif result.remaining == amount:
+                    return fallback(intent)
+                else:
+                    remainder = Intent(
+                        name=intent.name,
+                        params={**intent.params, "amount": result.remaining},
+                        tags=intent.tags,
+                        priority=intent.priority,
+                    )
+                    parts.append(fallback(remainder))
+            return "; ".join(parts)
+
+        return handle
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class ResultCache:
+    """Bounded LRU of results, each with its own time-to-live."""
+
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = max(0, maxsize)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """Return (found, value); expired entries are dropped."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= self._clock():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def put(self, key: Hashable, value: Any, ttl: float) -> None:
+        if self.maxsize == 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every entry whose key matches `predicate`."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution (threads).
+
+    `coalesced` counts calls that joined an execution already in flight.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run `fn` unless a call with `key` is in flight; returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """Coroutine variant of `SingleFlight`.
+
+    The shared execution runs as its own task. A waiter that is cancelled
+    stops waiting without affecting the others; the task itself is only
+    cancelled once nobody waits for it any more.
+    """
+
+    def __init__(self) -> None:
+        self._flights: Dict[Tuple[asyncio.AbstractEventLoop, Hashable], _Flight] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        flight = self._flights.get(flight_key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            flight = self._flights[flight_key] = _Flight(loop.create_task(fn()))
+
+            def forget(_: "asyncio.Task[Any]", flight: _Flight = flight) -> None:
+                if self._flights.get(flight_key) is flight:
+                    del self._flights[flight_key]
+
+            flight.task.add_done_callback(forget)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+
+class Memoizer:
+    """TTL result cache in front of single-flight execution.
+
+    A call first looks up `key` in the cache (a hit); otherwise it joins an
+    identical call already in flight (coalesced) or runs `fn` itself (a miss)
+    and caches the result for `ttl` seconds. Exceptions are shared with
+    coalesced callers but never cached.
+    """
+
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic) -> None:
+        self.cache = ResultCache(maxsize, clock)
+        self._flights = SingleFlight()
+        self._async_flights = AsyncSingleFlight()
+        self._lock = threading.Lock()
+        self._counts = {"hits": 0, "misses": 0}
+
+    def _bump(self, counter: str) -> None:
+        with self._lock:
+            self._counts[counter] += 1
+
+    def call(self, key: Hashable, fn: Callable[[], Any], ttl: float) -> Any:
+        found, value = self.cache.get(key)
+        if found:
+            self._bump("hits")
+            return value
+
+        def run() -> Any:
+            self._bump("misses")
+            result = fn()
+            self.cache.put(key, result, ttl)
+            return result
+
+        return self._flights.do(key, run)[0]
+
+    async def acall(self, key: Hashable, fn: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        found, value = self.cache.get(key)
+        if found:
+            self._bump("hits")
+            return value
+
+        async def run() -> Any:
+            self._bump("misses")
+            result = await fn()
+            self.cache.put(key, result, ttl)
+            return result
+
+        return (await self._async_flights.do(key, run))[0]
+
+    def info(self) -> Dict[str, int]:
+        """Return hit/miss/coalesced counters and the cache size."""
+        with self._lock:
+            counts = dict(self._counts)
+        counts["coalesced"] = self._flights.coalesced + self._async_flights.coalesced
+        return {**counts, "size": len(self.cache), "maxsize": self.cache.maxsize}
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import bisect
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# Latency histogram bucket bounds in seconds (Prometheus `le` labels).
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+STAGE_METRIC = "intent_stage_seconds"
+SOLVES_METRIC = "intent_solves_total"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# How a gauge combines across workers: "sum" for per-worker amounts (queue
+# depth, cache size), "max" for per-worker limits (capacity, maxsize).
+GAUGE_MODES = ("sum", "max")
+
+
+def _labels(values: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in values.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return "{" + text + "}" if text else ""
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """Stage latency histograms, counters and gauges for one process.
+
+    `Solver` and `IntentRegistry` record into the `Metrics` set as their
+    `metrics` attribute; when it is None (the default) the hot paths skip
+    timing entirely. Stages are `queue`, `parse`, `rank`, `explain`, `handler`
+    and `serialize`; handler latency is labelled with the capability.
+
+    Each gunicorn worker has its own `Metrics`. `flush(directory)` writes the
+    worker's state to `<directory>/<pid>.json` and `aggregate(directory)`
+    sums every worker's file, so any worker can serve the combined view
+    (gauges only from workers still running, combined by their mode).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # (stage, capability) -> [bucket counts..., +Inf count, sum]
+        self._histograms: Dict[Tuple[str, str], List[float]] = {}
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], Tuple[float, str]] = {}
+        # Last totals passed to `advance`, per counter
+        self._totals: Dict[Tuple[str, Labels], float] = {}
+        self._flusher_pid: Optional[int] = None
+
+    def observe(self, stage: str, seconds: float, capability: str = "") -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        key = (stage, capability)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0.0] * (len(self.buckets) + 2)
+            histogram[index] += 1
+            histogram[-1] += seconds
+
+    def observe_since(self, stage: str, start: float, capability: str = "") -> float:
+        """Observe the time since `start` (a `perf_counter` value); returns now."""
+        now = time.perf_counter()
+        self.observe(stage, now - start, capability)
+        return now
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def advance(self, name: str, total: float, **labels: Any) -> None:
+        """Increment a counter up to `total`, a running count kept elsewhere (e.g. cache hits).
+
+        A total lower than the last one means the source was reset, and the
+        counter grows by the whole new total.
+        """
+        key = (name, _labels(labels))
+        with self._lock:
+            last = self._totals.get(key, 0.0)
+            self._totals[key] = float(total)
+        self.inc(name, total - last if total >= last else total, **labels)
+
+    def set(self, name: str, value: float, mode: str = "sum", **labels: Any) -> None:
+        """Set a gauge; `mode` (see `GAUGE_MODES`) says how workers' values combine."""
+        if mode not in GAUGE_MODES:
+            raise ValueError(f"mode must be one of {GAUGE_MODES}")
+        with self._lock:
+            self._gauges[(name, _labels(labels))] = (float(value), mode)
+
+    def state(self) -> Dict[str, Any]:
+        """JSON-serializable copy of the current values."""
+        with self._lock:
+            return {
+                "buckets": list(self.buckets),
+                "histograms": [[stage, cap, list(values)] for (stage, cap), values in self._histograms.items()],
+                "counters": [[name, list(map(list, labels)), value] for (name, labels), value in self._counters.items()],
+                "gauges": [
+                    [name, list(map(list, labels)), value, mode] for (name, labels), (value, mode) in self._gauges.items()
+                ],
+            }
+
+    def flush(self, directory: str) -> None:
+        """Atomically write this process's state to `directory`."""
+        fd, tmp_path = tempfile.mkstemp(prefix=".metrics-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(self.state(), fh)
+            os.replace(tmp_path, os.path.join(directory, f"{os.getpid()}.json"))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def start_flushing(
+        self, directory: str, interval: float = 5.0, before_flush: Optional[Callable[[], None]] = None
+    ) -> None:
+        """Flush to `directory` every `interval` seconds from a daemon thread.
+
+        Safe to call on every request: the thread is started once per process,
+        so a call after forking starts a new one in the child.
+        """
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        self._flusher_pid = pid
+        os.makedirs(directory, exist_ok=True)
+
+        def run() -> None:
+            while True:
+                try:
+                    if before_flush is not None:
+                        before_flush()
+                    self.flush(directory)
+                except OSError:
+                    pass
+                time.sleep(interval)
+
+        threading.Thread(target=run, name="metrics-flush", daemon=True).start()
+
+
+def merge(states: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine several `Metrics.state()` dicts; histograms must share bucket bounds.
+
+    Histograms and counters are summed, gauges summed or maxed by their mode.
+    """
+    buckets: Optional[List[float]] = None
+    histograms: Dict[Tuple[str, str], List[float]] = {}
+    counters: Dict[Tuple[str, Labels], float] = {}
+    gauges: Dict[Tuple[str, Labels], Tuple[float, str]] = {}
+    for state in states:
+        if buckets is None:
+            buckets = state["buckets"]
+        elif state["buckets"] != buckets:
+            continue
+        for stage, capability, values in state["histograms"]:
+            total = histograms.setdefault((stage, capability), [0.0] * len(values))
+            for index, value in enumerate(values):
+                total[index] += value
+        for name, labels, value in state["counters"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0.0) + value
+        for name, labels, value, *rest in state["gauges"]:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            mode = rest[0] if rest else "sum"
+            previous = gauges.get(key)
+            if previous is not None:
+                value = max(previous[0], value) if mode == "max" else previous[0] + value
+            gauges[key] = (value, mode)
+    return {
+        "buckets": buckets or list(DEFAULT_BUCKETS),
+        "histograms": [[stage, capability, values] for (stage, capability), values in histograms.items()],
+        "counters": [[name, [list(pair) for pair in labels], value] for (name, labels), value in counters.items()],
+        "gauges": [
+            [name, [list(pair) for pair in labels], value, mode] for (name, labels), (value, mode) in gauges.items()
+        ],
+    }
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name != "posix":
+        # os.kill would terminate the process on Windows; rely on mtimes there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def aggregate(directory: str, stale_after: Optional[float] = None) -> Dict[str, Any]:
+    """Merge the states flushed by every worker into `directory`.
+
+    Files of workers that have exited are kept, so counters never go back,
+    but their gauges are dropped: a worker counts as exited when its PID is
+    gone or, with `stale_after`, when its file is older than that many
+    seconds.
+    """
+    states = []
+    now = time.time()
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                state = json.load(fh)
+            mtime = os.path.getmtime(path)
+        except (OSError, ValueError):
+            continue
+        stem = os.path.splitext(os.path.basename(path))[0]
+        live = (stale_after is None or now - mtime <= stale_after) and (not stem.isdigit() or _pid_alive(int(stem)))
+        if not live:
+            state = {**state, "gauges": []}
+        states.append(state)
+    return merge(states)
+
+
+def render(state: Dict[str, Any]) -> str:
+    """Prometheus text exposition (format 0.0.4) of a `Metrics.state()` dict."""
+    lines: List[str] = []
+    buckets = state["buckets"]
+    histograms = sorted(state["histograms"], key=lambda entry: (entry[0], entry[1]))
+    if histograms:
+        lines.append(f"# HELP {STAGE_METRIC} Time spent per solve stage.")
+        lines.append(f"# TYPE {STAGE_METRIC} histogram")
+    for stage, capability, values in histograms:
+        labels = [("stage", stage)] + ([("capability", capability)] if capability else [])
+        cumulative = 0.0
+        for bound, count in zip(list(buckets) + ["+Inf"], values[:-1]):
+            cumulative += count
+            le = bound if isinstance(bound, str) else repr(float(bound))
+            lines.append(f"{STAGE_METRIC}_bucket{_format_labels(labels + [('le', le)])} {_format_number(cumulative)}")
+        lines.append(f"{STAGE_METRIC}_sum{_format_labels(labels)} {repr(float(values[-1]))}")
+        lines.append(f"{STAGE_METRIC}_count{_format_labels(labels)} {_format_number(cumulative)}")
+
+    for kind, entries in (("counter", state["counters"]), ("gauge", state["gauges"])):
+        by_name: Dict[str, List[Tuple[List[List[str]], float]]] = {}
+        for name, labels, value, *_ in entries:
+            by_name.setdefault(name, []).append((labels, value))
+        for name in sorted(by_name):
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name]):
+                lines.append(f"{name}{_format_labels(map(tuple, labels))} {_format_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import string
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from .intents import Intent
+
+
+def _fields(template: str) -> List[str]:
+    return [name for _, name, _, _ in string.Formatter().parse(template) if name]
+
+
+@dataclass(frozen=True)
+class Operator:
+    """A capability seen as a planning operator.
+
+    Facts are strings; `{var}` placeholders in `requires`, `consumes`,
+    `produces` and `params` are bound to symbols of the problem (intent
+    values or planner constants) when the operator is grounded.
+
+    Attributes:
+        capability: Capability (handler) name run for this step.
+        requires: Facts that must hold before the step.
+        produces: Facts that hold after it.
+        consumes: Facts that no longer hold after it.
+        params: Step params, overriding the intent's own.
+        renames: Intent params passed to the step under another key
+            (intent key -> step key), e.g. when the step reads the key with
+            a different meaning.
+        cost: Step cost; plans minimise the total.
+    """
+
+    capability: str
+    requires: Tuple[str, ...] = ()
+    produces: Tuple[str, ...] = ()
+    consumes: Tuple[str, ...] = ()
+    params: Dict[str, str] = field(default_factory=dict)
+    renames: Dict[str, str] = field(default_factory=dict)
+    cost: float = 1.0
+
+    def variables(self) -> List[str]:
+        templates = list(self.requires) + list(self.produces) + list(self.consumes) + list(self.params.values())
+        return sorted({name for template in templates for name in _fields(template)})
+
+
+@dataclass(frozen=True)
+class Goal:
+    """Turns matching intents into planning problems.
+
+    An intent matches when it shares a tag with `tags` (or its name is one of
+    them) and has every param named in `initial` and `goal`, whose `{key}`
+    placeholders are filled from the intent's params.
+    """
+
+    tags: Tuple[str, ...]
+    initial: Tuple[str, ...]
+    goal: Tuple[str, ...]
+
+    def keys(self) -> List[str]:
+        return sorted({name for template in self.initial + self.goal for name in _fields(template)})
+
+    def matches(self, intent: Intent) -> bool:
+        if intent.name not in self.tags and not set(intent.tags or ()) & set(self.tags):
+            return False
+        return all(key in intent.params for key in self.keys())
+
+
+@dataclass
+class PlanStep:
+    capability: str
+    intent: Intent
+    cost: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"capability": self.capability, "params": dict(self.intent.params), "cost": self.cost}
+
+
+@dataclass
+class Plan:
+    """Ordered steps; each step's intent is what its capability's handler receives."""
+
+    steps: List[PlanStep]
+    cost: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"cost": self.cost, "steps": [step.to_dict() for step in self.steps]}
+
+
+# (operator index, variable bindings as symbols) per step, or None: no plan
+Binding = Tuple[Tuple[str, str], ...]
+AbstractPlan = Optional[Tuple[Tuple[int, Binding], ...]]
+# Grounded operator: (operator index, binding, requires, consumes, produces, cost)
+Action = Tuple[int, Binding, FrozenSet[str], FrozenSet[str], FrozenSet[str], float]
+
+
+class Planner:
+    """Cheapest multi-step plans over capability operators (A* search).
+
+    Search runs over abstract symbols rather than concrete values: each
+    distinct intent value the goal refers to becomes `$0`, `$1`, ... and
+    values equal to one of `constants` keep their name. Two intents with the
+    same goal, param keys and pattern of equal values therefore share one
+    search, and its result is memoized (up to `cache_size` shapes) and only
+    re-instantiated with the new values.
+
+    `constants` add symbols that are not in the intent, e.g. bridge tokens
+    for multi-hop swaps. Search stops at `max_cost` total cost or
+    `max_steps` steps.
+    """
+
+    def __init__(
+        self,
+        operators: Sequence[Operator],
+        goals: Sequence[Goal],
+        constants: Sequence[str] = (),
+        max_cost: float = 10.0,
+        max_steps: int = 5,
+        cache_size: int = 256,
+    ) -> None:
+        self.operators = list(operators)
+        self.goals = list(goals)
+        self.constants = tuple(constants)
+        self.max_cost = max_cost
+        self.max_steps = max_steps
+        self._cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[Any, AbstractPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def cache_info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "size": len(self._cache), "maxsize": self._cache_size}
+
+    def plan(self, intent: Intent) -> Optional[Plan]:
+        """Cheapest plan for `intent`, or None if no goal applies or none fits the bounds."""
+        for index, goal in enumerate(self.goals):
+            if goal.matches(intent):
+                break
+        else:
+            return None
+
+        # Canonical symbols for the values the goal refers to
+        values: Dict[str, Any] = {}
+        labels: Dict[str, str] = {}
+        for key in goal.keys():
+            value = str(intent.params[key])
+            if value not in labels:
+                labels[value] = value if value in self.constants else f"${len(labels)}"
+            values[labels[value]] = intent.params[key]
+        by_key = {key: labels[str(intent.params[key])] for key in goal.keys()}
+        shape = (index, tuple(sorted(by_key.items())))
+
+        with self._lock:
+            found = shape in self._cache
+            if found:
+                self._cache.move_to_end(shape)
+                abstract = self._cache[shape]
+                self._hits += 1
+            else:
+                self._misses += 1
+        if not found:
+            initial = frozenset(template.format(**by_key) for template in goal.initial)
+            target = frozenset(template.format(**by_key) for template in goal.goal)
+            symbols = sorted(set(by_key.values()) | set(self.constants))
+            abstract = self._search(initial, target, symbols)
+            if self._cache_size:
+                with self._lock:
+                    self._cache[shape] = abstract
+                    while len(self._cache) > self._cache_size:
+                        self._cache.popitem(last=False)
+        if abstract is None:
+            return None
+
+        steps: List[PlanStep] = []
+        for operator_index, binding in abstract:
+            operator = self.operators[operator_index]
+            bound = dict(binding)
+            params = dict(intent.params)
+            for old, new in operator.renames.items():
+                if old in params:
+                    params[new] = params.pop(old)
+            for key, template in operator.params.items():
+                symbol = template.format(**bound)
+                params[key] = values.get(symbol, symbol)
+            step_intent = Intent(name=operator.capability, params=params, tags=intent.tags, deadline=intent.deadline)
+            steps.append(PlanStep(operator.capability, step_intent, operator.cost))
+        return Plan(steps=steps, cost=sum(step.cost for step in steps))
+
+    def _ground(self, symbols: List[str]) -> List[Action]:
+        actions: List[Action] = []
+        for index, operator in enumerate(self.operators):
+            names = operator.variables()
+            for combination in itertools.product(symbols, repeat=len(names)):
+                binding = dict(zip(names, combination))
+                actions.append(
+                    (
+                        index,
+                        tuple(sorted(binding.items())),
+                        frozenset(template.format(**binding) for template in operator.requires),
+                        frozenset(template.format(**binding) for template in operator.consumes),
+                        frozenset(template.format(**binding) for template in operator.produces),
+                        operator.cost,
+                    )
+                )
+        return actions
+
+    def _search(self, initial: FrozenSet[str], goal: FrozenSet[str], symbols: List[str]) -> AbstractPlan:
+        """A* from `initial` to any state containing `goal`.
+
+        The heuristic is the cheapest action producing a missing goal fact
+        (0 once none is missing), which never overestimates, so the first
+        goal state popped is a cheapest plan.
+        """
+        actions = self._ground(symbols)
+
+        def heuristic(state: FrozenSet[str]) -> float:
+            missing = goal - state
+            if not missing:
+                return 0.0
+            costs = [cost for *_, produces, cost in actions if produces & missing]
+            return min(costs) if costs else float("inf")
+
+        counter = itertools.count()
+        best: Dict[FrozenSet[str], float] = {initial: 0.0}
+        frontier: List[Tuple[float, int, float, FrozenSet[str], Tuple[Any, ...]]] = [
+            (heuristic(initial), next(counter), 0.0, initial, ())
+        ]
+        while frontier:
+            estimate, _, cost, state, path = heapq.heappop(frontier)
+            if goal <= state:
+                return path
+            if cost > best.get(state, float("inf")) or len(path) >= self.max_steps:
+                continue
+            for index, binding, requires, consumes, produces, step_cost in actions:
+                if not requires <= state:
+                    continue
+                successor = (state - consumes) | produces
+                total = cost + step_cost
+                if successor == state or total >= best.get(successor, float("inf")):
+                    continue
+                estimate = total + heuristic(successor)
+                if estimate > self.max_cost:
+                    continue
+                best[successor] = total
+                heapq.heappush(frontier, (estimate, next(counter), total, successor, path + ((index, binding),)))
+        return None
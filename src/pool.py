@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .intents import Intent, intent_fingerprint
+from .solver import Solver, describe_error
+
+
+logger = logging.getLogger(__name__)
+
+EVICTION_POLICIES = ("reject", "drop_lowest", "drop_oldest")
+
+
+class PoolFullError(Exception):
+    """Raised when an intent cannot be admitted to a full pool."""
+
+
+class _Entry:
+    __slots__ = ("ticket", "intent", "fingerprint", "key", "removed")
+
+    def __init__(self, ticket: str, intent: Intent, fingerprint: str, key: Tuple[float, int]) -> None:
+        self.ticket = ticket
+        self.intent = intent
+        self.fingerprint = fingerprint
+        self.key = key
+        self.removed = False
+
+
+class IntentPool:
+    """Bounded priority pool of pending intents.
+
+    Intents are served highest effective priority first, where effective
+    priority is `intent.priority + aging_rate * seconds_waited`, so old
+    low-priority intents eventually overtake newer high-priority ones. Since
+    the aging term grows equally for every waiting intent, the order only
+    depends on `priority - aging_rate * enqueued_at`, which is fixed at
+    insertion and can live in a heap.
+
+    When `capacity` is reached the `eviction` policy applies: "reject" raises
+    `PoolFullError`, "drop_lowest" evicts the intent with the lowest effective
+    priority (or rejects the new one if it would be that intent), and
+    "drop_oldest" evicts the longest-waiting intent. Identical pending intents
+    (see `intent_fingerprint`) share one ticket.
+
+    Tickets are random, so they never collide across server processes. A
+    ticket stays `known` from `put` until the consumer that took it calls
+    `done` (evicted tickets until `on_evict` returns).
+    """
+
+    def __init__(
+        self,
+        capacity: int = 10000,
+        aging_rate: float = 1.0,
+        eviction: str = "reject",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of {EVICTION_POLICIES}")
+        self.capacity = max(1, capacity)
+        self.aging_rate = aging_rate
+        self.eviction = eviction
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._closed = False
+        self._seq = itertools.count()
+        # Insertion-ordered, so the first live entry is the oldest.
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_fingerprint: Dict[str, str] = {}
+        # Tickets handed out by `get` (or evicted) whose outcome is not stored yet
+        self._taken: Set[str] = set()
+        # Min-heap on key for serving, max-heap on key for drop_lowest;
+        # removed entries are skipped lazily.
+        self._serve_heap: List[Tuple[Tuple[float, int], _Entry]] = []
+        self._evict_heap: List[Tuple[Tuple[float, int], _Entry]] = []
+        self.evicted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.on_evict: Optional[Callable[[str, Intent], None]] = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "pending": len(self._entries),
+                "capacity": self.capacity,
+                "evicted": self.evicted,
+                "deduplicated": self.deduplicated,
+                "rejected": self.rejected,
+            }
+
+    def _remove(self, entry: _Entry) -> None:
+        entry.removed = True
+        del self._entries[entry.ticket]
+        del self._by_fingerprint[entry.fingerprint]
+
+    def _compact(self) -> None:
+        """Drop removed entries once they outnumber live ones."""
+        limit = 2 * len(self._entries) + 64
+        if len(self._serve_heap) > limit:
+            self._serve_heap = [item for item in self._serve_heap if not item[1].removed]
+            heapq.heapify(self._serve_heap)
+        if len(self._evict_heap) > limit:
+            self._evict_heap = [item for item in self._evict_heap if not item[1].removed]
+            heapq.heapify(self._evict_heap)
+
+    def _pop_live(self, heap: List[Tuple[Tuple[float, int], _Entry]]) -> None:
+        while heap and heap[0][1].removed:
+            heapq.heappop(heap)
+
+    def _evict_one(self, key: Tuple[float, int]) -> _Entry:
+        if self.eviction == "drop_oldest":
+            victim = next(iter(self._entries.values()))
+        else:
+            self._pop_live(self._evict_heap)
+            worst = self._evict_heap[0][1]
+            if key >= worst.key:
+                self.rejected += 1
+                raise PoolFullError("pool is full and the intent has the lowest priority")
+            victim = worst
+        self._remove(victim)
+        self._taken.add(victim.ticket)
+        self.evicted += 1
+        return victim
+
+    def put(self, intent: Intent) -> str:
+        """Add an intent and return its ticket; duplicates get the pending ticket."""
+        fingerprint = intent_fingerprint(intent)
+        victim: Optional[_Entry] = None
+        with self._lock:
+            if self._closed:
+                raise PoolFullError("pool is closed")
+            existing = self._by_fingerprint.get(fingerprint)
+            if existing is not None:
+                self.deduplicated += 1
+                return existing
+            seq = next(self._seq)
+            key = (-(intent.priority - self.aging_rate * self._clock()), seq)
+            if len(self._entries) >= self.capacity:
+                if self.eviction == "reject":
+                    self.rejected += 1
+                    raise PoolFullError("pool is full")
+                victim = self._evict_one(key)
+            self._compact()
+            ticket = uuid.uuid4().hex
+            entry = _Entry(ticket, intent, fingerprint, key)
+            self._entries[ticket] = entry
+            self._by_fingerprint[fingerprint] = ticket
+            heapq.heappush(self._serve_heap, (key, entry))
+            if self.eviction == "drop_lowest":
+                heapq.heappush(self._evict_heap, ((-key[0], -key[1]), entry))
+            self._not_empty.notify()
+        if victim is not None:
+            try:
+                if self.on_evict is not None:
+                    self.on_evict(victim.ticket, victim.intent)
+            finally:
+                self.done(victim.ticket)
+        return ticket
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Tuple[str, Intent]]:
+        """Remove and return the next (ticket, intent), or None on timeout/close."""
+        with self._not_empty:
+            if not self._entries and not self._closed:
+                self._not_empty.wait(timeout)
+            if not self._entries:
+                return None
+            self._pop_live(self._serve_heap)
+            _, entry = heapq.heappop(self._serve_heap)
+            self._remove(entry)
+            self._taken.add(entry.ticket)
+            return entry.ticket, entry.intent
+
+    def done(self, ticket: str) -> None:
+        """Forget a ticket taken with `get` once its outcome has been stored."""
+        with self._lock:
+            self._taken.discard(ticket)
+
+    def known(self, ticket: str) -> bool:
+        """Whether `ticket` is waiting in the pool or taken but not yet done."""
+        with self._lock:
+            return ticket in self._entries or ticket in self._taken
+
+    def close(self) -> None:
+        """Stop accepting intents and wake up waiting consumers."""
+        with self._not_empty:
+            self._closed = True
+            self._not_empty.notify_all()
+
+
+class PoolWorkers:
+    """Threads draining an `IntentPool` through a `Solver`.
+
+    Outcomes (`Solver.solve_outcome` dicts) are kept for the most recent
+    `result_capacity` tickets and can be fetched with `result`; `status`
+    also tells pending tickets from ones this process never issued.
+    """
+
+    def __init__(self, pool: IntentPool, solver: Solver, threads: int = 4, result_capacity: int = 10000) -> None:
+        self.pool = pool
+        self.solver = solver
+        self.threads = max(1, threads)
+        self.result_capacity = max(1, result_capacity)
+        self._results: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._results_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        pool.on_evict = self._record_eviction
+
+    def _store(self, ticket: str, outcome: Dict[str, Any]) -> None:
+        with self._results_lock:
+            self._results[ticket] = outcome
+            while len(self._results) > self.result_capacity:
+                self._results.popitem(last=False)
+
+    def _record_eviction(self, ticket: str, intent: Intent) -> None:
+        self._store(ticket, {"result": None, "chosen_capability": None, "error": "evicted from pool"})
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            item = self.pool.get(timeout=0.5)
+            if item is None:
+                continue
+            ticket, intent = item
+            try:
+                outcome = self.solver.solve_outcome(intent)
+            except Exception as exc:
+                # Handler errors are already in the outcome; this is a solver
+                # bug, and the worker must survive it.
+                logger.exception("solving pool ticket %s failed", ticket)
+                outcome = {"result": None, "chosen_capability": None, "error": describe_error(exc)}
+            try:
+                self._store(ticket, outcome)
+            finally:
+                self.pool.done(ticket)
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f"intent-pool-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def result(self, ticket: str) -> Optional[Dict[str, Any]]:
+        with self._results_lock:
+            return self._results.get(ticket)
+
+    def status(self, ticket: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """("done", outcome), ("pending", None) or ("unknown", None) for `ticket`."""
+        # Check the pool first: outcomes are stored before a ticket is done,
+        # so a ticket that has just left the pool is found among the results.
+        pending = self.pool.known(ticket)
+        outcome = self.result(ticket)
+        if outcome is not None:
+            return "done", outcome
+        return ("pending" if pending else "unknown"), None
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from .journal import JournalEntry, read_journal
+from .solver import Solver, default_registry_and_solver
+
+
+# Replays a solve journal through a fresh solver, as fast as it can:
+#
+#   python -m src.replay /var/lib/intent-journal
+#   python -m src.replay /var/lib/intent-journal --verify --show 20
+#
+# Entries are solved one at a time in journal order, so handlers see the same
+# sequence as in production (e.g. to rebuild an order book or reproduce an
+# incident). Deadlines are ignored: they were enforced when the entries were
+# recorded. With --verify every replayed outcome is compared with the
+# recorded one and differences are reported.
+
+
+def replay(
+    solver: Solver,
+    entries: Iterable[JournalEntry],
+    verify: bool = False,
+    limit: Optional[int] = None,
+    on_mismatch: Any = None,
+) -> Dict[str, Any]:
+    """Solve `entries` in order; returns counts and throughput."""
+    count = mismatches = 0
+    start = time.perf_counter()
+    for entry in entries:
+        if limit is not None and count >= limit:
+            break
+        intent = entry.intent
+        intent.deadline = None
+        outcome = solver.solve_outcome(intent)
+        count += 1
+        if verify:
+            recorded = {"chosen_capability": entry.capability, "result": entry.result, "error": entry.error}
+            if any(outcome[key] != value for key, value in recorded.items()):
+                mismatches += 1
+                if on_mismatch is not None:
+                    on_mismatch(entry, outcome)
+    elapsed = time.perf_counter() - start
+    return {
+        "entries": count,
+        "mismatches": mismatches if verify else None,
+        "seconds": round(elapsed, 6),
+        "entries_per_sec": round(count / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Replay a solve journal through a fresh solver")
+    parser.add_argument("path", help="journal directory (or a single segment file)")
+    parser.add_argument("--verify", action="store_true", help="compare replayed outcomes with the recorded ones")
+    parser.add_argument("--show", type=int, default=10, metavar="N", help="print the first N mismatches")
+    parser.add_argument("--limit", type=int, help="stop after this many entries")
+    args = parser.parse_args()
+
+    _, solver = default_registry_and_solver()
+    shown = [0]
+
+    def report(entry: JournalEntry, outcome: Dict[str, Any]) -> None:
+        if shown[0] < args.show:
+            shown[0] += 1
+            recorded = {"chosen_capability": entry.capability, "result": entry.result, "error": entry.error}
+            line = {"intent": entry.intent.to_dict(), "recorded": recorded, "replayed": outcome}
+            print(json.dumps(line, ensure_ascii=False, default=str), file=sys.stderr)
+
+    summary = replay(solver, read_journal(args.path), verify=args.verify, limit=args.limit, on_mismatch=report)
+    print(json.dumps(summary))
+    solver.shutdown()
+    return 1 if summary["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
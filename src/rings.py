@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .matching import DUST, MatchingEngine, Order
+
+
+Pair = Tuple[str, str]
+Cycle = Tuple[str, ...]
+
+
+@dataclass
+class RingTrade:
+    """A settleable cycle of swap orders.
+
+    Order `i` gives `gives[i]` of `tokens[i]` and receives what order `i + 1`
+    gives (the last order receives from the first). `rate_product` is the
+    product of the orders' limit prices; the ring clears when it is <= 1, and
+    `surplus` is the share of the first token left over, which goes to the
+    last order.
+    """
+
+    tokens: Cycle
+    orders: List[Order]
+    gives: List[float]
+    rate_product: float
+
+    @property
+    def surplus(self) -> float:
+        return 1.0 - self.rate_product
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "capability": "ring_trade",
+            "total": self.surplus,
+            "tokens": list(self.tokens),
+            "orders": [order.order_id for order in self.orders],
+            "gives": list(self.gives),
+            "rate_product": self.rate_product,
+        }
+
+
+class RingFinder:
+    """Incremental discovery of multi-party ring trades among open swap orders.
+
+    The finder listens to a `MatchingEngine` and keeps a directed token graph
+    with an edge for every (from_token, to_token) pair that has open orders.
+    When a pair gets its first order, only cycles through that new edge are
+    searched (depth-limited to `max_length` tokens); when its last order
+    leaves, cycles through it are dropped. Cycles are stored at token level
+    and priced with each pair's best open order when evaluated.
+
+    Two-token cycles are left to the engine's pairwise matching.
+    """
+
+    def __init__(self, engine: MatchingEngine, max_length: int = 3) -> None:
+        if max_length < 3:
+            raise ValueError("max_length must be >= 3")
+        self.engine = engine
+        self.max_length = max_length
+        self._successors: Dict[str, Dict[str, int]] = {}
+        self._cycles: Set[Cycle] = set()
+        self._cycles_by_pair: Dict[Pair, Set[Cycle]] = {}
+        # Cycles whose pairs gained or changed best order since last evaluated
+        self._dirty: Set[Cycle] = set()
+        engine.listeners.append(self._on_event)
+
+    def __len__(self) -> int:
+        return len(self._cycles)
+
+    def _on_event(self, event: str, order: Order) -> None:
+        pair = (order.from_token, order.to_token)
+        successors = self._successors.setdefault(order.from_token, {})
+        if event == "added":
+            count = successors.get(order.to_token, 0)
+            successors[order.to_token] = count + 1
+            if count == 0:
+                self._add_edge(pair)
+            self._dirty.update(self._cycles_by_pair.get(pair, ()))
+        elif event == "removed":
+            count = successors.get(order.to_token, 0) - 1
+            if count > 0:
+                successors[order.to_token] = count
+                # The pair's next order may still clear the same rings.
+                self._dirty.update(self._cycles_by_pair.get(pair, ()))
+            else:
+                successors.pop(order.to_token, None)
+                self._remove_edge(pair)
+
+    def _add_edge(self, pair: Pair) -> None:
+        start, first = pair
+        if start == first:
+            return
+        path = [start, first]
+        on_path = {start, first}
+
+        def extend(token: str) -> None:
+            for successor in self._successors.get(token, ()):
+                if successor == start and len(path) >= 3:
+                    self._add_cycle(tuple(path))
+                elif successor not in on_path and len(path) < self.max_length:
+                    path.append(successor)
+                    on_path.add(successor)
+                    extend(successor)
+                    on_path.discard(successor)
+                    path.pop()
+
+        extend(first)
+
+    def _add_cycle(self, tokens: Cycle) -> None:
+        # Rotate so the smallest token comes first; each cycle is stored once.
+        pivot = tokens.index(min(tokens))
+        cycle = tokens[pivot:] + tokens[:pivot]
+        if cycle in self._cycles:
+            return
+        self._cycles.add(cycle)
+        self._dirty.add(cycle)
+        for index, token in enumerate(cycle):
+            self._cycles_by_pair.setdefault((token, cycle[(index + 1) % len(cycle)]), set()).add(cycle)
+
+    def _remove_edge(self, pair: Pair) -> None:
+        for cycle in self._cycles_by_pair.pop(pair, ()):
+            self._cycles.discard(cycle)
+            self._dirty.discard(cycle)
+            for index, token in enumerate(cycle):
+                other = (token, cycle[(index + 1) % len(cycle)])
+                if other != pair:
+                    self._cycles_by_pair.get(other, set()).discard(cycle)
+
+    def evaluate(self, cycle: Cycle) -> Optional[RingTrade]:
+        """Price a token cycle with each pair's best order; None if it does not clear."""
+        orders: List[Order] = []
+        rate_product = 1.0
+        for index, token in enumerate(cycle):
+            order = self.engine.best_order(token, cycle[(index + 1) % len(cycle)])
+            if order is None or not order.limit_price or order.limit_price <= 0.0:
+                return None
+            orders.append(order)
+            rate_product *= order.limit_price
+        if rate_product > 1.0:
+            return None
+        # Order i gives g_i = g_0 * prod(p_0..p_{i-1}); the tightest order bounds g_0.
+        first_gives = orders[0].amount
+        scale = 1.0
+        for order in orders:
+            first_gives = min(first_gives, order.amount / scale)
+            scale *= order.limit_price
+        if first_gives <= DUST:
+            return None
+        gives: List[float] = []
+        amount = first_gives
+        for order in orders:
+            # Snap to the full remainder so rounding cannot leave dust behind.
+            gives.append(order.amount if amount >= order.amount * (1.0 - 1e-9) else amount)
+            amount *= order.limit_price
+        return RingTrade(cycle, orders, gives, rate_product)
+
+    def candidates(self) -> List[RingTrade]:
+        """All currently clearing rings, largest surplus first."""
+        with self.engine.lock:
+            rings = [ring for ring in map(self.evaluate, list(self._cycles)) if ring is not None]
+        rings.sort(key=lambda ring: ring.surplus, reverse=True)
+        return rings
+
+    def settle(self) -> List[RingTrade]:
+        """Settle clearing rings among cycles touched since the last call.
+
+        Each pass tries the touched cycles in order of surplus, re-pricing
+        each before settling. Every settlement fully fills at least one
+        order, and the pair's next order marks its cycles for another pass.
+        """
+        settled: List[RingTrade] = []
+        with self.engine.lock:
+            while self._dirty:
+                pending = list(self._dirty)
+                self._dirty.clear()
+                rings = [ring for ring in map(self.evaluate, pending) if ring is not None]
+                rings.sort(key=lambda ring: ring.surplus, reverse=True)
+                for candidate in rings:
+                    if candidate.tokens not in self._cycles:
+                        continue
+                    ring = self.evaluate(candidate.tokens)
+                    if ring is None:
+                        continue
+                    for order, amount in zip(ring.orders, ring.gives):
+                        self.engine.fill(order.order_id, amount)
+                    settled.append(ring)
+        return settled
+
+    def explain(self) -> Dict[str, Any]:
+        """Clearing rings in `Solver.solve_with_explain` form."""
+        ranking = [ring.to_dict() for ring in self.candidates()]
+        chosen = "ring_trade" if ranking else None
+        result = None
+        if ranking:
+            result = f"{len(ranking)} ring trade(s) can settle; best: {' -> '.join(ranking[0]['tokens'])}"
+        return {"result": result, "chosen_capability": chosen, "ranking": ranking}
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import os
+from typing import Any, List, Optional, Tuple
+
+from .catalog import CapabilityLog, RegistryStore
+from .codec import Symbols, intent_from_record
+from .intents import Intent
+from .solver import default_registry_and_solver
+
+
+# State shared by the Flask app (`src/web.py`) and the ASGI app (`src/asgi.py`):
+# the solver, the runtime capability store and request payload parsing. Neither
+# Flask nor any server-specific machinery is imported here.
+
+registry, solver = default_registry_and_solver()
+
+# Capabilities registered at runtime are appended to CAPABILITY_LOG, which every
+# worker replays at startup and polls afterwards. Without it, changes stay local
+# to the worker that received them. `solver.registry` always holds the current
+# version; the module-level `registry` is the startup one.
+capability_log = CapabilityLog(os.environ["CAPABILITY_LOG"]) if os.getenv("CAPABILITY_LOG") else None
+store = RegistryStore(solver, capability_log)
+store.sync()
+
+# Upper bound on intents accepted by one batch request
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+_symbols: Tuple[Any, int, Optional[Symbols]] = (None, 0, None)
+
+
+def current_symbols() -> Symbols:
+    """Interned ids of the current catalog, rebuilt when the registry changes."""
+    global _symbols
+    registry = solver.registry
+    count = registry.capability_count()
+    cached_registry, cached_count, symbols = _symbols
+    if symbols is None or cached_registry is not registry or cached_count != count:
+        symbols = Symbols(list(registry.iter_capabilities()))
+        _symbols = (registry, count, symbols)
+    return symbols
+
+
+def tag_names(tags: List[Any]) -> List[Any]:
+    """Replace interned tag ids with tag names."""
+    if not any(isinstance(tag, int) and not isinstance(tag, bool) for tag in tags):
+        return tags
+    symbols = current_symbols()
+    return [symbols.tag(tag) if isinstance(tag, int) and not isinstance(tag, bool) else tag for tag in tags]
+
+
+def intent_from_payload(data: Any) -> Intent:
+    """An intent from a request object, or from a positional record (see `src/codec.py`)."""
+    if isinstance(data, list):
+        intent = intent_from_record(data)
+    else:
+        name = str(data.get("name", ""))
+        params = dict(data.get("params", {}))
+        tags = list(data.get("tags", []))
+        # Optional Unix time after which the intent is dropped unsolved
+        deadline = data.get("deadline")
+        if deadline is not None:
+            deadline = float(deadline)
+        intent = Intent(name=name, params=params, tags=tags, deadline=deadline)
+    intent.tags = tag_names(intent.tags or [])
+    if not intent.tags:
+        intent.tags = solver.registry.aliases.resolve(intent.name)
+    return intent
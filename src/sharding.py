@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import heapq
+import json
+import multiprocessing
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .aliases import AliasResolver
+from .intents import Capability, Intent, IntentRegistry
+from .metrics import Metrics
+
+
+Ranked = List[Tuple[float, int]]
+
+
+def _serve_shard(conn: Any, cache_size: int) -> None:
+    """Shard process loop: a local registry answering ranking requests.
+
+    Local positions map to the coordinator's global positions; both grow in
+    registration order, so local tie order matches global tie order.
+    """
+    registry = IntentRegistry(cache_size=cache_size)
+    positions: List[int] = []
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        op = message[0]
+        if op == "add":
+            for position, name, tags, params in message[1]:
+                registry.add_capability(Capability(name=name, accepts_tags=tags, required_params=params))
+                positions.append(position)
+        elif op == "rank":
+            _, encoded, k = message
+            results = []
+            for item in encoded:
+                intent = Intent(**json.loads(item))
+                ranked = registry._rank_candidates(intent) if k is None else registry._top_candidates(intent, k)
+                results.append([(score, positions[local]) for score, local in ranked])
+            conn.send(results)
+        elif op == "info":
+            conn.send(registry.cache_info())
+        elif op == "close":
+            return
+
+
+class _Shard:
+    __slots__ = ("process", "conn")
+
+    def __init__(self, process: Any, conn: Any) -> None:
+        self.process = process
+        self.conn = conn
+
+
+class ShardedRegistry:
+    """Capability registry partitioned across `shards` worker processes.
+
+    Each shard process holds an `IntentRegistry` with its share of the
+    capabilities (by a hash of the capability name, which keeps shards even
+    however skewed tags are) and ranks only those. Queries are scattered to
+    every shard; each returns its local top-k as (score, global position)
+    and the coordinator merges them by (score desc, position). That is the
+    order of the stable sort `IntentRegistry` uses, so rankings are
+    identical. Zero-score capabilities follow in registration order.
+
+    The coordinator only keeps the `Capability` list, to return results and
+    build explain breakdowns; indexes and scoring live in the shards. It
+    implements the registry methods `Solver` uses, so it can replace an
+    `IntentRegistry` there. Changes happen in place; there is no
+    copy-on-write `with_capability`.
+    """
+
+    def __init__(self, shards: int = 4, cache_size: int = 1024, mp_context: str = "spawn") -> None:
+        if shards < 1:
+            raise ValueError("shards must be >= 1")
+        context = multiprocessing.get_context(mp_context)
+        self._capabilities: List[Capability] = []
+        self._shards: List[_Shard] = []
+        for index in range(shards):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_serve_shard, args=(child, cache_size), name=f"registry-shard-{index}", daemon=True
+            )
+            process.start()
+            child.close()
+            self._shards.append(_Shard(process, parent))
+        # One scatter-gather at a time; shards work on it in parallel.
+        self._lock = threading.Lock()
+        self.metrics: Optional[Metrics] = None
+        # Name aliases live in the coordinator; shards only rank
+        self.aliases = AliasResolver()
+
+    def __enter__(self) -> "ShardedRegistry":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                try:
+                    shard.conn.send(("close",))
+                except (BrokenPipeError, OSError):
+                    pass
+                shard.conn.close()
+            for shard in self._shards:
+                shard.process.join(timeout=5)
+            self._shards = []
+
+    def shard_of(self, capability: Capability) -> int:
+        return zlib.crc32(capability.name.encode("utf-8")) % len(self._shards)
+
+    # Capabilities
+    def add_capability(self, capability: Capability) -> None:
+        self.add_capabilities([capability])
+
+    def add_capabilities(self, capabilities: Iterable[Capability]) -> None:
+        """Add many capabilities with one message per shard."""
+        batches: Dict[int, List[Tuple[int, str, List[str], List[str]]]] = {}
+        with self._lock:
+            for capability in capabilities:
+                position = len(self._capabilities)
+                self._capabilities.append(capability)
+                batches.setdefault(self.shard_of(capability), []).append(
+                    (position, capability.name, list(capability.accepts_tags), list(capability.required_params))
+                )
+            for index, batch in batches.items():
+                self._shards[index].conn.send(("add", batch))
+
+    def list_capabilities(self) -> List[Capability]:
+        return list(self._capabilities)
+
+    def capability_count(self) -> int:
+        return len(self._capabilities)
+
+    def capability_names(self) -> List[str]:
+        return [capability.name for capability in self._capabilities]
+
+    def iter_capabilities(self) -> Iterator[Capability]:
+        return iter(list(self._capabilities))
+
+    def add_alias(self, alias: str, tags: List[str]) -> None:
+        self.aliases.add(alias, tags)
+
+    def cache_info(self) -> Dict[str, int]:
+        """Shape cache counters summed over shards."""
+        with self._lock:
+            for shard in self._shards:
+                shard.conn.send(("info",))
+            infos = [self._receive(index) for index in range(len(self._shards))]
+        totals: Dict[str, int] = {}
+        for info in infos:
+            for key, value in info.items():
+                totals[key] = totals.get(key, 0) + value
+        totals["version"] = len(self._capabilities)
+        return totals
+
+    # Matching
+    def _receive(self, index: int) -> Any:
+        try:
+            return self._shards[index].conn.recv()
+        except EOFError:
+            raise RuntimeError(f"registry shard {index} exited") from None
+
+    def _gather(self, intents: List[Intent], k: Optional[int]) -> List[Ranked]:
+        """Merged (score, position) candidates per intent, the first `k` if given."""
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        message = ("rank", [intent.to_json() for intent in intents], k)
+        with self._lock:
+            for shard in self._shards:
+                shard.conn.send(message)
+            partials = [self._receive(index) for index in range(len(self._shards))]
+        merged: List[Ranked] = []
+        for row in range(len(intents)):
+            ranked = list(heapq.merge(*(partial[row] for partial in partials), key=lambda e: (-e[0], e[1])))
+            merged.append(ranked if k is None else ranked[:k])
+        if metrics is not None:
+            metrics.observe("rank", time.perf_counter() - start)
+        return merged
+
+    def _pad_positions(self, ranked: Ranked, k: Optional[int]) -> List[int]:
+        matched = {position for _, position in ranked}
+        limit = len(self._capabilities) if k is None else k
+        padding: List[int] = []
+        for position in range(len(self._capabilities)):
+            if len(ranked) + len(padding) >= limit:
+                break
+            if position not in matched:
+                padding.append(position)
+        return padding
+
+    def _scored(self, ranked: Ranked, k: Optional[int]) -> List[Tuple[float, Capability]]:
+        scored = [(score, self._capabilities[position]) for score, position in ranked]
+        scored.extend((0.0, self._capabilities[position]) for position in self._pad_positions(ranked, k))
+        return scored
+
+    def find_best_capability(self, intent: Intent) -> Optional[Capability]:
+        if not self._capabilities:
+            return None
+        ranked = self._gather([intent], 1)[0]
+        if not ranked or ranked[0][0] <= 0.0:
+            return None
+        return self._capabilities[ranked[0][1]]
+
+    def rank_capabilities(self, intent: Intent) -> List[Tuple[float, Capability]]:
+        """Return capabilities ranked by score (desc)."""
+        return self._scored(self._gather([intent], None)[0], None)
+
+    def top_capabilities(self, intent: Intent, k: int) -> List[Tuple[float, Capability]]:
+        """Return the first `k` entries of `rank_capabilities`."""
+        if k < 1:
+            raise ValueError("k must be >= 1")
+        return self._scored(self._gather([intent], k)[0], k)
+
+    def rank_batch(self, intents: List[Intent], k: Optional[int] = None) -> List[List[Tuple[float, Capability]]]:
+        """Rank many intents with one scatter-gather round trip."""
+        if k is not None and k < 1:
+            raise ValueError("k must be >= 1")
+        if not intents:
+            return []
+        return [self._scored(ranked, k) for ranked in self._gather(intents, k)]
+
+    def _explain(self, intent: Intent, k: Optional[int]) -> List[Dict[str, Any]]:
+        ranked = self._gather([intent], k)[0]
+        metrics = self.metrics
+        start = time.perf_counter() if metrics is not None else 0.0
+        positions = [position for _, position in ranked] + self._pad_positions(ranked, k)
+        details = [self._capabilities[position].score_breakdown(intent) for position in positions]
+        if metrics is not None:
+            metrics.observe("explain", time.perf_counter() - start)
+        return details
+
+    def explain_capabilities(self, intent: Intent) -> List[Dict[str, Any]]:
+        """Return detailed breakdowns sorted by total score."""
+        return self._explain(intent, None)
+
+    def explain_top(self, intent: Intent, k: int) -> List[Dict[str, Any]]:
+        """Return the first `k` entries of `explain_capabilities`."""
+        if k < 1:
+            raise ValueError("k must be >= 1")
+        return self._explain(intent, k)
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Sequence, TypeVar
+
+from .intents import Capability, CompiledCapability, IntentRegistry
+
+
+# Snapshot layout (native byte order, recorded in the header):
+#
+#   header     MAGIC, version, byte order, capability/tag/param counts,
+#              then (offset, length) for each section in SECTIONS
+#   sections   u32 arrays and UTF-8 blobs, each 8-byte aligned
+#
+# Strings are stored as an offsets array plus one blob. Capability tags and
+# params are stored as ids into the tag/param tables, whose order is the
+# registry's interned bit order, next to the registry's inverted indexes.
+# Loading maps the file and decodes capabilities only when they are touched,
+# so startup cost does not grow with the catalog, and processes that map the
+# same file share its pages.
+
+MAGIC = b"INTSNAP\x00"
+VERSION = 1
+SECTIONS = (
+    "name_offsets",
+    "name_blob",
+    "tag_offsets",
+    "tag_blob",
+    "param_offsets",
+    "param_blob",
+    "cap_tag_starts",
+    "cap_tags",
+    "cap_param_starts",
+    "cap_params",
+    "tag_posting_starts",
+    "tag_postings",
+    "param_posting_starts",
+    "param_postings",
+)
+_HEADER = struct.Struct(f"=8sII4xIII{len(SECTIONS) * 2}Q")
+_BYTE_ORDERS = {"little": 1, "big": 2}
+
+T = TypeVar("T")
+
+
+class SnapshotError(Exception):
+    """Raised for files that are not readable registry snapshots."""
+
+
+def _u32(values: List[int]) -> bytes:
+    data = array("I", values)
+    if data.itemsize != 4:  # pragma: no cover - exotic platforms
+        data = array("L", values)
+    return data.tobytes()
+
+
+def _strings(values: List[str]) -> List[bytes]:
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return [_u32(offsets), b"".join(encoded)]
+
+
+def _starts_and_items(groups: List[List[int]]) -> List[bytes]:
+    starts = [0]
+    items: List[int] = []
+    for group in groups:
+        items.extend(group)
+        starts.append(len(items))
+    return [_u32(starts), _u32(items)]
+
+
+def save_snapshot(registry: IntentRegistry, path: str) -> None:
+    """Write the registry's capabilities and match indexes to `path` atomically."""
+    capabilities = registry.list_capabilities()
+    tags = sorted(registry._tag_ids, key=registry._tag_ids.__getitem__)
+    params = sorted(registry._param_ids, key=registry._param_ids.__getitem__)
+    sections = (
+        _strings([capability.name for capability in capabilities])
+        + _strings(tags)
+        + _strings(params)
+        + _starts_and_items([[registry._tag_ids[t] for t in c.accepts_tags] for c in capabilities])
+        + _starts_and_items([[registry._param_ids[k] for k in c.required_params] for c in capabilities])
+        + _starts_and_items([list(registry._tag_index.get(tag, ())) for tag in tags])
+        + _starts_and_items([list(registry._param_index.get(key, ())) for key in params])
+    )
+
+    layout: List[int] = []
+    offset = _HEADER.size
+    for data in sections:
+        offset += -offset % 8
+        layout.extend((offset, len(data)))
+        offset += len(data)
+    header = _HEADER.pack(
+        MAGIC, VERSION, _BYTE_ORDERS[sys.byteorder], len(capabilities), len(tags), len(params), *layout
+    )
+
+    # Replace rather than rewrite, so processes mapping the old file keep a valid view.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(header)
+            for (section_offset, _), data in zip(zip(layout[::2], layout[1::2]), sections):
+                fh.write(b"\0" * (section_offset - fh.tell()))
+                fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class _LazySequence(Generic[T]):
+    """List-like view decoding mapped items on first access; appends stay in memory.
+
+    `name`, when given, decodes just the name of a mapped item, for `names`.
+    """
+
+    def __init__(self, count: int, decode: Callable[[int], T], name: Optional[Callable[[int], str]] = None) -> None:
+        self._count = count
+        self._decode = decode
+        self._name = name
+        self._decoded: Dict[int, T] = {}
+        self._appended: List[T] = []
+
+    def __len__(self) -> int:
+        return self._count + len(self._appended)
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index >= self._count:
+            return self._appended[index - self._count]
+        item = self._decoded.get(index)
+        if item is None:
+            item = self._decoded[index] = self._decode(index)
+        return item
+
+    def __iter__(self) -> Iterator[T]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def stream(self) -> Iterator[T]:
+        """Iterate without keeping items decoded on the way."""
+        for index in range(self._count):
+            item = self._decoded.get(index)
+            yield self._decode(index) if item is None else item
+        yield from list(self._appended)
+
+    def names(self) -> List[str]:
+        """Item names, decoding only the names of untouched mapped items."""
+        if self._name is None:
+            return [item.name for item in self.stream()]  # type: ignore[attr-defined]
+        return [self._name(index) for index in range(self._count)] + [
+            item.name for item in self._appended  # type: ignore[attr-defined]
+        ]
+
+    def append(self, item: T) -> None:
+        self._appended.append(item)
+
+    def copy(self) -> "_LazySequence[T]":
+        """Share the mapping and decoded items; appends are copied."""
+        duplicate: _LazySequence[T] = _LazySequence(self._count, self._decode, self._name)
+        duplicate._decoded = self._decoded
+        duplicate._appended = list(self._appended)
+        return duplicate
+
+
+class _MappedPostings:
+    """Inverted index backed by mapped posting lists; keys touched by appends are copied."""
+
+    def __init__(self, ids: Dict[str, int], mapped: int, starts: Sequence[int], postings: Sequence[int]) -> None:
+        self._ids = ids
+        self._mapped = mapped
+        self._starts = starts
+        self._postings = postings
+        self._copied: Dict[str, List[int]] = {}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        copied = self._copied.get(key)
+        if copied is not None:
+            return copied
+        index = self._ids.get(key)
+        if index is None or index >= self._mapped:
+            return default
+        return self._postings[self._starts[index] : self._starts[index + 1]]
+
+    def copy(self, deep: bool = False, count: Optional[int] = None) -> "_MappedPostings":
+        """Share the mapping; copied posting lists are shared too unless `deep`.
+
+        A deep copy keeps only positions below `count`, when given.
+        """
+        duplicate = _MappedPostings(self._ids, self._mapped, self._starts, self._postings)
+        if deep:
+            duplicate._copied = {
+                key: [p for p in positions if count is None or p < count]
+                for key, positions in self._copied.items()
+            }
+        else:
+            duplicate._copied = dict(self._copied)
+        return duplicate
+
+    def setdefault(self, key: str, default: List[int]) -> List[int]:
+        copied = self._copied.get(key)
+        if copied is None:
+            mapped = self.get(key)
+            copied = self._copied[key] = list(mapped) if mapped is not None else default
+        return copied
+
+
+def load_snapshot(path: str, cache_size: int = 1024) -> IntentRegistry:
+    """Map a snapshot written by `save_snapshot` and return a registry over it.
+
+    Only the tag and param tables are decoded up front. Capabilities added
+    afterwards live in memory and are not written back until the next save.
+    """
+    with open(path, "rb") as fh:
+        # mmap rejects empty files with a bare ValueError
+        if os.fstat(fh.fileno()).st_size < _HEADER.size:
+            raise SnapshotError(f"{path}: file too small")
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    fields = _HEADER.unpack_from(mapped, 0)
+    magic, version, byte_order, cap_count, tag_count, param_count = fields[:6]
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError(f"{path}: not a registry snapshot (version {VERSION})")
+    if byte_order != _BYTE_ORDERS[sys.byteorder]:
+        raise SnapshotError(f"{path}: written on a machine with a different byte order")
+
+    view = memoryview(mapped)
+    sections: Dict[str, memoryview] = {}
+    for index, name in enumerate(SECTIONS):
+        offset, length = fields[6 + 2 * index], fields[7 + 2 * index]
+        section = view[offset : offset + length]
+        sections[name] = section if name.endswith("_blob") else section.cast("I")
+
+    def string_table(prefix: str) -> Callable[[int], str]:
+        offsets, blob = sections[f"{prefix}_offsets"], sections[f"{prefix}_blob"]
+        return lambda i: str(blob[offsets[i] : offsets[i + 1]], "utf-8")
+
+    cap_name = string_table("name")
+    tag_name = string_table("tag")
+    param_name = string_table("param")
+    tags = [tag_name(i) for i in range(tag_count)]
+    params = [param_name(i) for i in range(param_count)]
+    cap_tag_starts, cap_tags = sections["cap_tag_starts"], sections["cap_tags"]
+    cap_param_starts, cap_params = sections["cap_param_starts"], sections["cap_params"]
+
+    def decode_capability(i: int) -> Capability:
+        return Capability(
+            name=cap_name(i),
+            accepts_tags=[tags[t] for t in cap_tags[cap_tag_starts[i] : cap_tag_starts[i + 1]]],
+            required_params=[params[p] for p in cap_params[cap_param_starts[i] : cap_param_starts[i + 1]]],
+        )
+
+    def decode_compiled(i: int) -> CompiledCapability:
+        tag_ids = set(cap_tags[cap_tag_starts[i] : cap_tag_starts[i + 1]])
+        param_ids = cap_params[cap_param_starts[i] : cap_param_starts[i + 1]]
+        distinct = set(param_ids)
+        tag_mask = 0
+        for bit in tag_ids:
+            tag_mask |= 1 << bit
+        param_mask = 0
+        for bit in distinct:
+            param_mask |= 1 << bit
+        return CompiledCapability(
+            name=cap_name(i),
+            tag_mask=tag_mask,
+            param_mask=param_mask,
+            tag_count=len(tag_ids),
+            required_count=len(param_ids),
+            params_distinct=len(distinct) == len(param_ids),
+        )
+
+    registry = IntentRegistry(cache_size=cache_size)
+    registry._tag_ids = {tag: i for i, tag in enumerate(tags)}
+    registry._param_ids = {key: i for i, key in enumerate(params)}
+    registry._capabilities = _LazySequence(cap_count, decode_capability, cap_name)  # type: ignore[assignment]
+    registry._compiled = _LazySequence(cap_count, decode_compiled)  # type: ignore[assignment]
+    registry._tag_index = _MappedPostings(  # type: ignore[assignment]
+        registry._tag_ids, tag_count, sections["tag_posting_starts"], sections["tag_postings"]
+    )
+    registry._param_index = _MappedPostings(  # type: ignore[assignment]
+        registry._param_ids, param_count, sections["param_posting_starts"], sections["param_postings"]
+    )
+    registry._version = cap_count
+    # Keep the mapping alive for as long as the registry uses it.
+    registry._snapshot = mapped  # type: ignore[attr-defined]
+    return registry
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Registry snapshot tool")
+    sub = parser.add_subparsers(dest="command", required=True)
+    save = sub.add_parser("save", help="write the default registry to a snapshot")
+    save.add_argument("path")
+    info = sub.add_parser("info", help="print a snapshot's capability/tag/param counts")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    if args.command == "save":
+        from .solver import default_registry_and_solver
+
+        registry, _ = default_registry_and_solver()
+        save_snapshot(registry, args.path)
+        print(f"Saved {len(registry.list_capabilities())} capabilities to {args.path}")
+    else:
+        registry = load_snapshot(args.path)
+        print(
+            f"{args.path}: {len(registry._capabilities)} capabilities, "
+            f"{len(registry._tag_ids)} tags, {len(registry._param_ids)} params"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,93 +1,665 @@
 from __future__ import annotations
 
-from typing import Callable, Dict, Optional, Any, List
+import asyncio
+import inspect
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Awaitable, Callable, Dict, Iterator, Optional, Any, List, Union
 
-from .intents import Intent, IntentRegistry, Capability
+from .executors import BACKENDS, handler_path, make_backend, resolve_handler
+from .intents import Intent, IntentRegistry, Capability, intent_fingerprint
+from .journal import Journal
+from .matching import MatchingEngine
+from .memo import Memoizer
+from .metrics import SOLVES_METRIC, Metrics
+from .planner import Goal, Operator, Plan, Planner
+from .rings import RingFinder
+from .snapshot import load_snapshot, save_snapshot
+
+
+class DeadlineExceededError(Exception):
+    """Raised instead of running a handler for an intent past its deadline."""
+
+
+def describe_error(exc: BaseException) -> str:
+    """How a handler failure is reported in outcomes and the journal."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return "TimeoutError: handler timed out"
+    return f"{type(exc).__name__}: {exc}"
 
 
 class Solver:
     """Naive solver that maps intents to capabilities and executes handlers.
 
-    This prototype keeps execution handlers in-memory.
+    This prototype keeps execution handlers in-memory. Handlers may be plain
+    functions or coroutine functions; `solve` runs coroutines to completion on
+    a private event loop, while `asolve` awaits them and runs plain handlers in
+    the loop's default executor.
+
+    Results of handlers registered as idempotent are memoized in `memo`, a
+    TTL cache of up to `memo_size` results with single-flight coalescing.
+
+    Each handler runs on an execution backend: "inline" (the calling
+    thread), "thread" or "process" (see `src/executors.py`). Backend pools
+    are created on first use and sized by `backend_workers`, per backend
+    kind (default: the executor's own default).
+
+    With `journal` set (see `src/journal.py`) every solved intent is
+    appended to it with the chosen capability and its result or error.
     """
 
-    def __init__(self, registry: IntentRegistry) -> None:
+    def __init__(
+        self,
+        registry: IntentRegistry,
+        memo_size: int = 1024,
+        backend_workers: Optional[Dict[str, int]] = None,
+    ) -> None:
         self.registry = registry
-        self._handlers: Dict[str, Callable[[Intent], str]] = {}
+        self._handlers: Dict[str, Callable[[Intent], Union[str, Awaitable[str]]]] = {}
+        self._timeouts: Dict[str, float] = {}
+        self._concurrency: Dict[str, int] = {}
+        # Idempotent capability -> result TTL (seconds)
+        self._idempotent: Dict[str, float] = {}
+        self.memo = Memoizer(maxsize=memo_size)
+        # Capability -> (backend kind, handler import path) for non-inline handlers
+        self._placement: Dict[str, tuple[str, str]] = {}
+        self._backends: Dict[str, Any] = {}
+        self._backend_workers = dict(backend_workers or {})
+        self._backends_lock = threading.Lock()
+        # Order book for swap intents, when the swap handler settles through one
+        self.matching_engine: Optional[MatchingEngine] = None
+        self.ring_finder: Optional[RingFinder] = None
+        # Multi-step plans for intents no single capability can satisfy
+        self.planner: Optional[Planner] = None
+        # Semaphores belong to one event loop, so keep a set per running loop.
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Handler timings and solve outcome counters, when instrumented
+        self.metrics: Optional[Metrics] = None
+        # Audit trail: every solved intent with its capability and outcome
+        self.journal: Optional[Journal] = None
+
+    def instrument(self, metrics: Optional[Metrics]) -> None:
+        """Record stage timings into `metrics` (None turns instrumentation off).
+
+        The registry shares it, and registries derived from it inherit it.
+        """
+        self.metrics = metrics
+        self.registry.metrics = metrics
+
+    def _count(self, outcome: str) -> None:
+        if self.metrics is not None:
+            self.metrics.inc(SOLVES_METRIC, outcome=outcome)
+
+    def _record(self, intent: Intent, capability: Optional[str], result: Any, error: Optional[str] = None) -> None:
+        if self.journal is not None:
+            self.journal.append(intent, capability, result, error)
+
+    def _count_settled(self, exc: Optional[BaseException], result: Any = None, plan: bool = False) -> None:
+        """Count one finished top-level solve (not per plan step or handler call).
+
+        Expiry is counted where it is detected, and a plan that stopped at a
+        missing handler (result None) was counted as `no_handler` there.
+        """
+        if self.metrics is None:
+            return
+        if exc is None:
+            if not (plan and result is None):
+                self._count("solved")
+        elif not isinstance(exc, DeadlineExceededError):
+            self._count("error")
+
+    def _settled(self, intent: Intent, capability: str, call: Callable[[], Any], plan: bool = False) -> Any:
+        """Run `call` (a handler or plan) as one solve, journaling and counting its outcome."""
+        try:
+            result = call()
+        except BaseException as exc:
+            self._count_settled(exc)
+            self._record(intent, capability, None, describe_error(exc))
+            raise
+        self._count_settled(None, result, plan)
+        self._record(intent, capability, result)
+        return result
+
+    async def _asettled(
+        self, intent: Intent, capability: str, call: Callable[[], Awaitable[Any]], plan: bool = False
+    ) -> Any:
+        """Async variant of `_settled`."""
+        try:
+            result = await call()
+        except BaseException as exc:
+            self._count_settled(exc)
+            self._record(intent, capability, None, describe_error(exc))
+            raise
+        self._count_settled(None, result, plan)
+        self._record(intent, capability, result)
+        return result
+
+    def register_handler(
+        self,
+        capability_name: str,
+        handler: Union[str, Callable[[Intent], Union[str, Awaitable[str]]]],
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        idempotent: bool = False,
+        result_ttl: float = 60.0,
+        backend: str = "inline",
+    ) -> None:
+        """Register `handler` for a capability.
+
+        `timeout` (seconds) bounds each call; on expiry `asyncio.TimeoutError`
+        is raised and a coroutine handler is cancelled. `max_concurrency` caps
+        how many calls to this handler `asolve` runs at once.
+
+        An `idempotent` handler runs once for identical intents (same name,
+        tag set and params, see `intent_fingerprint`): concurrent duplicates
+        share the in-flight call and its result is reused for `result_ttl`
+        seconds.
 
-    def register_handler(self, capability_name: str, handler: Callable[[Intent], str]) -> None:
+        `handler` may be an import path ("package.module:function").
+        `backend` picks where it runs: "inline", "thread", or "process".
+        Process handlers must be importable by path, since only the path and
+        the intent (as compact JSON) are sent to the worker processes.
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown backend {backend!r}; expected one of {BACKENDS}")
+        path = handler if isinstance(handler, str) else None
+        if isinstance(handler, str):
+            handler = resolve_handler(handler)
+        elif backend == "process":
+            path = handler_path(handler)
+        self._placement.pop(capability_name, None)
+        if backend != "inline":
+            self._placement[capability_name] = (backend, path or "")
         self._handlers[capability_name] = handler
+        self._timeouts.pop(capability_name, None)
+        self._concurrency.pop(capability_name, None)
+        self._idempotent.pop(capability_name, None)
+        self.memo.cache.discard(lambda key: key[0] == capability_name)
+        if timeout is not None:
+            self._timeouts[capability_name] = timeout
+        if max_concurrency is not None:
+            self._concurrency[capability_name] = max(1, max_concurrency)
+        if idempotent:
+            self._idempotent[capability_name] = result_ttl
+
+    def _call_handler(self, capability_name: str, handler: Callable[..., Any], intent: Intent) -> Optional[str]:
+        """Call a handler from synchronous code."""
+        self._check_deadline(capability_name, intent)
+        ttl = self._idempotent.get(capability_name)
+        if ttl is None:
+            return self._timed_call(capability_name, handler, intent)
+        return self.memo.call(
+            (capability_name, intent_fingerprint(intent)),
+            lambda: self._timed_call(capability_name, handler, intent),
+            ttl,
+        )
+
+    def _check_deadline(self, capability_name: str, intent: Intent) -> None:
+        if intent.expired():
+            self._count("expired")
+            raise DeadlineExceededError(f"intent deadline passed before {capability_name} ran")
+
+    def _timed_call(self, capability_name: str, handler: Callable[..., Any], intent: Intent) -> Optional[str]:
+        metrics = self.metrics
+        if metrics is None:
+            return self._invoke_handler(capability_name, handler, intent)
+        start = time.perf_counter()
+        try:
+            return self._invoke_handler(capability_name, handler, intent)
+        finally:
+            metrics.observe_since("handler", start, capability_name)
+
+    def _backend(self, kind: str) -> Any:
+        with self._backends_lock:
+            backend = self._backends.get(kind)
+            if backend is None:
+                backend = self._backends[kind] = make_backend(kind, self._backend_workers.get(kind))
+            return backend
+
+    def shutdown(self) -> None:
+        """Stop the thread and process pools started for handlers."""
+        with self._backends_lock:
+            backends, self._backends = list(self._backends.values()), {}
+        for backend in backends:
+            backend.shutdown()
+
+    def _invoke_handler(self, capability_name: str, handler: Callable[..., Any], intent: Intent) -> Optional[str]:
+        placement = self._placement.get(capability_name)
+        if placement is not None:
+            future = self._backend(placement[0]).submit(placement[1], handler, intent)
+            try:
+                return future.result(self._timeouts.get(capability_name))
+            except FutureTimeoutError:
+                future.cancel()
+                raise asyncio.TimeoutError() from None
+        result = handler(intent)
+        if inspect.isawaitable(result):
+            timeout = self._timeouts.get(capability_name)
+
+            async def wait() -> Optional[str]:
+                return await asyncio.wait_for(result, timeout)
+
+            return asyncio.run(wait())
+        return result
+
+    async def _acall_handler(self, capability_name: str, handler: Callable[..., Any], intent: Intent) -> Optional[str]:
+        """Call a handler from a coroutine, honouring its timeout and concurrency limit."""
+        self._check_deadline(capability_name, intent)
+        ttl = self._idempotent.get(capability_name)
+        if ttl is None:
+            return await self._atimed_call(capability_name, handler, intent)
+        return await self.memo.acall(
+            (capability_name, intent_fingerprint(intent)),
+            lambda: self._atimed_call(capability_name, handler, intent),
+            ttl,
+        )
+
+    async def _atimed_call(self, capability_name: str, handler: Callable[..., Any], intent: Intent) -> Optional[str]:
+        metrics = self.metrics
+        if metrics is None:
+            return await self._ainvoke_handler(capability_name, handler, intent)
+        start = time.perf_counter()
+        try:
+            return await self._ainvoke_handler(capability_name, handler, intent)
+        finally:
+            metrics.observe_since("handler", start, capability_name)
+
+    async def _ainvoke_handler(
+        self, capability_name: str, handler: Callable[..., Any], intent: Intent
+    ) -> Optional[str]:
+        loop = asyncio.get_running_loop()
+        semaphore = None
+        limit = self._concurrency.get(capability_name)
+        if limit is not None:
+            semaphores = self._semaphores.setdefault(loop, {})
+            semaphore = semaphores.get(capability_name)
+            if semaphore is None:
+                semaphore = semaphores[capability_name] = asyncio.Semaphore(limit)
+        timeout = self._timeouts.get(capability_name)
+
+        placement = self._placement.get(capability_name)
+
+        async def run() -> Optional[str]:
+            if placement is not None:
+                return await asyncio.wrap_future(self._backend(placement[0]).submit(placement[1], handler, intent))
+            if inspect.iscoroutinefunction(handler):
+                return await handler(intent)
+            result = await loop.run_in_executor(None, handler, intent)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+
+        if semaphore is None:
+            return await asyncio.wait_for(run(), timeout)
+        async with semaphore:
+            return await asyncio.wait_for(run(), timeout)
+
+    def _multi_step_plan(self, intent: Intent) -> Optional[Plan]:
+        """The planner's plan for `intent` when it needs more than one step."""
+        if self.planner is None:
+            return None
+        plan = self.planner.plan(intent)
+        if plan is None or len(plan.steps) < 2:
+            return None
+        return plan
+
+    def execute_plan(self, plan: Plan) -> Optional[str]:
+        """Run a plan's steps in order; stops (returning None) at a missing handler."""
+        results: List[str] = []
+        for step in plan.steps:
+            handler = self._handlers.get(step.capability)
+            if handler is None:
+                self._count("no_handler")
+                return None
+            results.append(str(self._call_handler(step.capability, handler, step.intent)))
+        return "; ".join(results)
+
+    async def aexecute_plan(self, plan: Plan) -> Optional[str]:
+        """Async variant of `execute_plan`."""
+        results: List[str] = []
+        for step in plan.steps:
+            handler = self._handlers.get(step.capability)
+            if handler is None:
+                self._count("no_handler")
+                return None
+            results.append(str(await self._acall_handler(step.capability, handler, step.intent)))
+        return "; ".join(results)
 
     def solve(self, intent: Intent) -> Optional[str]:
+        plan = self._multi_step_plan(intent)
+        if plan is not None:
+            return self._settled(intent, plan.steps[-1].capability, lambda: self.execute_plan(plan), plan=True)
         capability = self.registry.find_best_capability(intent)
         if capability is None:
+            self._count("no_capability")
+            self._record(intent, None, None)
             return None
         handler = self._handlers.get(capability.name)
         if handler is None:
+            self._count("no_handler")
+            self._record(intent, capability.name, None)
             return None
-        return handler(intent)
+        return self._settled(intent, capability.name, lambda: self._call_handler(capability.name, handler, intent))
 
-    def solve_with_explain(self, intent: Intent) -> Dict[str, Any]:
-        """Return result along with explainable ranking."""
-        ranking_details = self.registry.explain_capabilities(intent)
-        # map capability name to handler presence
-        chosen_capability = None
-        result_text = None
+    async def asolve(self, intent: Intent) -> Optional[str]:
+        """Async variant of `solve`; cancelling it cancels a running coroutine handler."""
+        plan = self._multi_step_plan(intent)
+        if plan is not None:
+            return await self._asettled(intent, plan.steps[-1].capability, lambda: self.aexecute_plan(plan), plan=True)
+        capability = self.registry.find_best_capability(intent)
+        if capability is None:
+            self._count("no_capability")
+            self._record(intent, None, None)
+            return None
+        handler = self._handlers.get(capability.name)
+        if handler is None:
+            self._count("no_handler")
+            self._record(intent, capability.name, None)
+            return None
+        return await self._asettled(
+            intent, capability.name, lambda: self._acall_handler(capability.name, handler, intent)
+        )
 
+    def _explain_ranking(self, intent: Intent, k: Optional[int]) -> Dict[str, Any]:
+        """Ranking details and the chosen capability name (if any score > 0)."""
+        if k is None:
+            ranking_details = self.registry.explain_capabilities(intent)
+        else:
+            ranking_details = self.registry.explain_top(intent, k)
+        chosen_capability = None
         if ranking_details:
             top = ranking_details[0]
             if float(top.get("total", 0.0)) > 0.0:
                 chosen_capability = str(top.get("capability"))
+        return {"result": None, "chosen_capability": chosen_capability, "ranking": ranking_details}
+
+    def solve_with_explain(self, intent: Intent, k: Optional[int] = None) -> Dict[str, Any]:
+        """Return result along with explainable ranking.
 
-        if chosen_capability:
+        When `k` is given only the top `k` ranking entries are built and returned.
+        Intents solved by a multi-step plan also report it under "plan".
+        """
+        explained = self._explain_ranking(intent, k)
+        plan = self._multi_step_plan(intent)
+        if plan is not None:
+            explained["plan"] = plan.to_dict()
+            explained["chosen_capability"] = plan.steps[-1].capability
+            explained["result"] = self._settled(
+                intent, plan.steps[-1].capability, lambda: self.execute_plan(plan), plan=True
+            )
+            return explained
+        chosen_capability = explained["chosen_capability"]
+        if not chosen_capability:
+            self._count("no_capability")
+            self._record(intent, None, None)
+        else:
             handler = self._handlers.get(chosen_capability)
-            if handler is not None:
-                result_text = handler(intent)
+            if handler is None:
+                self._count("no_handler")
+                self._record(intent, chosen_capability, None)
+            else:
+                explained["result"] = self._settled(
+                    intent, chosen_capability, lambda: self._call_handler(chosen_capability, handler, intent)
+                )
+        return explained
+
+    async def asolve_with_explain(self, intent: Intent, k: Optional[int] = None) -> Dict[str, Any]:
+        """Async variant of `solve_with_explain`."""
+        explained = self._explain_ranking(intent, k)
+        plan = self._multi_step_plan(intent)
+        if plan is not None:
+            explained["plan"] = plan.to_dict()
+            explained["chosen_capability"] = plan.steps[-1].capability
+            explained["result"] = await self._asettled(
+                intent, plan.steps[-1].capability, lambda: self.aexecute_plan(plan), plan=True
+            )
+            return explained
+        chosen_capability = explained["chosen_capability"]
+        if not chosen_capability:
+            self._count("no_capability")
+            self._record(intent, None, None)
+        else:
+            handler = self._handlers.get(chosen_capability)
+            if handler is None:
+                self._count("no_handler")
+                self._record(intent, chosen_capability, None)
+            else:
+                explained["result"] = await self._asettled(
+                    intent, chosen_capability, lambda: self._acall_handler(chosen_capability, handler, intent)
+                )
+        return explained
+
+    def _run_handler(self, capability_name: Optional[str], intent: Intent) -> Dict[str, Any]:
+        """Run the handler for `capability_name`, capturing its error if it raises."""
+        outcome: Dict[str, Any] = {"result": None, "chosen_capability": capability_name, "error": None}
+        handler = self._handlers.get(capability_name) if capability_name is not None else None
+        if capability_name is None:
+            self._count("no_capability")
+        elif handler is None:
+            self._count("no_handler")
+        else:
+            try:
+                outcome["result"] = self._call_handler(capability_name, handler, intent)
+            except Exception as exc:
+                outcome["error"] = describe_error(exc)
+                self._count_settled(exc)
+            else:
+                self._count_settled(None, outcome["result"])
+        self._record(intent, capability_name, outcome["result"], outcome["error"])
+        return outcome
+
+    def _run_plan(self, intent: Intent, plan: Plan) -> Dict[str, Any]:
+        """`_run_handler` for an intent solved by a multi-step plan."""
+        capability = plan.steps[-1].capability
+        outcome: Dict[str, Any] = {"result": None, "chosen_capability": capability, "error": None}
+        try:
+            outcome["result"] = self.execute_plan(plan)
+        except Exception as exc:
+            outcome["error"] = describe_error(exc)
+            self._count_settled(exc)
+        else:
+            self._count_settled(None, outcome["result"], plan=True)
+        self._record(intent, capability, outcome["result"], outcome["error"])
+        return outcome
+
+    async def _arun_plan(self, intent: Intent, plan: Plan) -> Dict[str, Any]:
+        """Async variant of `_run_plan`."""
+        capability = plan.steps[-1].capability
+        outcome: Dict[str, Any] = {"result": None, "chosen_capability": capability, "error": None}
+        try:
+            outcome["result"] = await self.aexecute_plan(plan)
+        except Exception as exc:
+            outcome["error"] = describe_error(exc)
+            self._count_settled(exc)
+        else:
+            self._count_settled(None, outcome["result"], plan=True)
+        self._record(intent, capability, outcome["result"], outcome["error"])
+        return outcome
+
+    def solve_outcome(self, intent: Intent) -> Dict[str, Any]:
+        """Solve one intent, returning `result`, `chosen_capability` and `error`."""
+        plan = self._multi_step_plan(intent)
+        if plan is not None:
+            return self._run_plan(intent, plan)
+        capability = self.registry.find_best_capability(intent)
+        return self._run_handler(capability.name if capability is not None else None, intent)
 
-        return {
-            "result": result_text,
-            "chosen_capability": chosen_capability,
-            "ranking": ranking_details,
-        }
+    def iter_solve_many(self, intents: List[Intent], max_workers: int = 8) -> Iterator[Dict[str, Any]]:
+        """Yield one outcome per intent, in input order, as soon as it is ready.
 
+        All intents are ranked in one `rank_batch` pass, then handlers run on a
+        pool of at most `max_workers` threads. Each outcome has `result`,
+        `chosen_capability` and `error` (the handler exception, if any).
+        """
+        if not intents:
+            return
+        chosen = self._choose_many(intents)
+        workers = max(1, min(max_workers, len(intents)))
+        plans = [self._multi_step_plan(intent) for intent in intents]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(self._run_plan, intent, plan) if plan is not None else pool.submit(self._run_handler, name, intent)
+                for name, intent, plan in zip(chosen, intents, plans)
+            ]
+            for future in futures:
+                yield future.result()
 
-def default_registry_and_solver() -> tuple[IntentRegistry, Solver]:
-    registry = IntentRegistry()
+    def solve_many(self, intents: List[Intent], max_workers: int = 8) -> List[Dict[str, Any]]:
+        """Solve a batch of intents; see `iter_solve_many`."""
+        return list(self.iter_solve_many(intents, max_workers=max_workers))
+
+    def _choose_many(self, intents: List[Intent]) -> List[Optional[str]]:
+        chosen: List[Optional[str]] = []
+        for ranked in self.registry.rank_batch(intents, k=1):
+            if ranked and ranked[0][0] > 0.0:
+                chosen.append(ranked[0][1].name)
+            else:
+                chosen.append(None)
+        return chosen
+
+    async def _arun_handler(self, capability_name: Optional[str], intent: Intent) -> Dict[str, Any]:
+        """Async variant of `_run_handler`."""
+        outcome: Dict[str, Any] = {"result": None, "chosen_capability": capability_name, "error": None}
+        handler = self._handlers.get(capability_name) if capability_name is not None else None
+        if capability_name is None:
+            self._count("no_capability")
+        elif handler is None:
+            self._count("no_handler")
+        else:
+            try:
+                outcome["result"] = await self._acall_handler(capability_name, handler, intent)
+            except Exception as exc:
+                outcome["error"] = describe_error(exc)
+                self._count_settled(exc)
+            else:
+                self._count_settled(None, outcome["result"])
+        self._record(intent, capability_name, outcome["result"], outcome["error"])
+        return outcome
+
+    async def asolve_many(self, intents: List[Intent]) -> List[Dict[str, Any]]:
+        """Async variant of `solve_many`; handlers run concurrently on the event loop."""
+        if not intents:
+            return []
+        chosen = self._choose_many(intents)
+        plans = [self._multi_step_plan(intent) for intent in intents]
+        return list(
+            await asyncio.gather(
+                *(
+                    self._arun_plan(intent, plan) if plan is not None else self._arun_handler(name, intent)
+                    for name, intent, plan in zip(chosen, intents, plans)
+                )
+            )
+        )
+
+
+def default_registry_and_solver(snapshot_path: Optional[str] = None) -> tuple[IntentRegistry, Solver]:
+    """Build the example registry and solver.
+
+    With `snapshot_path` (default: the INTENT_SNAPSHOT environment variable)
+    the capability catalog is mapped from that snapshot instead of being
+    built here; a missing snapshot is written from the example catalog.
+    """
+    if snapshot_path is None:
+        snapshot_path = os.getenv("INTENT_SNAPSHOT") or None
+    loaded = snapshot_path is not None and os.path.exists(snapshot_path)
+    registry = load_snapshot(snapshot_path) if loaded else IntentRegistry()
     solver = Solver(registry)
 
+    # Intent names resolved to tags when a request has none (snapshots do not
+    # store aliases, so they are added either way)
+    registry.add_alias("transfer", ["transfer", "payment"])
+    registry.add_alias("pay", ["transfer", "payment"])
+    registry.add_alias("notify", ["notify", "message"])
+    registry.add_alias("message", ["notify", "message"])
+    registry.add_alias("swap", ["swap", "trade"])
+
     # Example capabilities and handlers
-    registry.add_capability(
-        Capability(name="send_notification", accepts_tags=["notify", "message"], required_params=["to", "text"])
-    )
+    if not loaded:
+        registry.add_capability(
+            Capability(name="send_notification", accepts_tags=["notify", "message"], required_params=["to", "text"])
+        )
     solver.register_handler(
         "send_notification",
         lambda intent: f"Notification to {intent.params.get('to')}: {intent.params.get('text')}",
+        idempotent=True,
     )
 
-    registry.add_capability(
-        Capability(name="transfer_tokens", accepts_tags=["transfer", "payment"], required_params=["to", "amount"])
-    )
+    if not loaded:
+        registry.add_capability(
+            Capability(name="transfer_tokens", accepts_tags=["transfer", "payment"], required_params=["to", "amount"])
+        )
     solver.register_handler(
         "transfer_tokens",
         lambda intent: f"Transferred {intent.params.get('amount')} to {intent.params.get('to')} (demo)",
     )
 
     # New: swap capability
-    registry.add_capability(
-        Capability(
-            name="swap_tokens",
-            accepts_tags=["swap", "trade"],
-            required_params=["from_token", "to_token", "amount"],
+    if not loaded:
+        registry.add_capability(
+            Capability(
+                name="swap_tokens",
+                accepts_tags=["swap", "trade"],
+                required_params=["from_token", "to_token", "amount"],
+            )
         )
-    )
-    solver.register_handler(
-        "swap_tokens",
-        lambda intent: (
-            f"Swapped {intent.params.get('amount')} {intent.params.get('from_token')} "
-            f"-> {intent.params.get('to_token')} (demo)"
-        ),
+    # Opposing swaps settle against each other first, then in multi-party
+    # rings; only unmatched market orders reach the (demo) external venue.
+    engine = MatchingEngine()
+    rings = RingFinder(engine)
+    solver.matching_engine = engine
+    solver.ring_finder = rings
+    def venue_swap(intent: Intent) -> str:
+        params = intent.params
+        if params.get("amount") is None and params.get("to_amount") is not None:
+            # Exact-output swap (a planned step buying what a payment needs)
+            return (
+                f"Swapped {params.get('from_token')} -> {params.get('to_amount')} "
+                f"{params.get('to_token')} (demo)"
+            )
+        return f"Swapped {params.get('amount')} {params.get('from_token')} -> {params.get('to_token')} (demo)"
+
+    match_swap = engine.handler(fallback=venue_swap)
+
+    def handle_swap(intent: Intent) -> str:
+        text = match_swap(intent)
+        settled = rings.settle()
+        if settled:
+            text += f"; settled {len(settled)} ring trade(s)"
+        return text
+
+    solver.register_handler("swap_tokens", handle_swap)
+
+    # Paying in a token you do not hold ("holding" param) is planned as a swap
+    # into that token followed by the transfer. The payment amount is in the
+    # target token, so the swap step buys it ("to_amount") rather than selling
+    # that many source tokens.
+    solver.planner = Planner(
+        operators=[
+            Operator(
+                capability="swap_tokens",
+                requires=("holds:{src}",),
+                consumes=("holds:{src}",),
+                produces=("holds:{dst}",),
+                params={"from_token": "{src}", "to_token": "{dst}"},
+                renames={"amount": "to_amount"},
+            ),
+            Operator(
+                capability="transfer_tokens",
+                requires=("holds:{token}",),
+                produces=("sent:{token}",),
+                params={"token": "{token}"},
+            ),
+        ],
+        goals=[Goal(tags=("transfer", "payment"), initial=("holds:{holding}",), goal=("sent:{token}",))],
     )
 
+    if snapshot_path is not None and not loaded:
+        save_snapshot(registry, snapshot_path)
     return registry, solver
 
 
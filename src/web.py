@@ -1,18 +1,89 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
 
-from flask import Flask, jsonify, redirect, render_template_string, request, url_for
-import webbrowser
+from flask import Flask, Response, jsonify, redirect, render_template_string, request, stream_with_context, url_for
+import functools
+import hmac
+import json
+import threading
+import time
 import os
 
+from .admission import AdmissionController, RateLimiter, Rejected
+from .catalog import capability_from_dict, capability_to_dict
+from .codec import (
+    FORMAT_MSGPACK,
+    MIME_FRAMES,
+    MIME_JSON,
+    MIME_MSGPACK,
+    Symbols,
+    dumps,
+    frame,
+    intent_to_record,
+    iter_frames,
+    loads,
+    msgpack_module,
+)
 from .intents import Intent
-from .solver import default_registry_and_solver
+from .metrics import Metrics, aggregate, render
+from .pool import IntentPool, PoolFullError, PoolWorkers
+from .service import (
+    MAX_BATCH_SIZE,
+    current_symbols,
+    intent_from_payload,
+    solver,
+    store,
+)
+from .solver import DeadlineExceededError
 
 
 app = Flask(__name__)
 
-registry, solver = default_registry_and_solver()
+# Solver, runtime capability store (CAPABILITY_LOG) and payload parsing are
+# shared with the ASGI app; see `src/service.py`.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "8"))
+
+# Intents submitted to /api/intents are queued in a pool solved by worker
+# threads. Both are built and started on first use (see `intent_pool`), so each
+# gunicorn worker starts its own after forking and apps that never queue an
+# intent do not pay for them.
+_pool_workers: Optional[PoolWorkers] = None
+_pool_lock = threading.Lock()
+
+# Per-stage timings and solve counters, served at /metrics. METRICS=0 turns
+# instrumentation off. With METRICS_DIR set, every worker flushes its metrics
+# there every METRICS_FLUSH_INTERVAL seconds and /metrics serves their sum.
+metrics = Metrics() if os.getenv("METRICS", "1") != "0" else None
+solver.instrument(metrics)
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+# Audit trail of every solve, group-committed to segments in JOURNAL_DIR by a
+# writer thread per worker. Replay it with `python -m src.replay JOURNAL_DIR`.
+JOURNAL_DIR = os.getenv("JOURNAL_DIR") or None
+if JOURNAL_DIR:
+    
+    solver.journal = Journal(JOURNAL_DIR)
+
+# Admission control for the solve endpoints: ADMISSION_CONCURRENCY requests
+# solve at once per worker, ADMISSION_QUEUE more wait up to
+# ADMISSION_QUEUE_TIMEOUT seconds; anything beyond is shed with 429. With
+# RATE_LIMIT > 0 each client (RATE_LIMIT_HEADER, else the remote address) may
+# also make RATE_LIMIT requests per second, in bursts of RATE_LIMIT_BURST.
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("ADMISSION_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("ADMISSION_QUEUE", "64")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "1.0")),
+)
+RATE_LIMIT = float(os.getenv("RATE_LIMIT", "0"))
+rate_limiter = (
+    RateLimiter(RATE_LIMIT, float(os.getenv("RATE_LIMIT_BURST", str(max(1.0, 2 * RATE_LIMIT)))))
+    if RATE_LIMIT > 0
+    else None
+)
+RATE_LIMIT_HEADER = os.getenv("RATE_LIMIT_HEADER", "")
 
 
 INDEX_HTML = """
@@ -101,7 +172,57 @@ def index():
     return render_template_string(INDEX_HTML, payload=None, name="transfer", tags="transfer,payment", explain=False)
 
 
+def client_key() -> str:
+    if RATE_LIMIT_HEADER:
+        forwarded = request.headers.get(RATE_LIMIT_HEADER, "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.remote_addr or ""
+
+
+def admitted(view: Callable[..., Any]) -> Callable[..., Any]:
+    """Rate-limit and queue a solve endpoint; shed requests get 429 + Retry-After.
+
+    The admission slot is held until the response is sent, including
+    streamed responses.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args: Any, **kwargs: Any):
+        try:
+            if rate_limiter is not None:
+                rate_limiter.check(client_key())
+            waited = admission.acquire()
+        except Rejected as exc:
+            if metrics is not None:
+                metrics.inc("intent_shed_total", reason=exc.reason)
+            response = jsonify({"error": "server busy, retry later", "reason": exc.reason})
+            response.status_code = 429
+            response.headers["Retry-After"] = exc.retry_after_header()
+            return response
+        start = time.perf_counter()
+        if metrics is not None:
+            metrics.observe("queue", waited)
+
+        def release() -> None:
+            admission.release(time.perf_counter() - start)
+
+        try:
+            response = app.make_response(view(*args, **kwargs))
+        except BaseException:
+            release()
+            raise
+        if response.is_streamed:
+            response.call_on_close(release)
+        else:
+            release()
+        return response
+
+    return wrapper
+
+
 @app.post("/solve")
+@admitted
 def solve_form():
     name = request.form.get("name", "").strip()
     tags_raw = request.form.get("tags", "").strip()
@@ -112,14 +233,7 @@ def solve_form():
 
     # Auto-infer tags from intent name if user did not provide tags
     if not tags:
-        alias_to_tags = {
-            "transfer": ["transfer", "payment"],
-            "pay": ["transfer", "payment"],
-            "notify": ["notify", "message"],
-            "message": ["notify", "message"],
-            "swap": ["swap", "trade"],
-        }
-        tags = alias_to_tags.get(name, [])
+        tags = solver.registry.aliases.resolve(name)
 
     intent = Intent(name=name, params=params, tags=tags)
     if want_explain:
@@ -131,28 +245,375 @@ def solve_form():
     return render_template_string(INDEX_HTML, payload=payload, name=name, tags=tags_raw, explain=want_explain)
 
 
+# Stats keys that are per-worker limits (maxed across workers) or running
+# totals (exported as counters); every other key is a summed gauge.
+LIMIT_KEYS = {"maxsize", "capacity"}
+TOTAL_KEYS = {
+    "hits", "misses", "coalesced", "evicted", "deduplicated", "rejected", "entries", "batches", "bytes", "segments",
+}
+
+
+def export_stats(prefix: str, stats: Dict[str, Any]) -> None:
+    assert metrics is not None
+    for key, value in stats.items():
+        if key in TOTAL_KEYS:
+            metrics.advance(f"{prefix}_{key}_total", value)
+        else:
+            metrics.set(f"{prefix}_{key}", value, mode="max" if key in LIMIT_KEYS else "sum")
+
+
+def record_gauges() -> None:
+    """Copy registry cache, intent pool, memo, journal and admission stats into `metrics`."""
+    if metrics is None:
+        return
+    cache_info = solver.registry.cache_info()
+    cache_info.pop("version", None)
+    export_stats("intent_registry_cache", cache_info)
+    if _pool_workers is not None:
+        export_stats("intent_pool", _pool_workers.pool.stats())
+    export_stats("intent_memo", solver.memo.info())
+    if solver.journal is not None:
+        export_stats("intent_journal", solver.journal.stats)
+    stats = admission.stats()
+    metrics.set("intent_admission_in_flight", stats["in_flight"])
+    metrics.set("intent_admission_queued", stats["queued"])
+
+
+# Solve API wire formats (see `src/codec.py`). Request bodies are decoded by
+# Content-Type and responses encoded for the Accept header: JSON by default,
+# msgpack (optional dependency) for application/msgpack and, for batches,
+# length-prefixed msgpack frames. Intents may be sent as positional records
+# with tags as interned ids from /api/symbols. `ids` answers with capability
+# ids instead of names and `echo=0` leaves the echoed intent out.
+BINARY_TYPES = (MIME_MSGPACK, MIME_FRAMES)
+NDJSON = "application/x-ndjson"
+SYMBOLS_HEADER = "X-Intent-Symbols"
+
+
+class WireFormatError(Exception):
+    """A binary request body arrived but msgpack is not installed."""
+
+
+@app.errorhandler(WireFormatError)
+def wire_format_error(exc: WireFormatError):
+    return jsonify({"error": str(exc)}), 415
+
+
+def request_data() -> Any:
+    """The request body decoded by its Content-Type; None if malformed."""
+    mimetype = request.mimetype
+    if mimetype not in BINARY_TYPES:
+        return request.get_json(silent=True)
+    if msgpack_module() is None:
+        raise WireFormatError("msgpack is not installed on this server; send JSON")
+    try:
+        if mimetype == MIME_FRAMES:
+            return [loads(payload, FORMAT_MSGPACK) for payload in iter_frames(request.get_data())]
+        return loads(request.get_data(), FORMAT_MSGPACK)
+    except ValueError:
+        return None
+
+
+def response_type(*offered: str) -> str:
+    """The Accept header's pick among JSON and `offered`; JSON if msgpack is missing."""
+    best = request.accept_mimetypes.best_match((MIME_JSON, *offered), default=MIME_JSON)
+    if best in BINARY_TYPES and msgpack_module() is None:
+        return MIME_JSON
+    return best
+
+
+def respond(body: Any, status: int = 200, symbols: Optional[Symbols] = None):
+    """Encode `body` as msgpack or JSON, whichever the client accepts."""
+    start = time.perf_counter() if metrics is not None else 0.0
+    if response_type(MIME_MSGPACK) == MIME_MSGPACK:
+        response = Response(dumps(body, FORMAT_MSGPACK), status=status, mimetype=MIME_MSGPACK)
+    else:
+        response = jsonify(body)
+        response.status_code = status
+    if symbols is not None:
+        response.headers[SYMBOLS_HEADER] = symbols.version
+    if metrics is not None:
+        metrics.observe_since("serialize", start)
+    return response
+
+
+def symbols_conflict():
+    """A 409 response if the client's symbol table is stale, else None."""
+    sent = request.headers.get(SYMBOLS_HEADER)
+    if sent:
+        symbols = current_symbols()
+        if sent != symbols.version:
+            return respond({"error": "symbol table changed; refetch /api/symbols"}, 409, symbols)
+    return None
+
+
+def _flag(data: Any, name: str, default: bool) -> bool:
+    value = data.get(name) if isinstance(data, dict) and name in data else request.args.get(name)
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in ("", "0", "false", "no", "off")
+    return bool(value)
+
+
+class WireOptions(NamedTuple):
+    """How one solve response is shaped."""
+
+    binary: bool  # msgpack response: echoed intents are positional records
+    echo: bool
+    symbols: Optional[Symbols]  # set when capabilities are answered as ids
+
+    def body(self, intent: Optional[Intent], outcome: Dict[str, Any]) -> Dict[str, Any]:
+        """`outcome` with capability ids if requested, after the echoed intent."""
+        if self.symbols is not None:
+            outcome = self._with_ids(outcome)
+        if not self.echo:
+            return outcome
+        if intent is None:
+            return {"intent": None, **outcome}
+        return {"intent": intent_to_record(intent) if self.binary else intent.to_dict(), **outcome}
+
+    def _capability(self, name: Optional[str]) -> Any:
+        assert self.symbols is not None
+        capability_id = self.symbols.capability_id(name)
+        return name if capability_id is None else capability_id
+
+    def _with_ids(self, outcome: Dict[str, Any]) -> Dict[str, Any]:
+        # Copies: explain entries may be shared with the solver's caches
+        outcome = dict(outcome)
+        if "chosen_capability" in outcome:
+            outcome["chosen_capability"] = self._capability(outcome["chosen_capability"])
+        if outcome.get("ranking"):
+            outcome["ranking"] = [{**entry, "capability": self._capability(entry["capability"])} for entry in outcome["ranking"]]
+        if outcome.get("plan"):
+            steps = [{**step, "capability": self._capability(step["capability"])} for step in outcome["plan"]["steps"]]
+            outcome["plan"] = {**outcome["plan"], "steps": steps}
+        return outcome
+
+
+def wire_options(data: Any, mimetype: str) -> WireOptions:
+    """Options from body keys (single solves) or query params."""
+    symbols = current_symbols() if _flag(data, "ids", False) else None
+    return WireOptions(binary=mimetype in BINARY_TYPES, echo=_flag(data, "echo", True), symbols=symbols)
+
+
+@app.get("/api/symbols")
+def symbols_api():
+    """Capability and tag ids for binary clients; `version` goes in X-Intent-Symbols."""
+    symbols = current_symbols()
+    return respond(symbols.to_dict(), symbols=symbols)
+
+
 @app.post("/api/solve")
+@admitted
 def solve_api():
+    start = time.perf_counter() if metrics is not None else 0.0
+    conflict = symbols_conflict()
+    if conflict is not None:
+        return conflict
+    data = request_data()
+    if not isinstance(data, (dict, list)) or not data:
+        data = {}
+    try:
+        intent = intent_from_payload(data)
+    except (TypeError, ValueError) as exc:
+        return respond({"error": f"invalid intent: {exc}"}, 400)
+    if metrics is not None:
+        metrics.observe_since("parse", start)
+    options = wire_options(data, response_type(MIME_MSGPACK))
+    explain = data.get("explain") if isinstance(data, dict) else None
+    try:
+        if explain:
+            # "explain": <int> limits the ranking to the top k entries
+            k = None
+            if isinstance(explain, int) and not isinstance(explain, bool):
+                k = max(1, explain)
+            outcome = solver.solve_with_explain(intent, k=k)
+        else:
+            outcome = {"result": solver.solve(intent)}
+    except DeadlineExceededError as exc:
+        return respond(options.body(intent, {"error": str(exc)}), 504)
+    return respond(options.body(intent, outcome), symbols=options.symbols)
+
+
+@app.post("/api/solve/batch")
+@admitted
+def solve_batch_api():
+    """Solve an array of intents; results come back in input order.
+
+    With `?stream=1` (or `Accept: application/x-ndjson`) results are streamed
+    as one JSON object per line as soon as each is ready; msgpack clients get
+    them as frames (`Accept: application/x-intent-frames`).
+    """
+    conflict = symbols_conflict()
+    if conflict is not None:
+        return conflict
+    data = request_data()
+    if not isinstance(data, list):
+        return respond({"error": "expected an array of intents"}, 400)
+    if len(data) > MAX_BATCH_SIZE:
+        return respond({"error": f"batch exceeds {MAX_BATCH_SIZE} intents"}, 400)
+    mimetype = response_type(MIME_MSGPACK, MIME_FRAMES, NDJSON)
+    options = wire_options(None, mimetype)
+
+    # Malformed entries get an error in their slot instead of failing the batch
+    slots: List[Optional[Dict[str, Any]]] = []
+    intents: List[Intent] = []
+    for item in data:
+        if not isinstance(item, (dict, list)):
+            error = "intent must be an object or a record"
+        else:
+            try:
+                intent = intent_from_payload(item)
+            except (TypeError, ValueError) as exc:
+                error = f"invalid intent: {exc}"
+            else:
+                intents.append(intent)
+                slots.append(None)
+                continue
+        slots.append(options.body(None, {"result": None, "chosen_capability": None, "error": error}))
+
+    def results():
+        outcomes = solver.iter_solve_many(intents, max_workers=BATCH_WORKERS)
+        pending = iter(intents)
+        for slot in slots:
+            yield slot if slot is not None else options.body(next(pending), next(outcomes))
+
+    stream = request.args.get("stream") in ("1", "true")
+    if mimetype == MIME_FRAMES or (stream and mimetype == MIME_MSGPACK):
+        frames = (frame(dumps(slot, FORMAT_MSGPACK)) for slot in results())
+        response = Response(stream_with_context(frames), mimetype=MIME_FRAMES)
+    elif stream or mimetype == NDJSON:
+        lines = (json.dumps(slot, ensure_ascii=False) + "\n" for slot in results())
+        response = Response(stream_with_context(lines), mimetype=NDJSON)
+    else:
+        return respond({"results": list(results())}, symbols=options.symbols)
+    if options.symbols is not None:
+        response.headers[SYMBOLS_HEADER] = options.symbols.version
+    return response
+
+
+def intent_pool() -> PoolWorkers:
+    """The process's intent pool and its started worker threads, built on first use."""
+    global _pool_workers
+    with _pool_lock:
+        if _pool_workers is None:
+            pool = IntentPool(
+                capacity=int(os.getenv("POOL_CAPACITY", "10000")),
+                eviction=os.getenv("POOL_EVICTION", "reject"),
+            )
+            _pool_workers = PoolWorkers(pool, solver, threads=int(os.getenv("POOL_THREADS", "4")))
+            _pool_workers.start()
+        return _pool_workers
+
+
+@app.post("/api/intents")
+@admitted
+def submit_intent_api():
+    """Queue an intent for background solving; poll /api/intents/<id> for the outcome."""
     data = request.get_json(silent=True) or {}
-    name = str(data.get("name", ""))
-    params = dict(data.get("params", {}))
-    tags = list(data.get("tags", []))
-    if not tags:
-        alias_to_tags = {
-            "transfer": ["transfer", "payment"],
-            "pay": ["transfer", "payment"],
-            "notify": ["notify", "message"],
-            "message": ["notify", "message"],
-            "swap": ["swap", "trade"],
-        }
-        tags = alias_to_tags.get(name, [])
-    intent = Intent(name=name, params=params, tags=tags)
-    if data.get("explain"):
-        explained = solver.solve_with_explain(intent)
-        return jsonify({"intent": intent.to_dict(), **explained})
+    try:
+        intent = intent_from_payload(data)
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": f"invalid intent: {exc}"}), 400
+    try:
+        intent.priority = int(data.get("priority", 0))
+    except (TypeError, ValueError):
+        return jsonify({"error": "priority must be an integer"}), 400
+    workers = intent_pool()
+    try:
+        ticket = workers.pool.put(intent)
+    except PoolFullError as exc:
+        return jsonify({"error": str(exc)}), 503
+    return jsonify({"id": ticket, "status": "pending"}), 202
+
+
+@app.get("/api/intents/<ticket>")
+def intent_status_api(ticket: str):
+    """Outcome of a queued intent; 404 for ids this process did not issue (or has forgotten)."""
+    if _pool_workers is None:
+        return jsonify({"id": ticket, "error": "unknown intent id"}), 404
+    status, outcome = _pool_workers.status(ticket)
+    if status == "unknown":
+        return jsonify({"id": ticket, "error": "unknown intent id"}), 404
+    if outcome is None:
+        return jsonify({"id": ticket, "status": "pending"})
+    return jsonify({"id": ticket, "status": "done", **outcome})
+
+
+@app.get("/api/rings")
+def rings_api():
+    """Ring trades that currently clear among resting swap orders."""
+    if solver.ring_finder is None:
+        return jsonify({"result": None, "chosen_capability": None, "ranking": []})
+    return jsonify(solver.ring_finder.explain())
+
+
+@app.before_request
+def start_background_threads():
+    # Threads do not survive fork, so each worker starts its own.
+    store.start_polling()
+    if metrics is not None and METRICS_DIR:
+        metrics.start_flushing(METRICS_DIR, METRICS_FLUSH_INTERVAL, before_flush=record_gauges)
+
+
+@app.get("/metrics")
+def metrics_api():
+    """Prometheus text format; summed over workers when METRICS_DIR is set."""
+    if metrics is None:
+        return Response("# metrics disabled (METRICS=0)\n", mimetype="text/plain")
+    record_gauges()
+    if METRICS_DIR:
+        metrics.flush(METRICS_DIR)
+        state = aggregate(METRICS_DIR, stale_after=3 * METRICS_FLUSH_INTERVAL)
     else:
-        result = solver.solve(intent)
-        return jsonify({"intent": intent.to_dict(), "result": result})
+        state = metrics.state()
+    return Response(render(state), mimetype="text/plain; version=0.0.4")
+
+
+def admin_denied():
+    token = request.headers.get("X-Admin-Token", "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({"error": "admin token required"}), 403
+    return None
+
+
+@app.get("/api/admin/capabilities")
+def list_capabilities_api():
+    denied = admin_denied()
+    if denied:
+        return denied
+    store.sync()
+    capabilities = [capability_to_dict(c) for c in solver.registry.iter_capabilities()]
+    return jsonify({"version": store.version, "capabilities": capabilities})
+
+
+@app.post("/api/admin/capabilities")
+def add_capability_api():
+    """Register a capability in every worker; its handler must already be registered."""
+    denied = admin_denied()
+    if denied:
+        return denied
+    try:
+        capability = capability_from_dict(request.get_json(silent=True) or {})
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    store.sync()
+    if capability.name in solver.registry.capability_names():
+        return jsonify({"error": f"capability {capability.name!r} already exists"}), 409
+    store.add(capability)
+    return jsonify({"version": store.version, "capability": capability_to_dict(capability)}), 201
+
+
+@app.delete("/api/admin/capabilities/<name>")
+def remove_capability_api(name: str):
+    denied = admin_denied()
+    if denied:
+        return denied
+    store.sync()
+    if not store.remove(name):
+        return jsonify({"error": f"no capability named {name!r}"}), 404
+    return jsonify({"version": store.version, "removed": name})
 
 
 def main() -> int:
@@ -161,6 +622,8 @@ def main() -> int:
     url = f"http://{host}:{port}"
     print(f"Starting app at {url}")
     try:
+        import webbrowser
+
         if host in ("127.0.0.1", "localhost"):
             webbrowser.open_new(url)
     except Exception: